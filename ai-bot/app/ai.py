@@ -1,58 +1,71 @@
 import asyncio
+import logging
+from collections.abc import AsyncIterator
 
-from async_openai import OpenAI
-import pydantic
+from app.backends import ChatBackend, OpenAIBackend
+from app.batching import MentionBatcher
+from app.conversation import ConversationStore, HistoricalMessage
+from app.mentions import MentionMatcher
+from app.response_cache import CacheKey, ResponseCache
+from app.scheduler import MentionScheduler
+from app.streaming import ChatChunker
+from app.twitch_irc import FastPrivateMessage, PrivateMessage, SendMessage
 
-from app.twitch_irc import PrivateMessage, SendMessage
 
+logger = logging.getLogger(__name__)
 
-class HistoricalMessage(pydantic.BaseModel):
-    message: str
-    response: str
 
+class OpenAIChat:
+    SYSTEM_PROMPT = "You are a rude human chatter in a chat room who responds to {}. You are rude and abuse anyone who talks to you. You speak tersely."
+    BATCH_SYSTEM_PROMPT = "You are a rude human chatter in a chat room. Several people are talking to you at once. You are rude and abuse anyone who talks to you. You speak tersely. Reply to every person on their own line, formatted exactly as `username: reply`."
 
-class LRUCache:
-    def __init__(self, count: int) -> None:
-        self.count = count
-        self.cache = []
-    
-    def add(self, item: HistoricalMessage) -> None:
-        if len(self.cache) >= self.count:
-            self.cache.pop(0)
-
-        self.cache.append(item)
+    def __init__(
+        self,
+        backend: ChatBackend | None = None,
+        history_size: int = 10,
+        max_users: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        cache: ResponseCache | None = None,
+        history_tokens: int | None = 1000,
+    ) -> None:
+        self.backend = backend or OpenAIBackend()
+        self.message_history = ConversationStore(history_size, max_users, max_bytes, history_tokens)
+        self.cache = cache
 
+    def system_prompt(self, username: str) -> str:
+        return self.SYSTEM_PROMPT.format(username)
 
+    def build_messages(self, username: str, message: str) -> list[dict[str, str]]:
+        # History is already rendered and trimmed to its token budget
+        return [
+            {"role": "system", "content": self.system_prompt(username)},
+            *self.message_history.get(username).messages,
+            {"role": "user", "content": message},
+        ]
 
-class OpenAIChat:
-    SYSTEM_PROMPT = "You are a rude human chatter in a chat room who responds to {}. You are rude and abuse anyone who talks to you. You speak tersely."
+    async def complete(self, messages: list[dict[str, str]]) -> str:
+        return await self.backend.complete(messages)
 
-    def __init__(self) -> None:
-        self.message_history: dict[str, LRUCache] = {}
-        self.cache_size = 10
+    def cache_key(self, username: str, message: str) -> CacheKey:
+        # The prompt as sent: a completion written for one user may name them,
+        # so users only share entries when the prompt doesn't
+        return self.cache.key(self.system_prompt(username), message, self.message_history.get(username).history)
 
     async def generate_response(self, username: str, message: str) -> str:
-        cache = self.message_history.setdefault(username, LRUCache(self.cache_size))
-        messages = [{"role": "system", "content": self.SYSTEM_PROMPT.format(username)}]
-
-        for item in cache.cache:
-            messages.extend([
-                {"role": "user", "content": item.message},
-                {"role": "assistant", "content": item.response},
-            ])
-        
-        messages.append({"role": "user", "content": message})
-
-        # Send the request to OpenAI
-        result = await OpenAI.async_chat_create(
-            messages=messages,
-            temperature=0.9,
-        )
+        messages = self.build_messages(username, message)
 
-        content = result.messages[0].content
+        # Send the request to the backend, unless the same prompt was answered recently
+        if self.cache is None:
+            content = await self.complete(messages)
+        else:
+            content = await self.cache.get_or_create(
+                self.cache_key(username, message),
+                lambda: self.complete(messages),
+            )
 
-        # add the message to the cache
-        cache.add(
+        # add the message to the history
+        self.message_history.add(
+            username,
             HistoricalMessage(
                 message=message, 
                 response=content,
@@ -61,6 +74,94 @@ class OpenAIChat:
 
         return f"@{username} {content}"
 
+    def stream_completion(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        return self.backend.stream(messages)
+
+    async def stream_response(self, username: str, message: str) -> AsyncIterator[str]:
+        """
+        Yields chat messages while the completion is still streaming: the
+        first sentence as soon as it is complete, then continuations. History
+        is only recorded once the whole completion has arrived, so an
+        abandoned stream leaves no half-answer behind.
+        """
+        messages = self.build_messages(username, message)
+        chunker = ChatChunker(prefix=f"@{username} ")
+        key = self.cache_key(username, message) if self.cache is not None else None
+        response = self.cache.get(key) if key else None
+
+        if response is None:
+            content = []
+
+            async for delta in self.stream_completion(messages):
+                content.append(delta)
+
+                for chunk in chunker.feed(delta):
+                    yield chunk
+
+            response = "".join(content).strip()
+
+            if key:
+                self.cache.put(key, response)
+        else:
+            for chunk in chunker.feed(response):
+                yield chunk
+
+        for chunk in chunker.close():
+            yield chunk
+
+        self.message_history.add(
+            username,
+            HistoricalMessage(
+                message=message,
+                response=response,
+            )
+        )
+
+    @staticmethod
+    def split_batch_response(content: str, usernames: set[str]) -> dict[str, str]:
+        replies = {}
+
+        for line in content.splitlines():
+            username, separator, reply = line.partition(':')
+            username = username.strip().lstrip('@').lower()
+
+            if separator and username in usernames and reply.strip():
+                replies[username] = reply.strip()
+
+        return replies
+
+    async def generate_batch_response(self, mentions: list[tuple[str, str]]) -> dict[str, str]:
+        """
+        Answers several users with a single completion. Returns the reply per
+        username; users the model skipped are left out for the caller to
+        answer individually.
+        """
+        messages = [
+            {"role": "system", "content": self.BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": "\n".join(f"{username}: {message}" for username, message in mentions)},
+        ]
+
+        content = await self.complete(messages)
+        replies = self.split_batch_response(content, {username.lower() for username, _ in mentions})
+        responses = {}
+
+        for username, message in mentions:
+            reply = replies.get(username.lower())
+
+            if not reply:
+                continue
+
+            self.message_history.add(
+                username,
+                HistoricalMessage(
+                    message=message,
+                    response=reply,
+                )
+            )
+            responses[username] = f"@{username} {reply}"
+
+        return responses
+
 
 class AI:
     def __init__(
@@ -69,32 +170,113 @@ class AI:
         send_queue: asyncio.Queue,
         message_queue: asyncio.Queue,
         flag: asyncio.Event,
-        openai: OpenAI,
+        backend: ChatBackend | None,
+        concurrency: int = 4,
+        max_pending: int | None = None,
+        max_age: float = 60.0,
+        batch_window: float = 0.0,
+        batch_size: int = 8,
+        stream: bool = False,
+        cache: ResponseCache | None = None,
+        history_tokens: int | None = 1000,
     ) -> None:
         self.send_queue = send_queue
         self.message_queue = message_queue
         self.flag = flag
-        self.openai = openai
-        self.response_aliases = [alias.lower() for alias in response_aliases]
-        self.openai_chat = OpenAIChat()
+        self.mentions = MentionMatcher(response_aliases)
+        self.openai_chat = OpenAIChat(backend, cache=cache, history_tokens=history_tokens)
 
-    async def process_messages(self) -> None:
-        while not self.flag.is_set():
-            message: PrivateMessage = await self.message_queue.get()
-            text_message = message.message.lower()
-
-            # If the message contains an @{response_username} or the alias,
-            # then we should respond to it.
-            if any(alias in text_message for alias in self.response_aliases):
-                if '@' in text_message:
-                    text_message = text_message.replace('@', '')
-            
-                response = await self.openai_chat.generate_response(message.username, text_message)
-                
-                # Slap it in the queue
-                await self.send_queue.put(
-                    SendMessage(
-                        channel=message.channel,
-                        message=response,
+        # At most `concurrency` completions run at once, and the scheduler
+        # decides which waiting mention goes next
+        self.concurrency = asyncio.Semaphore(concurrency)
+        self.scheduler = MentionScheduler(max_pending or concurrency * 4, max_age)
+
+        # One worker per completion slot, so mentions wait in the scheduler
+        # rather than on the semaphore; batching needs enough workers to fill
+        # its batches
+        self.worker_count = concurrency * batch_size if batch_window > 0 else concurrency
+
+        # Optionally collapse bursts of mentions in a channel into one completion
+        self.batcher = MentionBatcher(
+            self.openai_chat,
+            batch_window,
+            batch_size,
+            self.concurrency,
+        ) if batch_window > 0 else None
+
+        # Send the first sentence while the rest of the completion streams in
+        self.stream = stream
+
+    def is_mention(self, message: PrivateMessage | FastPrivateMessage) -> bool:
+        # If the message contains an @{response_username} or the alias as a
+        # word, then we should respond to it.
+        return message.message in self.mentions
+
+    def summary(self) -> dict[str, object]:
+        cache = self.openai_chat.cache
+
+        return {
+            'backend': self.openai_chat.backend.summary(),
+            'mentions': self.scheduler.stats(),
+            'cache': cache.stats() if cache is not None else None,
+        }
+
+    async def respond(self, message: PrivateMessage | FastPrivateMessage) -> None:
+        text_message = message.message.lower()
+
+        if '@' in text_message:
+            text_message = text_message.replace('@', '')
+
+        if self.stream and not self.batcher:
+            async with self.concurrency:
+                async for chunk in self.openai_chat.stream_response(message.username, text_message):
+                    await self.send_queue.put(
+                        SendMessage(
+                            channel=message.channel,
+                            message=chunk,
+                        )
                     )
-                )
+
+            return
+
+        if self.batcher:
+            response = await self.batcher.submit(message.channel, message.username, text_message)
+        else:
+            async with self.concurrency:
+                response = await self.openai_chat.generate_response(message.username, text_message)
+
+        # Slap it in the queue
+        await self.send_queue.put(
+            SendMessage(
+                channel=message.channel,
+                message=response,
+            )
+        )
+
+    async def worker(self) -> None:
+        while True:
+            message = await self.scheduler.get()
+
+            try:
+                await self.respond(message)
+            except Exception:
+                logger.exception("Failed to respond to %s", message.username)
+            finally:
+                self.scheduler.done(message)
+
+    async def process_messages(self) -> None:
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.worker_count)]
+
+        try:
+            while not self.flag.is_set():
+                message: PrivateMessage | FastPrivateMessage = await self.message_queue.get()
+
+                if self.is_mention(message):
+                    self.scheduler.put(message)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            # Lets each cancelled completion unwind, and release its mention,
+            # before returning
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,179 @@
+import abc
+import json
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+from async_openai import OpenAI
+from async_openai.schemas.chat import MessageKind
+
+from app.metrics import Histogram
+
+
+class BackendException(Exception):
+    pass
+
+
+class ChatBackend(abc.ABC):
+    """
+    Somewhere to send chat completions. Subclasses implement `request` and
+    `request_stream`; callers use `complete` and `stream`, which record the
+    latency of every completion (and, for streams, of the first token).
+    """
+    name: str = "backend"
+
+    def __init__(self, temperature: float = 0.9) -> None:
+        self.temperature = temperature
+        self.latency = Histogram()
+        self.first_token = Histogram()
+        self.errors = 0
+
+    @abc.abstractmethod
+    async def request(self, messages: list[dict[str, str]]) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def request_stream(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def complete(self, messages: list[dict[str, str]]) -> str:
+        started = time.monotonic()
+
+        try:
+            content = await self.request(messages)
+        except Exception:
+            self.errors += 1
+            raise
+
+        self.latency.observe(time.monotonic() - started)
+        return content
+
+    async def stream(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        started = time.monotonic()
+        first = True
+
+        try:
+            async for delta in self.request_stream(messages):
+                if first:
+                    self.first_token.observe(time.monotonic() - started)
+                    first = False
+
+                yield delta
+        except Exception:
+            self.errors += 1
+            raise
+
+        self.latency.observe(time.monotonic() - started)
+
+    async def close(self) -> None:
+        pass
+
+    def summary(self) -> dict[str, object]:
+        return {
+            'backend': self.name,
+            'errors': self.errors,
+            'latency': self.latency.summary(),
+            'first_token': self.first_token.summary(),
+        }
+
+
+class OpenAIBackend(ChatBackend):
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str | None = None,
+        temperature: float = 0.9,
+    ) -> None:
+        super().__init__(temperature)
+
+        # Without a key, async_openai falls back to OPENAI_API_KEY
+        if api_key:
+            OpenAI.configure(api_key=api_key)
+
+        self.options = {'model': model} if model else {}
+
+    async def request(self, messages: list[dict[str, str]]) -> str:
+        result = await OpenAI.async_chat_create(
+            messages=messages,
+            temperature=self.temperature,
+            **self.options,
+        )
+
+        return result.messages[0].content
+
+    async def request_stream(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        result = await OpenAI.async_chat_create(
+            messages=messages,
+            temperature=self.temperature,
+            stream=True,
+            parse_stream=False,
+            **self.options,
+        )
+
+        async for item in result.astream():
+            if item.kind == MessageKind.CONTENT and item.value:
+                yield item.value
+
+
+class HTTPBackend(ChatBackend):
+    """
+    Speaks the chat completions wire format (JSON, or server-sent events
+    when streaming) through a pooled httpx client, sending `api_key` as a
+    bearer token. That covers the local stub in app.stub_server and
+    OpenAI-compatible servers. Connections are kept alive between
+    completions, so connection setup stays out of the latency histograms.
+    """
+    name = "http"
+
+    def __init__(
+        self,
+        url: str = "http://localhost:8080/v1/chat/completions",
+        temperature: float = 0.9,
+        timeout: float = 60.0,
+        api_key: str | None = None,
+        max_connections: int = 10,
+    ) -> None:
+        super().__init__(temperature)
+
+        self.url = url
+        self.client = httpx.AsyncClient(
+            headers={'Authorization': f"Bearer {api_key}"} if api_key else None,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    async def raise_for_status(self, response: httpx.Response) -> None:
+        if response.status_code != 200:
+            error = await response.aread()
+            raise BackendException(f"{self.name} backend returned {response.status_code}: {error[:200]!r}")
+
+    async def request(self, messages: list[dict[str, str]]) -> str:
+        response = await self.client.post(self.url, json={'messages': messages, 'temperature': self.temperature})
+        await self.raise_for_status(response)
+
+        return response.json()['choices'][0]['message']['content']
+
+    async def request_stream(self, messages: list[dict[str, str]]) -> AsyncIterator[str]:
+        body = {'messages': messages, 'temperature': self.temperature, 'stream': True}
+
+        async with self.client.stream('POST', self.url, json=body) as response:
+            await self.raise_for_status(response)
+
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+
+                data = line[5:].strip()
+
+                if data == '[DONE]':
+                    break
+
+                delta = json.loads(data)['choices'][0]['delta'].get('content')
+
+                if delta:
+                    yield delta
+
+    async def close(self) -> None:
+        await self.client.aclose()
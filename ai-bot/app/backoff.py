@@ -0,0 +1,39 @@
+import asyncio
+import random
+from typing import Callable
+
+
+class Backoff:
+    """
+    Exponential backoff with "equal jitter": each delay is half the current
+    cap plus a random share of the other half. That spreads reconnecting
+    clients out while never retrying immediately.
+    """
+    def __init__(
+        self,
+        initial: float = 1.0,
+        maximum: float = 60.0,
+        factor: float = 2.0,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.rng = rng
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        cap = min(self.maximum, self.initial * self.factor ** self.attempts)
+
+        # Stop counting once at the maximum; the power would overflow a float
+        # after enough attempts in a long outage
+        if cap < self.maximum:
+            self.attempts += 1
+
+        return cap / 2 + cap / 2 * self.rng()
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+    async def wait(self) -> None:
+        await asyncio.sleep(self.next_delay())
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchChat(Protocol):
+    async def generate_response(self, username: str, message: str) -> str:
+        ...
+
+    async def generate_batch_response(self, mentions: list[tuple[str, str]]) -> dict[str, str]:
+        ...
+
+
+class MentionBatcher:
+    """
+    Collects mentions per channel for up to `window` seconds or `max_size`
+    mentions, then answers the whole batch with a single completion. Each
+    caller gets back only its own reply. Users the model skips, and batches
+    of one, fall back to an individual completion.
+    """
+    def __init__(
+        self,
+        chat: BatchChat,
+        window: float = 0.5,
+        max_size: int = 8,
+        concurrency: asyncio.Semaphore | None = None,
+    ) -> None:
+        self.chat = chat
+        self.window = window
+        self.max_size = max_size
+        self.concurrency = concurrency or asyncio.Semaphore(4)
+
+        self.batches: dict[str, list[tuple[str, str, asyncio.Future]]] = {}
+        self.timers: dict[str, asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+        # Completions issued versus mentions answered
+        self.requests = 0
+        self.mentions = 0
+
+    async def submit(self, channel: str, username: str, message: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.batches.setdefault(channel, [])
+        batch.append((username, message, future))
+
+        if len(batch) == 1:
+            self.timers[channel] = loop.call_later(self.window, self.flush, channel)
+
+        if len(batch) >= self.max_size:
+            self.flush(channel)
+
+        return await future
+
+    def flush(self, channel: str) -> None:
+        batch = self.batches.pop(channel, None)
+        timer = self.timers.pop(channel, None)
+
+        if timer:
+            timer.cancel()
+
+        if not batch:
+            return
+
+        task = asyncio.create_task(self.complete(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def respond(self, username: str, message: str) -> str:
+        async with self.concurrency:
+            self.requests += 1
+            return await self.chat.generate_response(username, message)
+
+    async def complete(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        self.mentions += len(batch)
+        responses = {}
+
+        try:
+            if len(batch) > 1:
+                async with self.concurrency:
+                    self.requests += 1
+                    responses = await self.chat.generate_batch_response(
+                        [(username, message) for username, message, _ in batch]
+                    )
+        except Exception:
+            logger.exception("Batch completion failed; answering individually")
+
+        # Batches of one, and anyone the model skipped, get their own completion
+        missing = [(username, message, future) for username, message, future in batch if username not in responses]
+        results = await asyncio.gather(
+            *(self.respond(username, message) for username, message, _ in missing),
+            return_exceptions=True,
+        )
+
+        for (username, _, future), result in zip(missing, results):
+            if future.done():
+                continue
+
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                responses[username] = result
+
+        for username, _, future in batch:
+            if not future.done():
+                future.set_result(responses[username])
@@ -1,9 +1,60 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.queues import OverflowPolicy
+
 
 class Configuration(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env')
 
     twitch_username: str
     twitch_oauth_token: str
-    openai_api_key: str
+    # Not needed with the http backend
+    openai_api_key: str | None = None
+    openai_model: str | None = None
+
+    # 'openai', or 'http' for a chat completions endpoint such as app.stub_server
+    ai_backend: str = 'openai'
+    ai_backend_url: str = "http://localhost:8080/v1/chat/completions"
+    # Sent as a bearer token to the http backend, if set
+    ai_backend_api_key: str | None = None
+
+    # Defaults to the bot's own channel when empty
+    twitch_channels: list[str] = []
+    twitch_connections: int = 1
+
+    # Queue bounds; 0 means unbounded. The message queue takes every chat
+    # message (PRIVMSG) read, before mentions are picked out
+    message_queue_size: int = 1000
+    message_queue_policy: OverflowPolicy = OverflowPolicy.PRIORITY
+    send_queue_size: int = 100
+    send_queue_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+
+    # Tokens of conversation history sent with each prompt, estimated locally
+    ai_history_tokens: int = 1000
+
+    # Completions allowed in flight at once
+    ai_concurrency: int = 4
+    # Mentions waiting longer than this many seconds are dropped unanswered
+    ai_max_age: float = 60.0
+
+    # Seconds to collect mentions per channel into one completion; 0 disables
+    ai_batch_window: float = 0.0
+    ai_batch_size: int = 8
+
+    # Send the first sentence of a completion before the rest has arrived
+    ai_stream: bool = False
+
+    # Completions cached by normalized message; 0 entries disables the cache
+    ai_cache_size: int = 1024
+    ai_cache_ttl: float = 300.0
+    # Only reuse a completion when the user's conversation so far matches too
+    ai_cache_history: bool = True
+
+    # SQLite file for warm restarts of conversation history and channel
+    # state; unset disables snapshots
+    snapshot_path: str | None = None
+    snapshot_interval: float = 60.0
+
+    # Seconds between logged queue, ingest, outbound and backend stats; 0
+    # logs them only on shutdown
+    stats_interval: float = 60.0
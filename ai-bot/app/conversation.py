@@ -0,0 +1,203 @@
+import collections
+import functools
+import sys
+from collections.abc import Callable, Mapping
+
+import pydantic
+
+from app.tokens import count_message_tokens
+
+
+class HistoricalMessage(pydantic.BaseModel):
+    message: str
+    response: str
+
+    @property
+    def size(self) -> int:
+        """
+        Approximate bytes held by the message text.
+        """
+        return sys.getsizeof(self.message) + sys.getsizeof(self.response)
+
+    @functools.cached_property
+    def messages(self) -> list[dict[str, str]]:
+        return [
+            {"role": "user", "content": self.message},
+            {"role": "assistant", "content": self.response},
+        ]
+
+    @functools.cached_property
+    def tokens(self) -> int:
+        return sum(count_message_tokens(message) for message in self.messages)
+
+
+class Conversation:
+    """
+    Ring of the most recent exchanges with one user, capped in exchanges and
+    optionally in tokens. The history is also kept rendered as chat messages,
+    updated as turns come and go, so prompts reuse the same message objects
+    and only ever gain turns at the end and lose them at the start.
+    """
+    def __init__(self, size: int, max_tokens: int | None = None) -> None:
+        self.history: collections.deque[HistoricalMessage] = collections.deque(maxlen=size)
+        self.messages: list[dict[str, str]] = []
+        self.max_tokens = max_tokens
+        self.bytes = 0
+        self.tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    def add(self, item: HistoricalMessage) -> int:
+        """
+        Appends item, dropping the oldest exchanges while over the exchange
+        or token cap; item itself is kept even if it alone is over the token
+        cap. Returns the change in bytes held.
+        """
+        before = self.bytes
+
+        if self.history and len(self.history) == self.history.maxlen:
+            self.pop_oldest()
+
+        self.history.append(item)
+        self.messages.extend(item.messages)
+        self.bytes += item.size
+        self.tokens += item.tokens
+
+        while self.max_tokens is not None and len(self.history) > 1 and self.tokens > self.max_tokens:
+            self.pop_oldest()
+
+        return self.bytes - before
+
+    def pop_oldest(self) -> int:
+        item = self.history.popleft()
+        del self.messages[:len(item.messages)]
+        self.bytes -= item.size
+        self.tokens -= item.tokens
+
+        return item.size
+
+
+class ConversationStore:
+    """
+    Per-user conversations, capped both in users and in bytes, each trimmed
+    to `max_tokens` of history. Whenever the user or byte cap is exceeded the
+    least recently used conversations are evicted whole; the conversation in
+    use is only ever trimmed.
+
+    With `restore`, a user's history is loaded from a snapshot the first time
+    they are seen. Changed conversations are tracked until `take_dirty`, even
+    after eviction, so a snapshot never loses them.
+    """
+    def __init__(
+        self,
+        history_size: int = 10,
+        max_users: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_tokens: int | None = None,
+        restore: Callable[[str], list[HistoricalMessage] | None] | None = None,
+    ) -> None:
+        self.history_size = history_size
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.restore = restore
+
+        self.conversations: collections.OrderedDict[str, Conversation] = collections.OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.restored = 0
+
+        # Users changed since the last snapshot, and the history of those
+        # evicted before it was taken
+        self.dirty: set[str] = set()
+        self.unsaved: dict[str, list[HistoricalMessage]] = {}
+
+    def __len__(self) -> int:
+        return len(self.conversations)
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.conversations
+
+    def get(self, username: str) -> Conversation:
+        conversation = self.conversations.get(username)
+
+        if conversation is None:
+            conversation = self.conversations[username] = Conversation(self.history_size, self.max_tokens)
+
+            for item in self.load(username):
+                self.bytes += conversation.add(item)
+
+            self.evict()
+        else:
+            self.conversations.move_to_end(username)
+
+        return conversation
+
+    def load(self, username: str) -> list[HistoricalMessage]:
+        history = self.unsaved.pop(username, None)
+
+        if history is not None:
+            self.dirty.add(username)
+            return history
+
+        history = self.restore(username) if self.restore else None
+
+        if history:
+            self.restored += 1
+
+        return history or []
+
+    def add(self, username: str, item: HistoricalMessage) -> None:
+        self.bytes += self.get(username).add(item)
+        self.dirty.add(username)
+        self.evict()
+
+    def take_dirty(self) -> dict[str, list[HistoricalMessage]]:
+        """
+        The history of every user changed since the last call.
+        """
+        dirty = self.unsaved
+
+        for username in self.dirty:
+            if username in self.conversations:
+                dirty[username] = list(self.conversations[username].history)
+
+        self.dirty = set()
+        self.unsaved = {}
+
+        return dirty
+
+    def mark_dirty(self, conversations: Mapping[str, list[HistoricalMessage]]) -> None:
+        for username, history in conversations.items():
+            if username in self.conversations:
+                self.dirty.add(username)
+            else:
+                self.unsaved.setdefault(username, history)
+
+    def evict(self) -> None:
+        while len(self.conversations) > 1 and (
+            len(self.conversations) > self.max_users or self.bytes > self.max_bytes
+        ):
+            username, conversation = self.conversations.popitem(last=False)
+            self.bytes -= conversation.bytes
+            self.evictions += 1
+
+            if username in self.dirty:
+                self.dirty.discard(username)
+                self.unsaved[username] = list(conversation.history)
+
+        # A single conversation larger than the budget loses its oldest turns
+        if self.conversations and self.bytes > self.max_bytes:
+            conversation = next(reversed(self.conversations.values()))
+
+            while conversation and self.bytes > self.max_bytes:
+                self.bytes -= conversation.pop_oldest()
+
+    def memory_usage(self) -> dict[str, int]:
+        return {
+            'users': len(self.conversations),
+            'exchanges': sum(len(conversation) for conversation in self.conversations.values()),
+            'bytes': self.bytes,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from collections.abc import Mapping
+
+import websockets
+
+from app.backoff import Backoff
+from app.outbound import OutboundScheduler
+from app.queues import BoundedQueue, OverflowPolicy
+from app.rate_limit import TokenBucket
+from app.twitch_irc import SendMessage, TwitchIRC
+
+
+class TwitchIRCPool:
+    """
+    Spreads channels over several TwitchIRC connections. Every channel lives
+    on exactly one connection, so its messages reach `message_queue` in the
+    order Twitch sent them. Outbound messages are routed to the connection
+    that owns the channel. Channels of a closed connection move to the live
+    ones and are spread back out once it reconnects.
+    """
+    def __init__(
+        self,
+        twitch_username: str,
+        access_token: str,
+        channels: list[str],
+        send_queue: asyncio.Queue,
+        message_queue: asyncio.Queue,
+        flag: asyncio.Event,
+        connections: int = 2,
+        twitch_ws_uri: str | None = None,
+        **kwargs,
+    ) -> None:
+        self.send_queue = send_queue
+        self.message_queue = message_queue
+        self.flag = flag
+
+        # The JOIN and message limits apply to the account, not to each
+        # connection
+        self.join_limiter = TokenBucket(20, 10.0)
+        self.normal_bucket = TokenBucket(20, 30.0)
+        self.privileged_bucket = TokenBucket(100, 30.0)
+        self.shards = [
+            TwitchIRC(
+                twitch_username,
+                access_token,
+                channels=[],
+                # Bounded so one backed-up connection sheds its own oldest
+                # messages rather than stalling routing for the others
+                send_queue=BoundedQueue(send_queue.maxsize, OverflowPolicy.DROP_OLDEST),
+                message_queue=message_queue,
+                flag=flag,
+                twitch_ws_uri=twitch_ws_uri,
+                join_limiter=self.join_limiter,
+                scheduler=OutboundScheduler(self.normal_bucket, self.privileged_bucket),
+                **kwargs,
+            )
+            for _ in range(max(1, connections))
+        ]
+        self.channel_shards: dict[str, TwitchIRC] = {}
+
+        for channel in channels:
+            shard = self.least_loaded(self.shards)
+            shard.channels.append(channel)
+            self.channel_shards[channel] = shard
+
+    @property
+    def channels(self) -> list[str]:
+        return list(self.channel_shards)
+
+    @staticmethod
+    def least_loaded(shards: list[TwitchIRC]) -> TwitchIRC:
+        return min(shards, key=lambda shard: len(shard.channels))
+
+    @staticmethod
+    def most_loaded(shards: list[TwitchIRC]) -> TwitchIRC:
+        return max(shards, key=lambda shard: len(shard.channels))
+
+    async def join(self, channel: str) -> None:
+        if channel in self.channel_shards:
+            return
+
+        live = [shard for shard in self.shards if shard.websocket] or self.shards
+        shard = self.least_loaded(live)
+        self.channel_shards[channel] = shard
+
+        await shard.join(channel)
+
+    async def part(self, channel: str) -> None:
+        shard = self.channel_shards.pop(channel, None)
+
+        if shard:
+            await shard.part(channel)
+
+    def channel_states(self) -> dict[str, dict[str, bool | int]]:
+        # A channel that moved keeps stale state on its old connection
+        return {
+            channel: state
+            for shard in self.shards
+            for channel, state in shard.channel_states().items()
+            if self.channel_shards.get(channel) is shard
+        }
+
+    def restore_channel_states(self, states: Mapping[str, Mapping[str, bool | int]]) -> None:
+        for channel, state in states.items():
+            if channel in self.channel_shards:
+                self.channel_shards[channel].restore_channel_states({channel: state})
+
+    def summary(self) -> dict[str, object]:
+        return {
+            'shards': [
+                shard.summary() | {'channels': len(shard.channels), 'send_queue': shard.send_queue.stats()}
+                for shard in self.shards
+            ],
+        }
+
+    async def route_send_queue(self) -> None:
+        while not self.flag.is_set():
+            message: SendMessage = await self.send_queue.get()
+            shard = self.channel_shards.get(message.channel, self.shards[0])
+
+            await shard.send_queue.put(message)
+
+    async def rebalance(self, dead: TwitchIRC) -> None:
+        """
+        Moves the channels of a closed connection onto the live ones. The
+        closed connection comes back empty and reclaims its share once it
+        reconnects.
+        """
+        live = [shard for shard in self.shards if shard is not dead and shard.websocket]
+
+        # Nowhere to move to; the connection reconnects and rejoins everything
+        if not live:
+            return
+
+        channels, dead.channels = dead.channels, []
+        pending = dead.scheduler.drain()
+
+        while not dead.send_queue.empty():
+            pending.append(dead.send_queue.get_nowait())
+
+        for channel in channels:
+            shard = self.least_loaded(live)
+            self.channel_shards[channel] = shard
+
+            await shard.join(channel)
+
+        for message in pending:
+            await self.channel_shards.get(message.channel, live[0]).send_queue.put(message)
+
+    async def reclaim(self, shard: TwitchIRC) -> None:
+        """
+        Moves channels from the most loaded live connections onto shard until
+        no connection has more than one channel over it. Joins go through the
+        shared join limiter.
+        """
+        while True:
+            others = [other for other in self.shards if other is not shard and other.websocket]
+
+            if not others or not shard.websocket:
+                return
+
+            donor = self.most_loaded(others)
+
+            if len(donor.channels) - len(shard.channels) <= 1:
+                return
+
+            # Owned by shard before anything is sent, so a cancelled move
+            # still leaves the channel on exactly one connection
+            channel = donor.channels[-1]
+            self.channel_shards[channel] = shard
+            shard.channels.append(channel)
+
+            await donor.part(channel)
+            await shard.join(channel)
+
+    async def reclaim_on_connect(self, shard: TwitchIRC) -> None:
+        await shard.connected.wait()
+        await self.reclaim(shard)
+
+    async def supervise(self, shard: TwitchIRC) -> None:
+        backoff = Backoff()
+
+        while not self.flag.is_set():
+            started = time.monotonic()
+            reclaiming = asyncio.create_task(self.reclaim_on_connect(shard))
+
+            try:
+                await shard.run()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException):
+                pass
+            finally:
+                reclaiming.cancel()
+                await asyncio.gather(reclaiming, return_exceptions=True)
+
+            if self.flag.is_set():
+                break
+
+            await self.rebalance(shard)
+
+            if time.monotonic() - started >= shard.STABLE_CONNECTION:
+                backoff.reset()
+
+            await backoff.wait()
+
+    async def run_forever(self) -> None:
+        await asyncio.gather(
+            self.route_send_queue(),
+            *(self.supervise(shard) for shard in self.shards),
+        )
@@ -1,41 +1,131 @@
 import asyncio
+import logging
 
+from app.backends import ChatBackend, HTTPBackend, OpenAIBackend
 from app.config import Configuration
+from app.irc_pool import TwitchIRCPool
+from app.queues import BoundedQueue
+from app.response_cache import ResponseCache
+from app.snapshots import Snapshotter, SnapshotStore
+from app.stats import StatsReporter
+from app.tokens import load_encoding
 from app.twitch_irc import TwitchIRC
 
 from app.ai import AI
 
 
+def create_backend(configuration: Configuration) -> ChatBackend:
+    if configuration.ai_backend == HTTPBackend.name:
+        return HTTPBackend(configuration.ai_backend_url, api_key=configuration.ai_backend_api_key)
+
+    if configuration.ai_backend == OpenAIBackend.name:
+        return OpenAIBackend(configuration.openai_api_key, configuration.openai_model)
+
+    raise ValueError(f"Unknown AI backend {configuration.ai_backend!r}")
+
+
 async def main():
     configuration = Configuration()
-    send_queue = asyncio.Queue()
-    message_queue = asyncio.Queue()
-    flag = asyncio.Event()
+    await load_encoding()
 
-    client = TwitchIRC(
-        configuration.twitch_username,
-        configuration.twitch_oauth_token,
-        channels=[configuration.twitch_username],
-        send_queue=send_queue,
-        message_queue=message_queue,
-        flag=flag,
+    send_queue = BoundedQueue(
+        configuration.send_queue_size,
+        configuration.send_queue_policy,
     )
+    message_queue = BoundedQueue(
+        configuration.message_queue_size,
+        configuration.message_queue_policy,
+        # Holds every chat message, not only mentions; when full, messages
+        # from the lowest ranking chatters go first
+        priority=lambda message: message.role,
+    )
+    flag = asyncio.Event()
+
+    channels = configuration.twitch_channels or [configuration.twitch_username]
+
+    if configuration.twitch_connections > 1:
+        client = TwitchIRCPool(
+            configuration.twitch_username,
+            configuration.twitch_oauth_token,
+            channels=channels,
+            send_queue=send_queue,
+            message_queue=message_queue,
+            flag=flag,
+            connections=configuration.twitch_connections,
+        )
+    else:
+        client = TwitchIRC(
+            configuration.twitch_username,
+            configuration.twitch_oauth_token,
+            channels=channels,
+            send_queue=send_queue,
+            message_queue=message_queue,
+            flag=flag,
+        )
 
+    backend = create_backend(configuration)
     ai = AI(
         [configuration.twitch_username, 'cannibal'],
         send_queue,
         message_queue,
         flag,
-        configuration.openai_api_key,
+        backend,
+        concurrency=configuration.ai_concurrency,
+        max_age=configuration.ai_max_age,
+        batch_window=configuration.ai_batch_window,
+        batch_size=configuration.ai_batch_size,
+        stream=configuration.ai_stream,
+        history_tokens=configuration.ai_history_tokens,
+        cache=ResponseCache(
+            configuration.ai_cache_size,
+            configuration.ai_cache_ttl,
+            configuration.ai_cache_history,
+        ) if configuration.ai_cache_size > 0 else None,
     )
 
-    while True:
-        await asyncio.gather(
-            client.run(),
-            ai.process_messages(),
-        )
+    tasks = [
+        # The IRC client reconnects on its own, with backoff
+        client.run_forever(),
+        ai.process_messages(),
+    ]
+    snapshotter = None
+
+    if configuration.snapshot_path:
+        store = SnapshotStore(configuration.snapshot_path)
+        conversations = ai.openai_chat.message_history
+
+        # History comes back lazily, as each user is first seen
+        conversations.restore = store.load_conversation
+        client.restore_channel_states(store.load_channels())
+
+        snapshotter = Snapshotter(store, conversations, client, configuration.snapshot_interval)
+        tasks.append(snapshotter.run())
+
+    reporter = StatsReporter(
+        {
+            'message_queue': message_queue.stats,
+            'send_queue': send_queue.stats,
+            'irc': client.summary,
+            'ai': ai.summary,
+        },
+        configuration.stats_interval,
+    )
+
+    if configuration.stats_interval > 0:
+        tasks.append(reporter.run())
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        reporter.report()
+        await backend.close()
+
+        if snapshotter:
+            snapshotter.save()
+            snapshotter.store.close()
 
     # ai should have sentiment for particular users, defaulting to unpositive
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
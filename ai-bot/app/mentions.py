@@ -0,0 +1,45 @@
+import re
+from typing import NamedTuple
+
+
+class Mention(NamedTuple):
+    alias: str
+    start: int
+    end: int
+
+
+class MentionMatcher:
+    """
+    Finds any of a set of aliases in chat text, case-insensitively and only
+    as whole words: "cannibal" matches "@Cannibal hi" but not "cannibalism".
+    All aliases are compiled into one pattern, so a line is scanned once
+    however many aliases there are.
+
+    The word-boundary lookbehind stops the regex engine from skipping ahead
+    to a literal, so lines are first screened with a plain alternation over
+    the lowercased text; most chat mentions nobody and stops there.
+    """
+    def __init__(self, aliases: list[str]) -> None:
+        # Longest first, so "bot" never shadows "bot jr" at the same position
+        self.aliases = sorted({alias.lower() for alias in aliases if alias}, key=len, reverse=True)
+        alternation = '|'.join(map(re.escape, self.aliases))
+
+        self.screen = re.compile(alternation) if self.aliases else None
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)', re.IGNORECASE) if self.aliases else None
+
+    def search(self, text: str) -> Mention | None:
+        """
+        The first alias in text, and where it is.
+        """
+        if self.pattern is None or self.screen.search(text.lower()) is None:
+            return None
+
+        match = self.pattern.search(text)
+
+        if match is None:
+            return None
+
+        return Mention(match.group().lower(), match.start(), match.end())
+
+    def __contains__(self, text: str) -> bool:
+        return self.search(text) is not None
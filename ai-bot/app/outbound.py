@@ -0,0 +1,220 @@
+from __future__ import annotations
+import asyncio
+import collections
+from collections.abc import Mapping
+import time
+from typing import TYPE_CHECKING, Callable
+
+from app.metrics import Histogram
+from app.rate_limit import TokenBucket
+
+if TYPE_CHECKING:
+    from app.twitch_irc import SendMessage
+
+
+class ChannelState:
+    """
+    What the bot knows about itself in a channel, from USERSTATE and ROOMSTATE.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.moderator = False
+        self.vip = False
+        self.slow = 0
+        self.bucket: TokenBucket | None = None
+        self.limits: tuple[bool, int] | None = None
+        self.update_bucket(clock)
+
+    @property
+    def privileged(self) -> bool:
+        return self.moderator or self.vip
+
+    def update_bucket(self, clock: Callable[[], float]) -> None:
+        # Twitch sends USERSTATE after every message the bot sends; only a
+        # change in limits may replace the bucket, or each one would reset it
+        if self.limits == (self.privileged, self.slow):
+            return
+
+        self.limits = (self.privileged, self.slow)
+        previous = self.bucket
+
+        # Moderators, VIPs and the broadcaster are exempt from slow mode and
+        # the one message per second channel limit
+        if self.privileged:
+            self.bucket = None
+            return
+
+        self.bucket = TokenBucket(1, max(1.0, float(self.slow)), clock=clock)
+
+        if previous:
+            previous.refill()
+            self.bucket.tokens = min(self.bucket.capacity, previous.tokens)
+
+
+class OutboundScheduler:
+    """
+    Holds outbound messages per channel and releases them within Twitch's
+    rate limits: 20 messages per 30 seconds across channels where the bot is
+    a regular user, 100 per 30 seconds in total, and per-channel slow mode.
+    Channels with pending messages are served round-robin.
+    """
+    def __init__(
+        self,
+        normal_bucket: TokenBucket | None = None,
+        privileged_bucket: TokenBucket | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_pending: int = 100,
+    ) -> None:
+        self.clock = clock
+        self.max_pending = max_pending
+        self.normal_bucket = normal_bucket or TokenBucket(20, 30.0, clock=clock)
+        self.privileged_bucket = privileged_bucket or TokenBucket(100, 30.0, clock=clock)
+        self.channels: dict[str, ChannelState] = {}
+        self.pending: dict[str, collections.deque[tuple[float, SendMessage]]] = {}
+        self.rotation: collections.deque[str] = collections.deque()
+        self.wait_times = Histogram()
+        self.event = asyncio.Event()
+        self.space = asyncio.Event()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    async def wait_for_space(self) -> None:
+        """
+        Waits until fewer than max_pending messages are held, so that a backlog
+        stays in the (bounded) send queue instead of growing here.
+        """
+        while self.size >= self.max_pending:
+            self.space.clear()
+            await self.space.wait()
+
+    def channel_state(self, channel: str) -> ChannelState:
+        state = self.channels.get(channel)
+
+        if not state:
+            state = self.channels[channel] = ChannelState(self.clock)
+
+        return state
+
+    def update_user_state(self, channel: str, tags: Mapping[str, str]) -> None:
+        state = self.channel_state(channel)
+        badges = tags.get('badges') or ''
+
+        state.moderator = tags.get('mod') == '1' or 'broadcaster/' in badges
+        state.vip = tags.get('vip') == '1' or 'vip/' in badges
+        state.update_bucket(self.clock)
+
+    def update_room_state(self, channel: str, tags: Mapping[str, str]) -> None:
+        # ROOMSTATE updates only carry the settings that changed
+        slow = tags.get('slow')
+
+        if slow is None:
+            return
+
+        state = self.channel_state(channel)
+        state.slow = int(slow)
+        state.update_bucket(self.clock)
+
+    def snapshot(self) -> dict[str, dict[str, bool | int]]:
+        return {
+            channel: {'moderator': state.moderator, 'vip': state.vip, 'slow': state.slow}
+            for channel, state in self.channels.items()
+        }
+
+    def restore(self, states: Mapping[str, Mapping[str, bool | int]]) -> None:
+        """
+        Seeds channel state from a snapshot until USERSTATE and ROOMSTATE
+        arrive, so the first messages after a restart are paced correctly.
+        """
+        for channel, saved in states.items():
+            state = self.channel_state(channel)
+            state.moderator = bool(saved.get('moderator'))
+            state.vip = bool(saved.get('vip'))
+            state.slow = int(saved.get('slow', 0))
+            state.update_bucket(self.clock)
+
+    def put(self, message: SendMessage, front: bool = False) -> None:
+        messages = self.pending.setdefault(message.channel, collections.deque())
+
+        if front:
+            messages.appendleft((self.clock(), message))
+        else:
+            messages.append((self.clock(), message))
+
+        if message.channel not in self.rotation:
+            self.rotation.append(message.channel)
+
+        self.size += 1
+        self.event.set()
+
+    def drain(self) -> list[SendMessage]:
+        messages = [message for pending in self.pending.values() for _, message in pending]
+
+        self.pending.clear()
+        self.rotation.clear()
+        self.size = 0
+        self.space.set()
+
+        return messages
+
+    def buckets(self, channel: str) -> list[TokenBucket]:
+        state = self.channel_state(channel)
+        buckets = [self.privileged_bucket]
+
+        if not state.privileged:
+            buckets.append(self.normal_bucket)
+
+        if state.bucket:
+            buckets.append(state.bucket)
+
+        return buckets
+
+    def pop_ready(self) -> tuple[SendMessage | None, float | None]:
+        """
+        Returns the next message that may be sent now, otherwise the number of
+        seconds until one might be (None when nothing is pending).
+        """
+        wait = None
+
+        for _ in range(len(self.rotation)):
+            channel = self.rotation.popleft()
+            buckets = self.buckets(channel)
+            delay = max(bucket.delay() for bucket in buckets)
+
+            if delay > 0:
+                self.rotation.append(channel)
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            for bucket in buckets:
+                bucket.try_acquire()
+
+            messages = self.pending[channel]
+            queued_at, message = messages.popleft()
+
+            if messages:
+                self.rotation.append(channel)
+            else:
+                del self.pending[channel]
+
+            self.size -= 1
+            self.space.set()
+
+            self.wait_times.observe(self.clock() - queued_at)
+            return message, None
+
+        return None, wait
+
+    async def get(self) -> SendMessage:
+        while True:
+            message, wait = self.pop_ready()
+
+            if message:
+                return message
+
+            self.event.clear()
+
+            try:
+                await asyncio.wait_for(self.event.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,139 @@
+import asyncio
+import collections
+import enum
+from typing import Any, Callable
+
+
+class OverflowPolicy(str, enum.Enum):
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+    PRIORITY = 'priority'
+
+
+class BoundedQueue(asyncio.Queue):
+    """
+    asyncio.Queue whose behaviour when full is chosen by an OverflowPolicy.
+    Apart from BLOCK, put() never waits; the queue instead makes room by
+    evicting a queued item or by dropping the new one. With PRIORITY the
+    lowest-priority item goes (the oldest among equals), unless the new
+    item ranks lower still.
+
+    With PRIORITY, items are also kept in a deque per priority, so finding
+    and evicting the item to go takes time in the number of priorities
+    rather than the number of items. Evicted items stay in the FIFO as
+    tombstones until they reach the front or there are enough of them to
+    be worth compacting away.
+    """
+    def __init__(
+        self,
+        maxsize: int = 0,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        priority: Callable[[Any], int] | None = None,
+    ) -> None:
+        super().__init__(maxsize)
+
+        self.policy = OverflowPolicy(policy)
+        self.priority = priority or (lambda item: 0)
+
+        # Items rejected on put, and queued items pushed out to make room
+        self.dropped = 0
+        self.evicted = 0
+
+    def _init(self, maxsize: int) -> None:
+        super()._init(maxsize)
+
+        # Entries are [item, priority, queued]; only used with PRIORITY
+        self.levels: dict[int, collections.deque[list]] = collections.defaultdict(collections.deque)
+        self.live = 0
+        self.tombstones = 0
+
+    def _put(self, item: Any) -> None:
+        if self.policy != OverflowPolicy.PRIORITY:
+            return super()._put(item)
+
+        entry = [item, self.priority(item), True]
+        self._queue.append(entry)
+        self.levels[entry[1]].append(entry)
+        self.live += 1
+
+    def _get(self) -> Any:
+        if self.policy != OverflowPolicy.PRIORITY:
+            return super()._get()
+
+        # purge() keeps a queued entry at the front
+        item, priority, _ = self._queue.popleft()
+        self.levels[priority].popleft()
+        self.live -= 1
+        self.purge()
+
+        return item
+
+    def qsize(self) -> int:
+        if self.policy != OverflowPolicy.PRIORITY:
+            return super().qsize()
+
+        return self.live
+
+    def purge(self) -> None:
+        while self._queue and not self._queue[0][2]:
+            self._queue.popleft()
+            self.tombstones -= 1
+
+        if self.tombstones > max(64, self.live):
+            self._queue = collections.deque(entry for entry in self._queue if entry[2])
+            self.tombstones = 0
+
+    @property
+    def lost(self) -> int:
+        return self.dropped + self.evicted
+
+    def evict_for(self, item: Any) -> bool:
+        """
+        Makes room for item, returning False if item itself should be dropped.
+        """
+        if self.policy == OverflowPolicy.DROP_NEWEST:
+            return False
+
+        if self.policy == OverflowPolicy.DROP_OLDEST:
+            del self._queue[0]
+        else:
+            lowest = min(priority for priority, entries in self.levels.items() if entries)
+
+            if self.priority(item) < lowest:
+                return False
+
+            # The oldest among the lowest priority
+            entry = self.levels[lowest].popleft()
+            entry[2] = False
+            self.live -= 1
+            self.tombstones += 1
+            self.purge()
+
+        # The evicted item will never be fetched, so account for it here
+        self.task_done()
+        self.evicted += 1
+
+        return True
+
+    def put_nowait(self, item: Any) -> None:
+        if self.full() and self.policy != OverflowPolicy.BLOCK:
+            if not self.evict_for(item):
+                self.dropped += 1
+                return
+
+        super().put_nowait(item)
+
+    async def put(self, item: Any) -> None:
+        if self.policy == OverflowPolicy.BLOCK:
+            return await super().put(item)
+
+        self.put_nowait(item)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': self.qsize(),
+            'maxsize': self.maxsize,
+            'dropped': self.dropped,
+            'evicted': self.evicted,
+        }
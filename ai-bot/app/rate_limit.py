@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Allows `capacity` actions per `per` seconds, refilling continuously.
+    """
+    def __init__(
+        self,
+        capacity: float,
+        per: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.per = per
+        self.rate = capacity / per
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self.refill()
+
+        if self.tokens < tokens:
+            return False
+
+        self.tokens -= tokens
+        return True
+
+    def delay(self, tokens: float = 1) -> float:
+        """
+        Seconds until `tokens` will be available.
+        """
+        self.refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1) -> None:
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
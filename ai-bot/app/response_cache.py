@@ -0,0 +1,162 @@
+import asyncio
+import collections
+import hashlib
+import string
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import NamedTuple
+
+from app.conversation import HistoricalMessage
+
+
+class CacheKey(NamedTuple):
+    persona: str
+    message: str
+    history: str | None
+
+
+class ResponseCache:
+    """
+    Completions keyed on normalized message text and persona, and optionally
+    on a fingerprint of the conversation so far. Entries expire after `ttl`
+    seconds and the least recently used go first once `max_entries` is
+    reached. Concurrent misses on the same key share a single completion.
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        history: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.history = history
+        self.clock = clock
+
+        self.entries: collections.OrderedDict[CacheKey, tuple[float, str]] = collections.OrderedDict()
+        self.inflight: dict[CacheKey, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """
+        Folds case, mentions, spacing and surrounding punctuation, so that
+        "@Bot  hi!" and "bot hi" share an entry.
+        """
+        text = ' '.join(message.casefold().replace('@', '').split())
+        return text.strip(string.punctuation + ' ')
+
+    @staticmethod
+    def fingerprint(history: Iterable[HistoricalMessage]) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+
+        for item in history:
+            digest.update(item.message.encode())
+            digest.update(b'\0')
+            digest.update(item.response.encode())
+            digest.update(b'\0')
+
+        return digest.hexdigest()
+
+    def key(self, persona: str, message: str, history: Iterable[HistoricalMessage] = ()) -> CacheKey:
+        return CacheKey(
+            persona,
+            self.normalize(message),
+            self.fingerprint(history) if self.history else None,
+        )
+
+    def get(self, key: CacheKey) -> str | None:
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires, value = entry
+
+        if expires <= self.clock():
+            del self.entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key: CacheKey, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_or_create(self, key: CacheKey, create: Callable[[], Awaitable[str]]) -> str:
+        """
+        Returns the cached value for key, calling `create` on a miss unless
+        an identical request is already in flight, in which case its result
+        is shared.
+        """
+        while True:
+            value = self.get(key)
+
+            if value is not None:
+                return value
+
+            inflight = self.inflight.get(key)
+
+            if inflight is None:
+                break
+
+            self.coalesced += 1
+
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The request we were waiting on was cancelled, not us; retry
+                if not inflight.cancelled():
+                    raise
+
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            value = await create()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+        self.put(key, value)
+        future.set_result(value)
+
+        return value
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
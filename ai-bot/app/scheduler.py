@@ -0,0 +1,170 @@
+import asyncio
+import collections
+import logging
+import math
+import time
+from typing import Callable
+
+from app.metrics import Histogram
+from app.twitch_irc import FastPrivateMessage, PrivateMessage
+
+
+logger = logging.getLogger(__name__)
+
+ChatMessage = PrivateMessage | FastPrivateMessage
+
+
+class MentionScheduler:
+    """
+    Decides which mention the AI answers next. Each user's mentions are
+    answered in order and one at a time; among users, the next mention is
+    the one with the highest score:
+
+        role_weight * role + age_weight * seconds waiting
+            - fairness_weight * recent answers to that user
+
+    where recent answers decay with `fairness_half_life`. Mentions older
+    than `max_age` are dropped rather than answered late, and when more than
+    `max_pending` are waiting the lowest scoring one goes.
+
+    Picking scans the waiting users, which stays cheap because the backlog
+    is bounded by max_pending.
+    """
+    def __init__(
+        self,
+        max_pending: int = 100,
+        max_age: float = 60.0,
+        role_weight: float = 10.0,
+        age_weight: float = 1.0,
+        fairness_weight: float = 5.0,
+        fairness_half_life: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.role_weight = role_weight
+        self.age_weight = age_weight
+        self.fairness_weight = fairness_weight
+        self.fairness_half_life = fairness_half_life
+        self.clock = clock
+
+        self.pending: dict[str, collections.deque[tuple[float, ChatMessage]]] = {}
+        self.busy: set[str] = set()
+        # Decayed count of recent answers per user, and when it was last updated
+        self.served: dict[str, tuple[float, float]] = {}
+        self.event = asyncio.Event()
+        self.size = 0
+
+        self.wait_times = Histogram()
+        self.expired = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def recent_answers(self, username: str, now: float) -> float:
+        count, updated = self.served.get(username, (0.0, now))
+        return count * math.exp2(-(now - updated) / self.fairness_half_life)
+
+    def score(self, username: str, queued_at: float, message: ChatMessage, now: float) -> float:
+        return (
+            self.role_weight * message.role
+            + self.age_weight * (now - queued_at)
+            - self.fairness_weight * self.recent_answers(username, now)
+        )
+
+    def put(self, message: ChatMessage) -> None:
+        self.pending.setdefault(message.username, collections.deque()).append((self.clock(), message))
+        self.size += 1
+
+        if self.size > self.max_pending:
+            self.drop_lowest()
+
+        self.event.set()
+
+    def remove(self, username: str, index: int) -> None:
+        pending = self.pending[username]
+        del pending[index]
+        self.size -= 1
+
+        if not pending:
+            del self.pending[username]
+
+    def drop_lowest(self) -> None:
+        now = self.clock()
+        username, index = min(
+            (
+                (username, index)
+                for username, pending in self.pending.items()
+                for index in range(len(pending))
+            ),
+            key=lambda entry: self.score(entry[0], *self.pending[entry[0]][entry[1]], now),
+        )
+
+        self.remove(username, index)
+        self.dropped += 1
+
+    def expire(self, now: float) -> None:
+        for username in list(self.pending):
+            pending = self.pending[username]
+
+            while pending and now - pending[0][0] > self.max_age:
+                self.remove(username, 0)
+                self.expired += 1
+
+                logger.debug("Dropped a stale mention from %s", username)
+
+    def pop_ready(self) -> ChatMessage | None:
+        now = self.clock()
+        self.expire(now)
+
+        ready = [username for username in self.pending if username not in self.busy]
+
+        if not ready:
+            return None
+
+        username = max(ready, key=lambda username: self.score(username, *self.pending[username][0], now))
+        queued_at, message = self.pending[username][0]
+
+        self.remove(username, 0)
+        self.busy.add(username)
+        self.wait_times.observe(now - queued_at)
+
+        return message
+
+    async def get(self) -> ChatMessage:
+        while True:
+            message = self.pop_ready()
+
+            if message is not None:
+                return message
+
+            self.event.clear()
+            await self.event.wait()
+
+    def done(self, message: ChatMessage) -> None:
+        """
+        Marks the user's mention answered, letting their next one through.
+        """
+        now = self.clock()
+
+        self.busy.discard(message.username)
+        self.served[message.username] = (self.recent_answers(message.username, now) + 1, now)
+
+        # Forget users whose answers have long decayed
+        if len(self.served) > self.max_pending * 10:
+            self.served = {
+                username: entry for username, entry in self.served.items()
+                if self.recent_answers(username, now) > 0.01
+            }
+
+        self.event.set()
+
+    def stats(self) -> dict[str, object]:
+        return {
+            'pending': self.size,
+            'busy': len(self.busy),
+            'expired': self.expired,
+            'dropped': self.dropped,
+            'wait': self.wait_times.summary(),
+        }
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from typing import Protocol
+
+from app.conversation import ConversationStore, HistoricalMessage
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """
+    Conversation history and channel state in a SQLite database in WAL mode,
+    one row per user and per channel. History is stored as compact JSON
+    pairs and read back one user at a time.
+
+    Writes go through their own connection, from a worker thread, while
+    reads use another; with WAL a snapshot being written never blocks a
+    user's history being restored.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                username TEXT PRIMARY KEY,
+                history TEXT NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS channels (
+                channel TEXT PRIMARY KEY,
+                state TEXT NOT NULL
+            );
+            """
+        )
+        self.reader = sqlite3.connect(path)
+
+    def close(self) -> None:
+        self.reader.close()
+
+        with self.lock:
+            self.connection.close()
+
+    def load_conversation(self, username: str) -> list[HistoricalMessage] | None:
+        row = self.reader.execute(
+            "SELECT history FROM conversations WHERE username = ?",
+            (username,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return [HistoricalMessage(message=message, response=response) for message, response in json.loads(row[0])]
+
+    def save_conversations(self, conversations: Mapping[str, Iterable[HistoricalMessage]]) -> None:
+        now = time.time()
+        rows = [
+            (
+                username,
+                json.dumps([[item.message, item.response] for item in history], separators=(',', ':')),
+                now,
+            )
+            for username, history in conversations.items()
+        ]
+
+        with self.lock:
+            self.connection.execute("BEGIN")
+
+            try:
+                self.connection.executemany(
+                    "INSERT INTO conversations (username, history, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT (username) DO UPDATE SET history = excluded.history, updated = excluded.updated",
+                    rows,
+                )
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+            self.connection.execute("COMMIT")
+
+    def load_channels(self) -> dict[str, dict[str, bool | int]]:
+        rows = self.reader.execute("SELECT channel, state FROM channels").fetchall()
+
+        return {channel: json.loads(state) for channel, state in rows}
+
+    def save_channels(self, states: Mapping[str, Mapping[str, bool | int]]) -> None:
+        with self.lock:
+            self.connection.executemany(
+                "INSERT INTO channels (channel, state) VALUES (?, ?) "
+                "ON CONFLICT (channel) DO UPDATE SET state = excluded.state",
+                [(channel, json.dumps(state)) for channel, state in states.items()],
+            )
+
+
+class ChannelStateSource(Protocol):
+    def channel_states(self) -> dict[str, dict[str, bool | int]]:
+        ...
+
+
+class Snapshotter:
+    """
+    Writes conversations that changed since the last snapshot, and all
+    channel state, every `interval` seconds and once more on shutdown.
+    """
+    def __init__(
+        self,
+        store: SnapshotStore,
+        conversations: ConversationStore,
+        channels: ChannelStateSource | None = None,
+        interval: float = 60.0,
+    ) -> None:
+        self.store = store
+        self.conversations = conversations
+        self.channels = channels
+        self.interval = interval
+
+        self.snapshots = 0
+
+    def collect(self) -> tuple[dict[str, list[HistoricalMessage]], dict[str, dict[str, bool | int]] | None]:
+        # Runs on the event loop; the copies are then safe to write elsewhere
+        channels = self.channels.channel_states() if self.channels else None
+        return self.conversations.take_dirty(), channels
+
+    def write(
+        self,
+        conversations: dict[str, list[HistoricalMessage]],
+        channels: dict[str, dict[str, bool | int]] | None,
+    ) -> None:
+        if conversations:
+            self.store.save_conversations(conversations)
+
+        if channels:
+            self.store.save_channels(channels)
+
+        self.snapshots += 1
+        logger.debug("Snapshot %d saved %d conversations", self.snapshots, len(conversations))
+
+    def save(self) -> None:
+        self.write(*self.collect())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            conversations, channels = self.collect()
+
+            try:
+                await asyncio.to_thread(self.write, conversations, channels)
+            except Exception:
+                logger.exception("Failed to save snapshot")
+
+                # Try these again with the next snapshot
+                self.conversations.mark_dirty(conversations)
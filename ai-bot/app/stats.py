@@ -0,0 +1,29 @@
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+class StatsReporter:
+    """
+    Logs the counters and histograms of every source as one JSON line every
+    `interval` seconds and once more on shutdown. Sources are callables
+    returning JSON-serializable summaries, keyed by name.
+    """
+    def __init__(self, sources: dict[str, Callable[[], object]], interval: float = 60.0) -> None:
+        self.sources = sources
+        self.interval = interval
+
+    def collect(self) -> dict[str, object]:
+        return {name: source() for name, source in self.sources.items()}
+
+    def report(self) -> None:
+        logger.info("stats %s", json.dumps(self.collect()))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
@@ -0,0 +1,76 @@
+import re
+
+
+# Twitch rejects chat messages longer than this
+MAX_MESSAGE_LENGTH = 500
+
+# A sentence ends at terminal punctuation followed by whitespace; without the
+# whitespace we cannot tell "3." from "3.14" mid-stream
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s')
+
+
+class ChatChunker:
+    """
+    Turns streamed completion text into chat messages. The first message is
+    released as soon as the first sentence is complete (or the text reaches
+    the message limit); later text follows in continuation messages of up to
+    `limit` characters, cut at a sentence end or word boundary.
+    """
+    def __init__(self, prefix: str = "", limit: int = MAX_MESSAGE_LENGTH) -> None:
+        self.prefix = prefix
+        self.limit = limit
+        self.buffer = ""
+        self.first = True
+
+    def room(self) -> int:
+        return self.limit - len(self.prefix) if self.first else self.limit
+
+    def cut(self, text: str, room: int) -> int:
+        """
+        Where to end a message taken from the start of text, at most room long.
+        """
+        window = text[:room + 1]
+        ends = [match.end() for match in SENTENCE_END.finditer(window)]
+
+        if ends:
+            return ends[-1]
+
+        space = window.rfind(' ')
+        return space + 1 if space > 0 else room
+
+    def emit(self, end: int) -> str:
+        text, self.buffer = self.buffer[:end].strip(), self.buffer[end:].lstrip()
+
+        if self.first:
+            self.first = False
+            return f"{self.prefix}{text}".rstrip()
+
+        return text
+
+    def feed(self, delta: str) -> list[str]:
+        self.buffer += delta
+        ready = []
+
+        if self.first:
+            match = SENTENCE_END.search(self.buffer)
+
+            if match and match.end() <= self.room() + 1:
+                ready.append(self.emit(match.end()))
+            elif len(self.buffer) > self.room():
+                ready.append(self.emit(self.cut(self.buffer, self.room())))
+
+        while not self.first and len(self.buffer) > self.room():
+            ready.append(self.emit(self.cut(self.buffer, self.room())))
+
+        return [message for message in ready if message]
+
+    def close(self) -> list[str]:
+        ready = []
+
+        while len(self.buffer) > self.room():
+            ready.append(self.emit(self.cut(self.buffer, self.room())))
+
+        if self.buffer.strip() or self.first:
+            ready.append(self.emit(len(self.buffer)))
+
+        return [message for message in ready if message]
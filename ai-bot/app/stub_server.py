@@ -0,0 +1,214 @@
+"""
+Local stand-in for a chat completions API, for load testing the bot with no
+network access or API spend. It answers POSTs to any path ending in
+/chat/completions with canned or random text after a latency drawn from a
+configurable distribution, streaming word by word when asked to.
+
+    python -m app.stub_server --latency lognormal:-1,0.5
+    python -m app.stub_server --responses replies.txt --latency uniform:0.2,1.5
+
+Then run the bot with AI_BACKEND=http and AI_BACKEND_URL pointing here.
+"""
+import argparse
+import asyncio
+import json
+import random
+import signal
+import time
+from typing import Callable
+
+from app.metrics import Histogram
+
+
+WORDS = "you again nobody asked go touch grass ratio skill issue cope imagine typing that".split()
+
+
+def latency_distribution(spec: str, rng: random.Random | None = None) -> Callable[[], float]:
+    """
+    Parses a latency spec into a sampler of seconds: "fixed:0.2",
+    "uniform:0.1,0.5", "normal:0.3,0.1", "lognormal:-1.5,0.5" (of the
+    underlying normal) or "exponential:0.3" (the mean).
+    """
+    rng = rng or random.Random()
+    kind, _, arguments = spec.partition(':')
+    values = [float(value) for value in arguments.split(',') if value]
+
+    samplers = {
+        'fixed': lambda value: lambda: value,
+        'uniform': lambda low, high: lambda: rng.uniform(low, high),
+        'normal': lambda mean, deviation: lambda: rng.gauss(mean, deviation),
+        'lognormal': lambda mu, sigma: lambda: rng.lognormvariate(mu, sigma),
+        'exponential': lambda mean: lambda: rng.expovariate(1 / mean),
+    }
+
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {', '.join(samplers)}")
+
+    sample = samplers[kind](*values)
+    return lambda: max(0.0, sample())
+
+
+def random_response(rng: random.Random, words: int = 12) -> str:
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, words))).capitalize() + '.'
+
+
+class StubServer:
+    def __init__(
+        self,
+        responses: list[str] | None = None,
+        latency: Callable[[], float] = lambda: 0.0,
+        token_interval: float = 0.02,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """
+        Replies with a random entry of `responses`, or random words when
+        there are none. `latency` is the wait before the reply (or the first
+        token of a stream); a fraction `error_rate` of requests get a 500.
+        """
+        self.responses = responses
+        self.latency = latency
+        self.token_interval = token_interval
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.latencies = Histogram()
+
+    def response(self) -> str:
+        if self.responses:
+            return self.rng.choice(self.responses)
+
+        return random_response(self.rng)
+
+    @staticmethod
+    async def write(writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes = b'') -> None:
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            "Connection: close\r\n"
+            "\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def complete(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        content = self.response()
+
+        await asyncio.sleep(self.latency())
+
+        if not request.get('stream'):
+            body = {
+                'object': 'chat.completion',
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            }
+            await self.write(writer, "200 OK", "application/json", json.dumps(body).encode())
+            return
+
+        await self.write(writer, "200 OK", "text/event-stream")
+
+        for index, word in enumerate(content.split(' ')):
+            if index:
+                await asyncio.sleep(self.token_interval)
+
+            chunk = {
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': f" {word}" if index else word}}],
+            }
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+
+        writer.write(b"data: [DONE]\n\n")
+        await writer.drain()
+
+    async def handler(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        started = time.monotonic()
+
+        try:
+            method, path, _ = (await reader.readline()).decode().split(' ', 2)
+            length = 0
+
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = line.decode().partition(':')
+
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+
+            request = json.loads(await reader.readexactly(length)) if length else {}
+
+            if method != 'POST' or not path.rstrip('/').endswith('/chat/completions'):
+                await self.write(writer, "404 Not Found", "text/plain", b"not found")
+                return
+
+            self.requests += 1
+
+            if self.rng.random() < self.error_rate:
+                self.errors += 1
+                await asyncio.sleep(self.latency())
+                await self.write(writer, "500 Internal Server Error", "text/plain", b"stub error")
+                return
+
+            await self.complete(writer, request)
+            self.latencies.observe(time.monotonic() - started)
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def summary(self) -> dict[str, object]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency': self.latencies.summary(),
+        }
+
+    async def serve(self, stop: asyncio.Future, host: str = "localhost", port: int = 8080) -> None:
+        server = await asyncio.start_server(self.handler, host, port)
+
+        await stop
+
+        server.close()
+        await server.wait_closed()
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m app.stub_server")
+    parser.add_argument('--host', default="localhost")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--responses', metavar='PATH', help="canned replies, one per line")
+    parser.add_argument('--latency', default="fixed:0.5", help="e.g. fixed:0.5, uniform:0.1,1, lognormal:-1,0.5")
+    parser.add_argument('--token-interval', type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    responses = None
+
+    if args.responses:
+        with open(args.responses) as f:
+            responses = [line.strip() for line in f if line.strip()]
+
+    rng = random.Random(args.seed)
+    server = StubServer(
+        responses,
+        latency=latency_distribution(args.latency, rng),
+        token_interval=args.token_interval,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+    stop = asyncio.Future()
+
+    def sigint_handler():
+        stop.set_result(None)
+
+    loop = asyncio.get_event_loop()
+    loop.add_signal_handler(signal.SIGINT, sigint_handler)
+
+    await server.serve(stop, args.host, args.port)
+
+    print(server.summary())
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
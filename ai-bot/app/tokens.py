@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import logging
+
+import tiktoken
+
+
+logger = logging.getLogger(__name__)
+
+ENCODING = "cl100k_base"
+
+# Chat formatting costs a few tokens per message on top of its content
+MESSAGE_OVERHEAD = 4
+
+
+@functools.cache
+def encoding():
+    """
+    The local tokenizer, or None when its data isn't available. tiktoken
+    fetches encodings on first use, which fails offline; call load_encoding()
+    at startup so that doesn't happen on the event loop.
+    """
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception:
+        logger.warning("tiktoken encoding %s unavailable; estimating tokens from length", ENCODING)
+        return None
+
+
+async def load_encoding() -> None:
+    await asyncio.to_thread(encoding)
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = encoding()
+
+    if tokenizer is None:
+        # Roughly four characters per token for English text
+        return (len(text) + 3) // 4
+
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: dict[str, str]) -> int:
+    return MESSAGE_OVERHEAD + count_tokens(message["content"])
@@ -1,10 +1,19 @@
 from __future__ import annotations
 import abc
 import asyncio
+import collections
+import enum
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from typing import ClassVar, NamedTuple
 
 import pydantic
 import websockets
 
+from app.backoff import Backoff
+from app.outbound import OutboundScheduler
+from app.rate_limit import TokenBucket
+
 
 class SendMessage(pydantic.BaseModel):
     channel: str
@@ -19,6 +28,194 @@ class TwitchIRCAuthenticationException(TwitchIRCException):
     pass
 
 
+# https://ircv3.net/specs/extensions/message-tags#escaping-values
+TAG_ESCAPES = {
+    ':': ';',
+    's': ' ',
+    '\\': '\\',
+    'r': '\r',
+    'n': '\n',
+}
+
+
+def unescape_tag_value(value: str) -> str:
+    if '\\' not in value:
+        return value
+
+    ret = []
+    escaped = False
+
+    for char in value:
+        if escaped:
+            # Unknown escapes drop the backslash and keep the character
+            ret.append(TAG_ESCAPES.get(char, char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        else:
+            ret.append(char)
+
+    # A trailing lone backslash is dropped
+    return ''.join(ret)
+
+
+class Tags(Mapping[str, str]):
+    """
+    Lazy view over the raw IRCv3 tag string of a line. Nothing is split up
+    front; a key is located and unescaped only when it is read, then cached.
+    """
+    __slots__ = ('raw', '_decoded')
+
+    def __init__(self, raw: str) -> None:
+        self.raw = raw
+        self._decoded: dict[str, str] | None = None
+
+    def find_raw(self, key: str) -> str | None:
+        """
+        Returns the still-escaped value for key, or None if it is not present.
+        Escaped values never contain a literal ';', so it is a safe separator.
+        """
+        raw = self.raw
+        size = len(raw)
+        start = 0
+
+        while True:
+            index = raw.find(key, start)
+
+            if index == -1:
+                return None
+
+            end = index + len(key)
+
+            if (index == 0 or raw[index - 1] == ';') and (end == size or raw[end] in '=;'):
+                if end == size or raw[end] == ';':
+                    return ''
+
+                value_end = raw.find(';', end)
+                return raw[end + 1:] if value_end == -1 else raw[end + 1:value_end]
+
+            start = index + 1
+
+    def __getitem__(self, key: str) -> str:
+        if self._decoded is None:
+            self._decoded = {}
+        elif key in self._decoded:
+            return self._decoded[key]
+
+        value = self.find_raw(key)
+
+        if value is None:
+            raise KeyError(key)
+
+        value = self._decoded[key] = unescape_tag_value(value)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.find_raw(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        if not self.raw:
+            return
+
+        for tag in self.raw.split(';'):
+            yield tag.partition('=')[0]
+
+    def __len__(self) -> int:
+        return self.raw.count(';') + 1 if self.raw else 0
+
+    def __repr__(self) -> str:
+        return f"Tags({self.raw!r})"
+
+    def get_int(self, key: str) -> int | None:
+        value = self.get(key)
+        return int(value) if value else None
+
+    def get_bool(self, key: str) -> bool:
+        return self.get(key) == '1'
+
+    @property
+    def id(self) -> str | None:
+        return self.get('id')
+
+    @property
+    def tmi_sent_ts(self) -> int | None:
+        return self.get_int('tmi-sent-ts')
+
+    @property
+    def user_id(self) -> str | None:
+        return self.get('user-id')
+
+    @property
+    def mod(self) -> bool:
+        return self.get_bool('mod')
+
+    @property
+    def subscriber(self) -> bool:
+        return self.get_bool('subscriber')
+
+
+class UserRole(enum.IntEnum):
+    VIEWER = 0
+    SUBSCRIBER = 1
+    VIP = 2
+    MODERATOR = 3
+    BROADCASTER = 4
+
+    @classmethod
+    def from_tags(cls, tags: Mapping[str, str] | None) -> UserRole:
+        if not tags:
+            return cls.VIEWER
+
+        badges = tags.get('badges') or ''
+
+        if 'broadcaster/' in badges:
+            return cls.BROADCASTER
+
+        if tags.get('mod') == '1':
+            return cls.MODERATOR
+
+        # The vip tag is only sent for VIPs
+        if 'vip' in tags or 'vip/' in badges:
+            return cls.VIP
+
+        if tags.get('subscriber') == '1':
+            return cls.SUBSCRIBER
+
+        return cls.VIEWER
+
+
+class RawLine(NamedTuple):
+    """
+    Tuple-backed split of a single IRC line; produced without any validation
+    since the server is trusted input.
+    """
+    tags: Tags | None
+    origin: str | None
+    command: str
+    message: str
+
+    @classmethod
+    def parse(cls, line: str) -> RawLine:
+        line = line.strip()
+        origin = None
+        tags = None
+        start = 0
+
+        if line.startswith('@'):
+            end = line.index(' ')
+            tags = Tags(line[1:end])
+            start = end + 1
+
+        if line.startswith(':', start):
+            end = line.index(' ', start)
+            origin = line[start + 1:end]
+            command, _, message = line[end + 1:].partition(' ')
+        else: # Ping, mostly
+            command, _, message = line[start:].partition(':')
+
+        return cls(tags, origin, command.strip(), message.strip())
+
+
 class RawMessage(pydantic.BaseModel):
     tags: dict[str, str] | None
     origin: str | None
@@ -27,7 +224,10 @@ class RawMessage(pydantic.BaseModel):
 
     @classmethod
     def parse_tags(cls, raw_tags: str) -> dict[str, str]:
-        return dict(tag.split('=') for tag in raw_tags.split(';'))
+        return {
+            key: unescape_tag_value(value)
+            for key, _, value in (tag.partition('=') for tag in raw_tags.split(';'))
+        }
 
     @classmethod
     def parse_raw_message(cls, message) -> list[RawMessage]:
@@ -40,30 +240,13 @@ class RawMessage(pydantic.BaseModel):
 
     @classmethod
     def parse_individual_raw_message(cls, message: str) -> RawMessage:
-        message = message.strip()
-        origin = None
-        tags = None
-
-        if message.startswith('@'):
-            raw_tags, message = message.split(' ', 1)
-            tags = cls.parse_tags(raw_tags[1:])
-
-        if message.startswith(':'):
-            origin, command_message = (
-                message
-                    .removeprefix(':')
-                    .split(' ', 1)
-            )
-
-            command, message = command_message.split(' ', 1)
-        else: # Ping, mostly
-            command, message = message.split(':', 1)
+        tags, origin, command, message = RawLine.parse(message)
 
         return cls(
-            tags=tags,
+            tags=cls.parse_tags(tags.raw) if tags is not None else None,
             origin=origin,
-            command=command.strip(),
-            message=message.strip(),
+            command=command,
+            message=message,
         )
 
 
@@ -119,6 +302,10 @@ class PrivateMessage(TaggedMessage):
     channel: str
     message: str
 
+    @property
+    def role(self) -> UserRole:
+        return UserRole.from_tags(self.tags)
+
     # Bit events come in as a private message, checks the tags (I guess)
     # https://github.com/BarryCarlyon/twitch_misc/blob/8f38fce1c737d144b6cb7cb8bf71a417c28470b7/chat/eventbased/chat_template.js#L295
     @classmethod
@@ -149,7 +336,7 @@ class ChannelEventMessage(TwitchMessage):
     @classmethod
     def from_raw_message(cls, message: RawMessage) -> JoinMessage:
         return cls(
-            channel=message.message.rstrip('#'),
+            channel=message.message.lstrip('#'),
             username=cls.parse_username(message.origin),
             command=message.command,
         )
@@ -185,7 +372,224 @@ CLASS_COMMAND_MAPPING = {
 }
 
 
+class FastTwitchMessage:
+    """
+    Slotted, unvalidated counterpart of TwitchMessage. Built straight from a
+    RawLine; `to_model` converts to the pydantic model for callers that want
+    validation.
+    """
+    __slots__ = ('command',)
+    model: ClassVar[type[TwitchMessage]] = TwitchMessage
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+
+    @classmethod
+    @abc.abstractmethod
+    def from_raw_line(cls, line: RawLine) -> FastTwitchMessage:
+        raise NotImplementedError
+
+    @classmethod
+    def fields(cls) -> tuple[str, ...]:
+        return tuple(
+            name
+            for klass in reversed(cls.__mro__)
+            for name in getattr(klass, '__slots__', ())
+        )
+
+    def to_model(self) -> TwitchMessage:
+        return self.model(**{name: getattr(self, name) for name in self.fields()})
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return all(getattr(self, name) == getattr(other, name) for name in self.fields())
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.fields())
+        return f"{type(self).__name__}({fields})"
+
+
+class FastStateMessage(FastTwitchMessage):
+    __slots__ = ('tags', 'channel')
+
+    def __init__(self, command: str, tags: Tags, channel: str) -> None:
+        self.command = command
+        self.tags = tags
+        self.channel = channel
+
+    @classmethod
+    def from_raw_line(cls, line: RawLine) -> FastStateMessage:
+        return cls(line.command, line.tags, line.message.lstrip('#'))
+
+
+class FastUserStateMessage(FastStateMessage):
+    __slots__ = ()
+    model = UserStateMessage
+
+
+class FastRoomStateMessage(FastStateMessage):
+    __slots__ = ()
+    model = RoomStateMessage
+
+
+class FastPrivateMessage(FastTwitchMessage):
+    __slots__ = ('tags', 'username', 'channel', 'message')
+    model = PrivateMessage
+
+    def __init__(self, command: str, tags: Tags, username: str, channel: str, message: str) -> None:
+        self.command = command
+        self.tags = tags
+        self.username = username
+        self.channel = channel
+        self.message = message
+
+    @property
+    def role(self) -> UserRole:
+        return UserRole.from_tags(self.tags)
+
+    @classmethod
+    def from_raw_line(cls, line: RawLine) -> FastPrivateMessage:
+        channel, _, chat_message = line.message.lstrip('#').partition(' :')
+
+        return cls(
+            line.command,
+            line.tags,
+            line.origin.partition('!')[0],
+            channel,
+            chat_message,
+        )
+
+
+class FastChannelEventMessage(FastTwitchMessage):
+    __slots__ = ('channel', 'username')
+
+    def __init__(self, command: str, channel: str, username: str) -> None:
+        self.command = command
+        self.channel = channel
+        self.username = username
+
+    @classmethod
+    def from_raw_line(cls, line: RawLine) -> FastChannelEventMessage:
+        return cls(line.command, line.message.lstrip('#'), line.origin.partition('!')[0])
+
+
+class FastJoinMessage(FastChannelEventMessage):
+    __slots__ = ()
+    model = JoinMessage
+
+
+class FastPartMessage(FastChannelEventMessage):
+    __slots__ = ()
+    model = PartMessage
+
+
+class FastPingMessage(FastTwitchMessage):
+    __slots__ = ('message',)
+    model = PingMessage
+
+    def __init__(self, command: str, message: str) -> None:
+        self.command = command
+        self.message = message
+
+    @classmethod
+    def from_raw_line(cls, line: RawLine) -> FastPingMessage:
+        return cls(line.command, line.message)
+
+
+FAST_CLASS_COMMAND_MAPPING = {
+    'JOIN': FastJoinMessage,
+    'PART': FastPartMessage,
+    'PING': FastPingMessage,
+    'PRIVMSG': FastPrivateMessage,
+    'USERSTATE': FastUserStateMessage,
+    'ROOMSTATE': FastRoomStateMessage,
+}
+
+
+# Commands whose handlers do real work; JOIN/PART are opt-in since large
+# channels flood them and on_join/on_part do nothing by default
+DEFAULT_COMMANDS = frozenset({'PING', 'PRIVMSG', 'USERSTATE', 'ROOMSTATE'})
+
+
+def peek_command(line: str) -> str:
+    """
+    Returns the command token of a raw line without parsing tags or origin.
+    """
+    start = 0
+
+    if line.startswith('@'):
+        start = line.find(' ') + 1
+
+    if line.startswith(':', start):
+        start = line.find(' ', start) + 1
+
+    end = line.find(' ', start)
+    return line[start:] if end == -1 else line[start:end]
+
+
+class IngestStats:
+    def __init__(self) -> None:
+        self.lines = 0
+        self.parsed = 0
+        self.skipped: collections.Counter[str] = collections.Counter()
+
+    @property
+    def skipped_total(self) -> int:
+        return self.skipped.total()
+
+
+class LineDecoder:
+    """
+    Reassembles IRC lines from websocket frames. A frame may end mid-line, so
+    the unterminated tail is carried over into the next feed. A partial line
+    that grows past max_buffer is discarded up to its next line ending.
+    """
+    def __init__(self, max_buffer: int = 65536) -> None:
+        self.max_buffer = max_buffer
+        self.buffer = ''
+        self.discarding = False
+        self.overflows = 0
+
+    def feed(self, data: str) -> Iterator[str]:
+        if self.buffer:
+            data = self.buffer + data
+            self.buffer = ''
+
+        # The carry-over is settled before yielding so that a consumer which
+        # stops iterating early never corrupts the next feed
+        last = data.rfind('\n')
+        tail = data[last + 1:]
+
+        if self.discarding:
+            if last == -1:
+                return
+
+            self.discarding = False
+            start = data.find('\n') + 1
+        else:
+            start = 0
+
+        if len(tail) > self.max_buffer:
+            self.overflows += 1
+            self.discarding = True
+        else:
+            self.buffer = tail
+
+        while start <= last:
+            end = data.find('\n', start)
+            line = data[start:end - 1] if end > start and data[end - 1] == '\r' else data[start:end]
+            start = end + 1
+
+            if line:
+                yield line
+
+
 class TwitchIRC:
+    # Seconds a connection has to last before reconnect backoff starts over
+    STABLE_CONNECTION = 30.0
+
     def __init__(
         self, 
         twitch_username: str, 
@@ -195,6 +599,11 @@ class TwitchIRC:
         message_queue: asyncio.Queue,
         flag: asyncio.Event,
         twitch_ws_uri: str | None = None,
+        validate: bool = False,
+        max_line_buffer: int = 65536,
+        commands: Iterable[str] | None = None,
+        join_limiter: TokenBucket | None = None,
+        scheduler: OutboundScheduler | None = None,
      ) -> None:
         self.access_token = access_token
         self.twitch_username = twitch_username.lower()
@@ -204,6 +613,25 @@ class TwitchIRC:
         self.message_queue = message_queue
         self.flag = flag
 
+        # When set, lines are parsed into the validated pydantic models rather
+        # than the slotted Fast* messages
+        self.validate = validate
+        self.max_line_buffer = max_line_buffer
+
+        # Lines whose command is not in this set are dropped before parsing
+        self.commands = frozenset(commands) if commands is not None else DEFAULT_COMMANDS
+        self.stats = IngestStats()
+
+        # Twitch allows 20 JOINs per 10 seconds per account; share one bucket
+        # between every connection made with the same account
+        self.join_limiter = join_limiter or TokenBucket(20, 10.0)
+        self.websocket: websockets.WebSocketClientProtocol | None = None
+        # Set while a connection is up
+        self.connected = asyncio.Event()
+
+        # Outbound messages wait here until the rate limits allow them out
+        self.scheduler = scheduler or OutboundScheduler()
+
         self.function_mapping = {
             PrivateMessage: self.on_message,
             UserStateMessage: self.on_user_state,
@@ -211,27 +639,54 @@ class TwitchIRC:
             JoinMessage: self.on_join,
             PartMessage: self.on_part,
             PingMessage: self.on_ping,
+            FastPrivateMessage: self.on_message,
+            FastUserStateMessage: self.on_user_state,
+            FastRoomStateMessage: self.on_room_state,
+            FastJoinMessage: self.on_join,
+            FastPartMessage: self.on_part,
+            FastPingMessage: self.on_ping,
         }
 
     
     def parse_tags(self, raw_tags: str) -> dict[str, str]:
-        return dict(tag.split('=') for tag in raw_tags.split(';'))
+        return RawMessage.parse_tags(raw_tags)
     
-    def parse_raw_message(self, message: str) -> list[TwitchMessage]:
-        messages: list[RawMessage] = RawMessage.parse_raw_message(message)
-        ret = []
+    def parse_line(self, line: str) -> TwitchMessage | FastTwitchMessage | None:
+        self.stats.lines += 1
+        command = peek_command(line)
+
+        if command not in self.commands:
+            self.stats.skipped[command] += 1
+            return None
+
+        self.stats.parsed += 1
+
+        if self.validate:
+            raw_message = RawMessage.parse_individual_raw_message(line)
+            Message: type[TwitchMessage] = CLASS_COMMAND_MAPPING.get(raw_message.command)
+
+            return Message.from_raw_message(raw_message) if Message else None
+
+        raw_line = RawLine.parse(line)
+        FastMessage: type[FastTwitchMessage] = FAST_CLASS_COMMAND_MAPPING.get(raw_line.command)
 
-        for message in messages:
-            Message: type[TwitchMessage] = CLASS_COMMAND_MAPPING.get(message.command)
+        return FastMessage.from_raw_line(raw_line) if FastMessage else None
 
-            if not Message:
+    def parse_raw_message(self, message: str) -> list[TwitchMessage | FastTwitchMessage]:
+        """
+        Parses a payload that is known to hold only complete lines; the receive
+        loop goes through the LineDecoder instead.
+        """
+        ret = []
+
+        for line in message.split('\r\n'):
+            if not line:
                 continue
 
-            ret.append(
-                Message.from_raw_message(
-                    message,
-                )
-            )
+            parsed = self.parse_line(line)
+
+            if parsed:
+                ret.append(parsed)
 
         return ret
     
@@ -242,11 +697,16 @@ class TwitchIRC:
         await websocket.send(f"PRIVMSG #{channel} :{message}")
 
     async def receive_messages(self, websocket: websockets.WebSocketClientProtocol) -> None:
+        line_decoder = LineDecoder(self.max_line_buffer)
+
         while not self.flag.is_set():
             try:
-                messages = self.parse_raw_message(await websocket.recv())
+                for line in line_decoder.feed(await websocket.recv()):
+                    message = self.parse_line(line)
+
+                    if not message:
+                        continue
 
-                for message in messages:
                     fn = self.function_mapping.get(type(message))
 
                     if not fn:
@@ -257,15 +717,26 @@ class TwitchIRC:
             except websockets.exceptions.ConnectionClosed:
                 break
     
-    async def process_send_queue(self, websocket: websockets.WebSocketClientProtocol) -> None:
+    async def schedule_send_queue(self) -> None:
         while not self.flag.is_set():
+            await self.scheduler.wait_for_space()
             message: SendMessage = await self.send_queue.get()
+            self.scheduler.put(message)
+
+    async def process_send_queue(self, websocket: websockets.WebSocketClientProtocol) -> None:
+        while not self.flag.is_set():
+            message = await self.scheduler.get()
 
-            await self.send_private_message(
-                websocket,
-                message.channel,
-                message.message,
-            )
+            try:
+                await self.send_private_message(
+                    websocket,
+                    message.channel,
+                    message.message,
+                )
+            except (asyncio.CancelledError, websockets.exceptions.ConnectionClosed):
+                # Not delivered; keep it at the front for the next connection
+                self.scheduler.put(message, front=True)
+                raise
 
     async def run(self) -> None:
         async with websockets.connect(self.twitch_ws_uri) as websocket:
@@ -275,35 +746,121 @@ class TwitchIRC:
             except websockets.exceptions.ConnectionClosed as e:
                 raise TwitchIRCAuthenticationException from e
 
-            await websocket.send("CAP REQ :twitch.tv/tags twitch.tv/commands twitch.tv/membership")
-            
-            for channel in self.channels:
-                await websocket.send(f"JOIN #{channel}")
+            capabilities = "twitch.tv/tags twitch.tv/commands"
+
+            # Without membership Twitch stops sending JOIN/PART altogether
+            if self.commands & {'JOIN', 'PART'}:
+                capabilities += " twitch.tv/membership"
+
+            await websocket.send(f"CAP REQ :{capabilities}")
+
+            self.websocket = websocket
+            self.connected.set()
+            tasks = [
+                asyncio.create_task(self.join_channels(websocket, list(self.channels))),
+                asyncio.create_task(self.schedule_send_queue()),
+                asyncio.create_task(self.receive_messages(websocket)),
+                asyncio.create_task(self.process_send_queue(websocket)),
+            ]
+
+            try:
+                # Joins are paced, so they run alongside receiving. The socket
+                # is done as soon as either loop stops.
+                done, _ = await asyncio.wait(tasks[2:], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.websocket = None
+                self.connected.clear()
 
-            # Example join on the event
-            # await event.wait()
-            await asyncio.gather(
-                self.receive_messages(websocket),
-                self.process_send_queue(websocket),
-            )
+                for task in tasks:
+                    task.cancel()
 
-    async def on_ping(self, websocket: websockets.WebSocketClientProtocol, message: PingMessage) -> None:
+                # Lets a cancelled send requeue its message before returning
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            for task in done:
+                exception = task.exception()
+
+                if exception and not isinstance(exception, websockets.exceptions.ConnectionClosed):
+                    raise exception
+
+    async def run_forever(self, backoff: Backoff | None = None) -> None:
+        """
+        Runs connections until the flag is set, reconnecting with jittered
+        exponential backoff. Pending outbound messages live in the scheduler,
+        so they survive the reconnect, and channels are rejoined with pacing.
+        """
+        backoff = backoff or Backoff()
+
+        while not self.flag.is_set():
+            started = time.monotonic()
+
+            try:
+                await self.run()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException):
+                pass
+
+            if self.flag.is_set():
+                break
+
+            # Only a connection that stayed up for a while counts as recovered
+            if time.monotonic() - started >= self.STABLE_CONNECTION:
+                backoff.reset()
+
+            await backoff.wait()
+
+    async def join_channels(self, websocket: websockets.WebSocketClientProtocol, channels: list[str]) -> None:
+        for channel in channels:
+            await self.join_limiter.acquire()
+            await websocket.send(f"JOIN #{channel}")
+
+    async def join(self, channel: str) -> None:
+        """
+        Adds a channel to this connection, joining it right away if connected.
+        """
+        if channel not in self.channels:
+            self.channels.append(channel)
+
+        if self.websocket:
+            await self.join_channels(self.websocket, [channel])
+
+    def channel_states(self) -> dict[str, dict[str, bool | int]]:
+        return self.scheduler.snapshot()
+
+    def summary(self) -> dict[str, object]:
+        return {
+            'lines': self.stats.lines,
+            'parsed': self.stats.parsed,
+            'skipped': dict(self.stats.skipped),
+            'outbound_wait': self.scheduler.wait_times.summary(),
+        }
+
+    def restore_channel_states(self, states: Mapping[str, Mapping[str, bool | int]]) -> None:
+        self.scheduler.restore(states)
+
+    async def part(self, channel: str) -> None:
+        if channel in self.channels:
+            self.channels.remove(channel)
+
+        if self.websocket:
+            await self.websocket.send(f"PART #{channel}")
+
+    async def on_ping(self, websocket: websockets.WebSocketClientProtocol, message: PingMessage | FastPingMessage) -> None:
         await self.send_pong(websocket, message.message)
 
-    async def on_message(self, websocket: websockets.WebSocketClientProtocol, message: PrivateMessage) -> None:
+    async def on_message(self, websocket: websockets.WebSocketClientProtocol, message: PrivateMessage | FastPrivateMessage) -> None:
         if message.username.lower() == self.twitch_username:
             return
         
         await self.message_queue.put(message)
 
-    async def on_join(self, websocket: websockets.WebSocketClientProtocol, message: JoinMessage) -> None:
+    async def on_join(self, websocket: websockets.WebSocketClientProtocol, message: JoinMessage | FastJoinMessage) -> None:
         pass
 
-    async def on_part(self, websocket: websockets.WebSocketClientProtocol, message: PartMessage) -> None:
+    async def on_part(self, websocket: websockets.WebSocketClientProtocol, message: PartMessage | FastPartMessage) -> None:
         pass
 
-    async def on_user_state(self, websocket: websockets.WebSocketClientProtocol, message: UserStateMessage) -> None:
-        pass
+    async def on_user_state(self, websocket: websockets.WebSocketClientProtocol, message: UserStateMessage | FastUserStateMessage) -> None:
+        self.scheduler.update_user_state(message.channel, message.tags)
 
-    async def on_room_state(self, websocket: websockets.WebSocketClientProtocol, message: RoomStateMessage) -> None:
-        pass
+    async def on_room_state(self, websocket: websockets.WebSocketClientProtocol, message: RoomStateMessage | FastRoomStateMessage) -> None:
+        self.scheduler.update_room_state(message.channel, message.tags)
@@ -0,0 +1,59 @@
+"""
+Parser, dispatch and mention detection micro-benchmarks over recorded chat.
+
+    python -m benchmarks                          # print lines/s and allocations
+    python -m benchmarks --save baseline.json     # record a baseline
+    python -m benchmarks --check baseline.json    # exit 1 on a regression
+
+A benchmark regresses when its throughput falls more than --threshold
+(default 20%) below the baseline. Baselines are machine specific, so
+record one on the machine that runs the check.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks import mentions as mention_benchmarks
+from benchmarks import parser as parser_benchmarks
+from benchmarks.harness import regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1)
+    parser.add_argument('--filter', dest='only')
+    parser.add_argument('--save', metavar='PATH')
+    parser.add_argument('--check', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {
+        **parser_benchmarks.run(args.rounds, args.min_time, args.only),
+        **mention_benchmarks.run(args.rounds, args.min_time, args.only),
+    }
+
+    print(f"{'benchmark':<32} {'lines/s':>14} {'peak B/line':>12}")
+
+    for name, result in results.items():
+        print(f"{name:<32} {result['lines_per_second']:>14,.0f} {result['peak_bytes_per_line']:>12,.0f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({name: result['lines_per_second'] for name, result in results.items()}, f, indent=2)
+
+    if args.check:
+        with open(args.check) as f:
+            failures = regressions(results, json.load(f), args.threshold)
+
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+
+        if failures:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
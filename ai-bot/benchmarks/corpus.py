@@ -0,0 +1,48 @@
+"""
+Chat lines recorded from a live channel, as captured in the comments of
+event-stream/app/twitch_irc.py.
+"""
+
+PING = 'PING :tmi.twitch.tv'
+
+PRIVMSG = '@badge-info=subscriber/20;badges=vip/1,subscriber/18,bits/1000;color=#670070;display-name=Ginauz;emotes=;first-msg=0;flags=;id=575a24ac-0a91-48fb-b815-d62e0758c3e5;mod=0;returning-chatter=0;room-id=477536370;subscriber=1;tmi-sent-ts=1697759493254;turbo=0;user-id=73138589;user-type=;vip=1 :ginauz!ginauz@ginauz.tmi.twitch.tv PRIVMSG #thebobbyv :But the intro killed me as a first fallout game this man is zzzz'
+
+USERSTATE = '@badge-info=subscriber/2;badges=vip/1,subscriber/2,bits/1;color=#FF4500;display-name=CannibalJeebus;emote-sets=0,14327,14415,19194,100675,163459,202264,865926,1554517,300206295,300374282,300548756,301592777,301850800,302281643,302656409,304089636,304230584,304230585,335211949,335835868,349692147,366129205,381795912,390635807,411369090,413457205,415785940,417199684,432107365,432588907,456899168,472873131,477339272,485611183,488737509,493057151,493728383,537206155,564265402,582929904,592920959,610186276,633714819,776769231,826004544,882819835,996603218,1127843598,1420623209,1447516779,1479080590,1714878156,1723224679,1832730947,1866292107,2058695649,2099632885,1c88d134-7982-4a5b-ab05-ff8680ab3805,316c713d-8f8a-4e76-86da-ac1caa24648a,36237fd7-c0b9-49d7-8731-89cc902c3091,4472a434-2cfc-47a8-98b3-aa099ffda1d5,4fa36322-02c6-49d0-be8a-0c42436a7725,5165cbf2-44f1-4f98-93ad-6d54f37abca8,66cbb53f-d712-45ac-8e4d-9b790b3be3a7,a24f6192-1ec6-44d7-a76d-b492d35f13a6,a24f6192-1ec6-44d7-a76d-b492d35f13a6,be6edcd9-71e9-4664-b8fb-524f26495d83,cbc996b7-31e4-46bd-8d86-379c55ff472e,dd8cbe57-6264-466e-9f63-97aaa7483004;mod=0;subscriber=1;user-type= :tmi.twitch.tv USERSTATE #thebobbyv'
+
+ROOMSTATE = '@emote-only=0;followers-only=-1;r9k=0;room-id=477536370;slow=0;subs-only=0 :tmi.twitch.tv ROOMSTATE #thebobbyv'
+
+WELCOME = [
+    ':tmi.twitch.tv 001 cannibaljeebus :Welcome, GLHF!',
+    ':tmi.twitch.tv 002 cannibaljeebus :Your host is tmi.twitch.tv',
+    ':tmi.twitch.tv 003 cannibaljeebus :This server is rather new',
+    ':tmi.twitch.tv 004 cannibaljeebus :-',
+    ':tmi.twitch.tv 375 cannibaljeebus :-',
+    ':tmi.twitch.tv 372 cannibaljeebus :You are in a maze of twisty passages, all alike.',
+    ':tmi.twitch.tv 376 cannibaljeebus :>',
+    ':tmi.twitch.tv CAP * ACK :twitch.tv/tags twitch.tv/commands twitch.tv/membership',
+]
+
+JOINS = [
+    ':isnicable!isnicable@isnicable.tmi.twitch.tv JOIN #thebobbyv',
+    ':nirbing!nirbing@nirbing.tmi.twitch.tv JOIN #thebobbyv',
+    ':mitchconnors!mitchconnors@mitchconnors.tmi.twitch.tv JOIN #thebobbyv',
+    ':shadowollf!shadowollf@shadowollf.tmi.twitch.tv JOIN #thebobbyv',
+    ':maybezita!maybezita@maybezita.tmi.twitch.tv JOIN #thebobbyv',
+    ':lurxx!lurxx@lurxx.tmi.twitch.tv JOIN #thebobbyv',
+    ':seanvinez1!seanvinez1@seanvinez1.tmi.twitch.tv JOIN #thebobbyv',
+    ':drapsnatt!drapsnatt@drapsnatt.tmi.twitch.tv JOIN #thebobbyv',
+]
+
+
+def payload(lines: list[str]) -> str:
+    return ''.join(f"{line}\r\n" for line in lines)
+
+
+# Each corpus is a list of lines; benchmarks replay it as one payload per pass
+CORPORA = {
+    'privmsg': [PRIVMSG] * 20,
+    'userstate': [USERSTATE] * 20,
+    'join_flood': JOINS * 20,
+    'ping': [PING] * 20,
+    'mixed': WELCOME + [USERSTATE, ROOMSTATE] + JOINS + [PRIVMSG] * 8 + [PING],
+}
@@ -0,0 +1,60 @@
+import time
+import tracemalloc
+from typing import Callable
+
+
+def measure(fn: Callable[[], object], lines: int, rounds: int, min_time: float) -> dict[str, float]:
+    fn()
+
+    # Calibrate so a round takes at least min_time
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+
+        for _ in range(iterations):
+            fn()
+
+        if time.perf_counter() - start >= min_time:
+            break
+
+        iterations *= 2
+
+    best = float('inf')
+
+    for _ in range(rounds):
+        start = time.perf_counter()
+
+        for _ in range(iterations):
+            fn()
+
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'lines_per_second': lines * iterations / best,
+        'peak_bytes_per_line': peak / lines,
+    }
+
+
+def regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, float],
+    threshold: float,
+) -> list[str]:
+    failures = []
+
+    for name, expected in baseline.items():
+        if name not in results:
+            continue
+
+        actual = results[name]['lines_per_second']
+
+        if actual < expected * (1 - threshold):
+            failures.append(f"{name}: {actual:,.0f} lines/s vs baseline {expected:,.0f}")
+
+    return failures
@@ -0,0 +1,84 @@
+"""
+Mention detection: the old substring scan over every alias against the
+compiled MentionMatcher, with a few aliases and with many.
+"""
+import random
+from typing import Callable
+
+from app.mentions import MentionMatcher
+from benchmarks.harness import measure
+
+
+WORDS = "the intro killed me as a first fallout game this man is zzzz lol kekw pog what".split()
+
+
+def chat_lines(count: int = 1000, mention_ratio: float = 0.05, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(3, 15))
+
+        if rng.random() < mention_ratio:
+            words.insert(rng.randrange(len(words) + 1), "@CannibalJeebus")
+
+        lines.append(' '.join(words))
+
+    return lines
+
+
+ALIASES = {
+    'few': ['cannibaljeebus', 'cannibal'],
+    'many': ['cannibaljeebus', 'cannibal'] + [f"alias{index}" for index in range(30)],
+}
+
+
+def substring_loop(lines: list[str], aliases: list[str]) -> Callable[[], object]:
+    aliases = [alias.lower() for alias in aliases]
+
+    def run() -> int:
+        matched = 0
+
+        for line in lines:
+            text = line.lower()
+            matched += any(alias in text for alias in aliases)
+
+        return matched
+
+    return run
+
+
+def matcher(lines: list[str], aliases: list[str]) -> Callable[[], object]:
+    mentions = MentionMatcher(aliases)
+
+    def run() -> int:
+        matched = 0
+
+        for line in lines:
+            matched += line in mentions
+
+        return matched
+
+    return run
+
+
+TARGETS = {
+    'mention_loop': substring_loop,
+    'mention_matcher': matcher,
+}
+
+
+def run(rounds: int = 5, min_time: float = 0.1, only: str | None = None) -> dict[str, dict[str, float]]:
+    lines = chat_lines()
+    results = {}
+
+    for target, factory in TARGETS.items():
+        for name, aliases in ALIASES.items():
+            name = f"{target}/{name}"
+
+            if only and only not in name:
+                continue
+
+            results[name] = measure(factory(lines, aliases), len(lines), rounds, min_time)
+
+    return results
@@ -0,0 +1,121 @@
+"""
+Benchmarks for RawMessage.parse_raw_message, TwitchIRC.parse_raw_message and
+dispatch through TwitchIRC.receive_messages.
+"""
+import asyncio
+from typing import Callable
+
+import websockets.exceptions
+
+from app.twitch_irc import CLASS_COMMAND_MAPPING, RawMessage, TwitchIRC
+from benchmarks.corpus import CORPORA, payload
+from benchmarks.harness import measure
+
+
+class ReplayWebSocket:
+    """
+    Stands in for the websocket in TwitchIRC.receive_messages, handing out a
+    fixed list of frames and then closing.
+    """
+    def __init__(self, frames: list[str]) -> None:
+        self.frames = frames
+        self.index = 0
+
+    async def recv(self) -> str:
+        if self.index == len(self.frames):
+            raise websockets.exceptions.ConnectionClosed(None, None)
+
+        self.index += 1
+        return self.frames[self.index - 1]
+
+    async def send(self, message: str) -> None:
+        pass
+
+
+def create_client(**kwargs) -> TwitchIRC:
+    return TwitchIRC(
+        "benchmark",
+        "token",
+        channels=[],
+        send_queue=asyncio.Queue(),
+        message_queue=asyncio.Queue(),
+        flag=asyncio.Event(),
+        **kwargs,
+    )
+
+
+def frames_of(data: str, size: int = 1024) -> list[str]:
+    # Fixed-size frames so lines regularly straddle a frame boundary
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+def raw_message(data: str) -> Callable[[], object]:
+    return lambda: RawMessage.parse_raw_message(data)
+
+
+def parse_validate(data: str) -> Callable[[], object]:
+    client = create_client(validate=True, commands=CLASS_COMMAND_MAPPING)
+    return lambda: client.parse_raw_message(data)
+
+
+def parse_fast(data: str) -> Callable[[], object]:
+    client = create_client(commands=CLASS_COMMAND_MAPPING)
+    return lambda: client.parse_raw_message(data)
+
+
+def parse_default(data: str) -> Callable[[], object]:
+    client = create_client()
+    return lambda: client.parse_raw_message(data)
+
+
+class Dispatch:
+    """
+    Feeds the frames through receive_messages on a loop of its own, which
+    `close` shuts once the measurement is done.
+    """
+    def __init__(self, data: str) -> None:
+        self.client = create_client()
+        self.frames = frames_of(data)
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self) -> None:
+        self.loop.run_until_complete(self.client.receive_messages(ReplayWebSocket(self.frames)))
+        self.client.message_queue = asyncio.Queue()
+
+    def close(self) -> None:
+        self.loop.close()
+
+
+def dispatch(data: str) -> Callable[[], object]:
+    return Dispatch(data)
+
+
+TARGETS = {
+    'raw_message': raw_message,
+    'parse_validate': parse_validate,
+    'parse_fast': parse_fast,
+    'parse_default': parse_default,
+    'dispatch': dispatch,
+}
+
+
+def run(rounds: int = 5, min_time: float = 0.1, only: str | None = None) -> dict[str, dict[str, float]]:
+    results = {}
+
+    for target, factory in TARGETS.items():
+        for corpus, lines in CORPORA.items():
+            name = f"{target}/{corpus}"
+
+            if only and only not in name:
+                continue
+
+            target = factory(payload(lines))
+
+            try:
+                results[name] = measure(target, len(lines), rounds, min_time)
+            finally:
+                # Targets holding resources, such as an event loop, release them here
+                if hasattr(target, 'close'):
+                    target.close()
+
+    return results
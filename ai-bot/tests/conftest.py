@@ -0,0 +1,17 @@
+import pytest
+
+
+class FakeClock:
+    """
+    Stands in for time.monotonic; tests move `now` by hand.
+    """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    return FakeClock()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from app.ai import AI
+from app.twitch_irc import FastPrivateMessage
+
+
+class SlowChat:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    async def generate_response(self, username: str, message: str) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.calls.append((username, message))
+
+        await asyncio.sleep(self.latency)
+
+        self.active -= 1
+        return f"@{username} ok {message}"
+
+
+def mention(username: str, text: str) -> FastPrivateMessage:
+    return FastPrivateMessage("PRIVMSG", None, username, "channel", f"@bot {text}")
+
+
+def create_ai(concurrency: int, latency: float) -> AI:
+    ai = AI(["bot"], asyncio.Queue(), asyncio.Queue(), asyncio.Event(), None, concurrency=concurrency)
+    ai.openai_chat = SlowChat(latency)
+
+    return ai
+
+
+async def answer(ai: AI, messages: list[FastPrivateMessage], expected: int | None = None) -> list[str]:
+    for message in messages:
+        ai.message_queue.put_nowait(message)
+
+    task = asyncio.create_task(ai.process_messages())
+    responses = [
+        (await asyncio.wait_for(ai.send_queue.get(), 1)).message
+        for _ in range(len(messages) if expected is None else expected)
+    ]
+    task.cancel()
+
+    return responses
+
+
+class TestAIWorkers:
+    def test_same_user_is_answered_in_order(self) -> None:
+        ai = create_ai(concurrency=4, latency=0.01)
+        responses = asyncio.run(answer(ai, [mention("a", str(index)) for index in range(5)]))
+
+        assert responses == [f"@a ok bot {index}" for index in range(5)]
+        assert ai.openai_chat.peak == 1
+
+    def test_users_run_in_parallel_up_to_limit(self) -> None:
+        ai = create_ai(concurrency=3, latency=0.05)
+        start = time.monotonic()
+
+        asyncio.run(answer(ai, [mention(f"user{index}", "hi") for index in range(6)]))
+
+        assert ai.openai_chat.peak == 3
+        assert time.monotonic() - start < 0.25
+
+    def test_non_mentions_are_ignored(self) -> None:
+        ai = create_ai(concurrency=1, latency=0)
+        message = FastPrivateMessage("PRIVMSG", None, "a", "channel", "just chatting")
+        responses = asyncio.run(answer(ai, [message, mention("b", "hi")], expected=1))
+
+        assert responses == ["@b ok bot hi"]
+        assert ai.openai_chat.calls == [("b", "bot hi")]
+
+    def test_cancelled_workers_finish_before_returning(self) -> None:
+        ai = create_ai(concurrency=2, latency=0)
+        unwound = []
+
+        async def generate_response(username: str, message: str) -> str:
+            try:
+                await asyncio.sleep(10)
+            finally:
+                await asyncio.sleep(0.01)
+                unwound.append(username)
+
+        ai.openai_chat.generate_response = generate_response
+
+        async def run() -> None:
+            ai.message_queue.put_nowait(mention("a", "hi"))
+            task = asyncio.create_task(ai.process_messages())
+            await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+
+        assert unwound == ["a"]
+        assert ai.scheduler.stats()['busy'] == 0
+
+
+class StreamingChat:
+    async def stream_response(self, username: str, message: str):
+        for chunk in [f"@{username} First.", "Second."]:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class TestAIStreaming:
+    def test_each_chunk_is_sent(self) -> None:
+        ai = AI(["bot"], asyncio.Queue(), asyncio.Queue(), asyncio.Event(), None, stream=True)
+        ai.openai_chat = StreamingChat()
+
+        responses = asyncio.run(answer(ai, [mention("a", "hi")], expected=2))
+
+        assert responses == ["@a First.", "Second."]
@@ -0,0 +1,149 @@
+import asyncio
+import random
+import re
+
+import pytest
+
+from app.backends import BackendException, HTTPBackend
+from app.stub_server import StubServer, latency_distribution
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def with_stub(stub: StubServer, fn):
+    server = await asyncio.start_server(stub.handler, "localhost", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    backend = HTTPBackend(f"http://localhost:{port}/v1/chat/completions", timeout=5)
+
+    try:
+        return await fn(backend)
+    finally:
+        await backend.close()
+        server.close()
+        await server.wait_closed()
+
+
+class TestHTTPBackend:
+    def test_complete(self) -> None:
+        stub = StubServer(["go away"])
+
+        async def complete(backend: HTTPBackend) -> tuple[list[str], HTTPBackend]:
+            return [await backend.complete(MESSAGES) for _ in range(3)], backend
+
+        responses, backend = asyncio.run(with_stub(stub, complete))
+
+        assert responses == ["go away"] * 3
+        assert backend.latency.count == 3
+        assert stub.requests == 3
+
+    def test_stream(self) -> None:
+        stub = StubServer(["go away now"], token_interval=0)
+
+        async def stream(backend: HTTPBackend) -> tuple[list[str], HTTPBackend]:
+            return [delta async for delta in backend.stream(MESSAGES)], backend
+
+        deltas, backend = asyncio.run(with_stub(stub, stream))
+
+        assert deltas == ["go", " away", " now"]
+        assert backend.first_token.count == 1
+        assert backend.latency.count == 1
+
+    def test_errors_are_raised_and_counted(self) -> None:
+        stub = StubServer(error_rate=1.0)
+
+        async def complete(backend: HTTPBackend) -> HTTPBackend:
+            with pytest.raises(BackendException):
+                await backend.complete(MESSAGES)
+
+            return backend
+
+        backend = asyncio.run(with_stub(stub, complete))
+
+        assert backend.errors == 1
+        assert backend.latency.count == 0
+        assert backend.summary()['backend'] == "http"
+
+
+class TestHTTPClient:
+    def test_chunked_stream_with_api_key(self) -> None:
+        requests = []
+        events = [
+            'data: {"choices": [{"delta": {"content": "go"}}]}\n\n',
+            'data: {"choices": [{"delta": {"content": " away"}}]}\n\ndata: [DONE]\n\n',
+        ]
+
+        async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            requests.append(await reader.readuntil(b"\r\n\r\n"))
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+
+            # Split mid-line, as servers are free to
+            data = "".join(events).encode()
+            for chunk in (data[:10], data[10:50], data[50:]):
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            await reader.read()
+            writer.close()
+
+        async def stream() -> list[str]:
+            server = await asyncio.start_server(handler, "localhost", 0)
+            port = server.sockets[0].getsockname()[1]
+            backend = HTTPBackend(f"http://localhost:{port}/v1/chat/completions", timeout=5, api_key="secret")
+
+            try:
+                return [delta async for delta in backend.stream(MESSAGES)]
+            finally:
+                await backend.close()
+                server.close()
+
+        assert asyncio.run(stream()) == ["go", " away"]
+        assert b"Authorization: Bearer secret\r\n" in requests[0]
+
+    def test_connections_are_reused(self) -> None:
+        connections = []
+        body = b'{"choices": [{"message": {"content": "go away"}}]}'
+
+        async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            connections.append(writer)
+
+            try:
+                while headers := await reader.readuntil(b"\r\n\r\n"):
+                    length = re.search(rb"(?i)content-length: (\d+)", headers)
+                    await reader.readexactly(int(length.group(1)))
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+                    await writer.drain()
+            except asyncio.IncompleteReadError:
+                writer.close()
+
+        async def complete() -> list[str]:
+            server = await asyncio.start_server(handler, "localhost", 0)
+            port = server.sockets[0].getsockname()[1]
+            backend = HTTPBackend(f"http://localhost:{port}/v1/chat/completions", timeout=5)
+
+            try:
+                return [await backend.complete(MESSAGES) for _ in range(3)]
+            finally:
+                await backend.close()
+                server.close()
+
+        assert asyncio.run(complete()) == ["go away"] * 3
+        assert len(connections) == 1
+
+
+class TestLatencyDistribution:
+    def test_distributions(self) -> None:
+        rng = random.Random(1)
+
+        assert latency_distribution("fixed:0.25")() == 0.25
+        assert all(0.1 <= latency_distribution("uniform:0.1,0.2", rng)() <= 0.2 for _ in range(100))
+        assert all(latency_distribution("normal:0,1", rng)() >= 0 for _ in range(100))
+
+        samples = [latency_distribution("exponential:0.5", rng)() for _ in range(2000)]
+        assert 0.4 < sum(samples) / len(samples) < 0.6
+
+    def test_unknown_distribution(self) -> None:
+        with pytest.raises(ValueError):
+            latency_distribution("pareto:1")
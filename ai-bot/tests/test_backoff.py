@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+import websockets.exceptions
+
+from app.backoff import Backoff
+from app.twitch_irc import SendMessage, TwitchIRC
+
+
+class ClosedWebSocket:
+    async def send(self, message: str) -> None:
+        raise websockets.exceptions.ConnectionClosed(None, None)
+
+
+class TestBackoff:
+    def test_delays_grow_to_maximum(self) -> None:
+        backoff = Backoff(initial=1.0, maximum=8.0, rng=lambda: 1.0)
+
+        assert [backoff.next_delay() for _ in range(5)] == [1.0, 2.0, 4.0, 8.0, 8.0]
+
+        backoff.reset()
+        assert backoff.next_delay() == 1.0
+
+    def test_long_outage_stays_at_maximum(self) -> None:
+        backoff = Backoff(initial=1.0, maximum=8.0, rng=lambda: 1.0)
+
+        for _ in range(5000):
+            backoff.next_delay()
+
+        assert backoff.next_delay() == 8.0
+        assert backoff.attempts == 3
+
+    def test_jitter_keeps_a_floor(self) -> None:
+        backoff = Backoff(initial=4.0, rng=lambda: 0.0)
+
+        assert backoff.next_delay() == 2.0
+
+
+class TestInFlightMessages:
+    def test_failed_send_is_requeued_first(self) -> None:
+        client = TwitchIRC("bot", "token", [], asyncio.Queue(), asyncio.Queue(), asyncio.Event())
+        client.scheduler.put(SendMessage(channel="a", message="first"))
+        client.scheduler.put(SendMessage(channel="a", message="second"))
+
+        with pytest.raises(websockets.exceptions.ConnectionClosed):
+            asyncio.run(client.process_send_queue(ClosedWebSocket()))
+
+        assert len(client.scheduler) == 2
+        assert [message.message for message in client.scheduler.drain()] == ["first", "second"]
+
+    def test_run_waits_for_its_tasks(self) -> None:
+        async def close(websocket) -> None:
+            # PASS, NICK and CAP REQ, then hang up
+            for _ in range(3):
+                await websocket.recv()
+
+            await websocket.close()
+
+        async def run() -> list[asyncio.Task]:
+            async with websockets.serve(close, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                client = TwitchIRC(
+                    "bot", "token", ["a"], asyncio.Queue(), asyncio.Queue(), asyncio.Event(),
+                    twitch_ws_uri=f"ws://localhost:{port}",
+                )
+                await client.run()
+
+                return [
+                    task for task in asyncio.all_tasks()
+                    if task.get_coro().__qualname__.startswith("TwitchIRC.")
+                ]
+
+        assert asyncio.run(run()) == []
@@ -0,0 +1,65 @@
+import asyncio
+
+from app.ai import OpenAIChat
+from app.batching import MentionBatcher
+
+
+class BatchingChat:
+    def __init__(self, skip: set[str] | None = None) -> None:
+        self.skip = skip or set()
+        self.single = []
+        self.batches = []
+
+    async def generate_response(self, username: str, message: str) -> str:
+        self.single.append(username)
+        return f"@{username} single"
+
+    async def generate_batch_response(self, mentions: list[tuple[str, str]]) -> dict[str, str]:
+        self.batches.append([username for username, _ in mentions])
+        return {username: f"@{username} batched" for username, _ in mentions if username not in self.skip}
+
+
+async def submit_all(batcher: MentionBatcher, mentions: list[tuple[str, str]]) -> list[str]:
+    return await asyncio.gather(*(
+        batcher.submit(channel, username, "hi")
+        for channel, username in mentions
+    ))
+
+
+class TestMentionBatcher:
+    def test_burst_is_one_completion(self) -> None:
+        chat = BatchingChat()
+        batcher = MentionBatcher(chat, window=0.01)
+
+        responses = asyncio.run(submit_all(batcher, [("c", "a"), ("c", "b"), ("c", "d")]))
+
+        assert responses == ["@a batched", "@b batched", "@d batched"]
+        assert chat.batches == [["a", "b", "d"]]
+        assert (batcher.requests, batcher.mentions) == (1, 3)
+
+    def test_batches_are_per_channel_and_size_bounded(self) -> None:
+        chat = BatchingChat()
+        batcher = MentionBatcher(chat, window=0.01, max_size=2)
+
+        asyncio.run(submit_all(batcher, [("c", "a"), ("c", "b"), ("c", "d"), ("e", "f")]))
+
+        assert sorted(chat.batches) == [["a", "b"]]
+        assert sorted(chat.single) == ["d", "f"]
+
+    def test_skipped_users_are_answered_individually(self) -> None:
+        chat = BatchingChat(skip={"b"})
+        batcher = MentionBatcher(chat, window=0.01)
+
+        responses = asyncio.run(submit_all(batcher, [("c", "a"), ("c", "b")]))
+
+        assert responses == ["@a batched", "@b single"]
+
+
+class TestSplitBatchResponse:
+    def test_split(self) -> None:
+        content = "Alice: go away\n@bob: no\nstranger: hi\ncarol:\nnot a reply"
+
+        assert OpenAIChat.split_batch_response(content, {"alice", "bob", "carol"}) == {
+            "alice": "go away",
+            "bob": "no",
+        }
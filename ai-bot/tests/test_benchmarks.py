@@ -0,0 +1,32 @@
+from benchmarks import mentions, parser
+from benchmarks.harness import regressions
+
+
+class TestBenchmarks:
+    def test_parser_benchmarks_run(self) -> None:
+        results = parser.run(rounds=1, min_time=0, only='mixed')
+
+        assert set(results) == {f"{target}/mixed" for target in parser.TARGETS}
+        assert all(result['lines_per_second'] > 0 for result in results.values())
+
+    def test_mention_benchmarks_agree(self) -> None:
+        lines = mentions.chat_lines(200)
+
+        for aliases in mentions.ALIASES.values():
+            counts = {target: factory(lines, aliases)() for target, factory in mentions.TARGETS.items()}
+            assert len(set(counts.values())) == 1
+
+        results = mentions.run(rounds=1, min_time=0)
+        assert len(results) == len(mentions.TARGETS) * len(mentions.ALIASES)
+
+    def test_regressions(self) -> None:
+        results = {
+            'fast': {'lines_per_second': 90.0},
+            'slow': {'lines_per_second': 70.0},
+        }
+        baseline = {'fast': 100.0, 'slow': 100.0, 'removed': 100.0}
+
+        failures = regressions(results, baseline, threshold=0.2)
+
+        assert len(failures) == 1
+        assert failures[0].startswith('slow:')
@@ -0,0 +1,97 @@
+from app import tokens
+from app.conversation import Conversation, ConversationStore, HistoricalMessage
+
+
+def exchange(text: str) -> HistoricalMessage:
+    return HistoricalMessage(message=text, response=text)
+
+
+class TestConversationStore:
+    def test_history_ring(self) -> None:
+        store = ConversationStore(history_size=2)
+
+        for text in ["a", "b", "c"]:
+            store.add("user", exchange(text))
+
+        assert [item.message for item in store.get("user").history] == ["b", "c"]
+        assert store.bytes == sum(item.size for item in store.get("user").history)
+
+    def test_least_recently_used_user_is_evicted(self) -> None:
+        store = ConversationStore(max_users=2)
+        store.add("a", exchange("1"))
+        store.add("b", exchange("2"))
+
+        # Reading "a" makes "b" the least recently used
+        store.get("a")
+        store.add("c", exchange("3"))
+
+        assert "a" in store
+        assert "b" not in store
+        assert store.evictions == 1
+
+    def test_byte_budget(self) -> None:
+        size = exchange("x" * 100).size
+        store = ConversationStore(max_bytes=size * 3)
+
+        for user in ["a", "b", "c", "d"]:
+            store.add(user, exchange("x" * 100))
+
+        assert len(store) == 3
+        assert "a" not in store
+        assert store.bytes <= store.max_bytes
+
+    def test_single_conversation_over_budget_is_trimmed(self) -> None:
+        size = exchange("x" * 100).size
+        store = ConversationStore(max_bytes=size * 2)
+
+        for _ in range(5):
+            store.add("a", exchange("x" * 100))
+
+        assert len(store.get("a")) == 2
+        assert store.memory_usage() == {'users': 1, 'exchanges': 2, 'bytes': size * 2, 'evictions': 0}
+
+    def test_token_budget(self) -> None:
+        item = exchange("x" * 100)
+        store = ConversationStore(max_tokens=item.tokens * 2)
+
+        for _ in range(5):
+            store.add("a", exchange("x" * 100))
+
+        conversation = store.get("a")
+        assert len(conversation) == 2
+        assert conversation.tokens == item.tokens * 2
+        assert len(conversation.messages) == 4
+
+
+class TestConversation:
+    def test_rendered_messages_are_reused(self) -> None:
+        conversation = Conversation(size=2)
+
+        for text in ["a", "b"]:
+            conversation.add(exchange(text))
+
+        second = conversation.messages[2]
+        conversation.add(exchange("c"))
+
+        # The turns that remain are the same objects, in the same order
+        assert conversation.messages[0] is second
+        assert [message["content"] for message in conversation.messages] == ["b", "b", "c", "c"]
+        assert conversation.tokens == sum(item.tokens for item in conversation.history)
+
+    def test_oversized_exchange_is_kept_alone(self) -> None:
+        conversation = Conversation(size=10, max_tokens=10)
+        conversation.add(exchange("a"))
+        oversized = exchange("x" * 1000)
+        conversation.add(oversized)
+
+        assert list(conversation.history) == [oversized]
+        assert conversation.messages == oversized.messages
+        assert conversation.tokens == oversized.tokens
+
+
+class TestTokens:
+    def test_length_estimate_without_tokenizer(self, monkeypatch) -> None:
+        monkeypatch.setattr(tokens, "encoding", lambda: None)
+
+        assert tokens.count_tokens("x" * 10) == 3
+        assert tokens.count_message_tokens({"role": "user", "content": "x" * 8}) == tokens.MESSAGE_OVERHEAD + 2
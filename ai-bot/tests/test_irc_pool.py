@@ -0,0 +1,114 @@
+import asyncio
+
+from app.irc_pool import TwitchIRCPool
+from app.rate_limit import TokenBucket
+from app.twitch_irc import SendMessage
+from tests.conftest import FakeClock
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
+
+class TestTokenBucket:
+    def test_refills_over_time(self, fake_clock: FakeClock) -> None:
+        bucket = TokenBucket(2, 1.0, clock=fake_clock)
+
+        assert bucket.try_acquire()
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert bucket.delay() == 0.5
+
+        fake_clock.now = 0.5
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+
+
+class TestTwitchIRCPool:
+    def create_pool(self, channels: list[str], connections: int = 3) -> TwitchIRCPool:
+        return TwitchIRCPool(
+            "bot",
+            "token",
+            channels=channels,
+            send_queue=asyncio.Queue(),
+            message_queue=asyncio.Queue(),
+            flag=asyncio.Event(),
+            connections=connections,
+        )
+
+    def test_channels_are_spread(self) -> None:
+        pool = self.create_pool([f"channel{i}" for i in range(7)])
+
+        assert sorted(len(shard.channels) for shard in pool.shards) == [2, 2, 3]
+        assert len(pool.channel_shards) == 7
+
+    def test_rebalance_moves_channels_and_pending_messages(self) -> None:
+        pool = self.create_pool(["a", "b", "c", "d"], connections=2)
+        dead, live = pool.shards
+        live.websocket = FakeWebSocket()
+        dead.send_queue.put_nowait(SendMessage(channel=dead.channels[0], message="hello"))
+        moved = list(dead.channels)
+
+        asyncio.run(pool.rebalance(dead))
+
+        assert dead.channels == []
+        assert sorted(live.channels) == ["a", "b", "c", "d"]
+        assert all(pool.channel_shards[channel] is live for channel in moved)
+        assert [f"JOIN #{channel}" for channel in moved] == live.websocket.sent
+        assert live.send_queue.get_nowait().message == "hello"
+
+    def test_send_queue_is_routed_to_owner(self) -> None:
+        pool = self.create_pool(["a", "b"], connections=2)
+
+        async def route() -> None:
+            await pool.send_queue.put(SendMessage(channel="b", message="hi"))
+            task = asyncio.create_task(pool.route_send_queue())
+            await asyncio.sleep(0)
+            task.cancel()
+
+        asyncio.run(route())
+
+        assert pool.channel_shards["b"].send_queue.qsize() == 1
+        assert pool.channel_shards["a"].send_queue.qsize() == 0
+
+    def test_reconnected_connection_takes_back_its_share(self) -> None:
+        pool = self.create_pool(["a", "b", "c", "d"], connections=2)
+        dead, live = pool.shards
+        live.websocket = FakeWebSocket()
+
+        async def run() -> None:
+            await pool.rebalance(dead)
+            live.websocket.sent.clear()
+
+            dead.websocket = FakeWebSocket()
+            await pool.reclaim(dead)
+
+        asyncio.run(run())
+
+        assert len(dead.channels) == len(live.channels) == 2
+        assert all(pool.channel_shards[channel] is dead for channel in dead.channels)
+        assert live.websocket.sent == [f"PART #{channel}" for channel in dead.channels]
+        assert dead.websocket.sent == [f"JOIN #{channel}" for channel in dead.channels]
+
+    def test_reclaim_runs_once_connected(self) -> None:
+        pool = self.create_pool(["a", "b", "c"], connections=2)
+        shard, other = pool.shards
+        other.websocket = FakeWebSocket()
+
+        async def run() -> None:
+            await pool.rebalance(shard)
+            task = asyncio.create_task(pool.reclaim_on_connect(shard))
+            await asyncio.sleep(0)
+            assert shard.channels == []
+
+            shard.websocket = FakeWebSocket()
+            shard.connected.set()
+            await task
+
+        asyncio.run(run())
+
+        assert sorted(len(s.channels) for s in pool.shards) == [1, 2]
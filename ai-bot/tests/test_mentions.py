@@ -0,0 +1,30 @@
+from app.mentions import Mention, MentionMatcher
+
+
+class TestMentionMatcher:
+    def test_whole_words_only(self) -> None:
+        matcher = MentionMatcher(["CannibalJeebus", "cannibal"])
+
+        assert "@cannibal hi" in matcher
+        assert "hey Cannibal!" in matcher
+        assert "cannibalism is bad" not in matcher
+        assert "notcannibal" not in matcher
+
+    def test_reports_alias_and_span(self) -> None:
+        matcher = MentionMatcher(["cannibal", "cannibaljeebus"])
+        text = "yo @CannibalJeebus what"
+
+        assert matcher.search(text) == Mention("cannibaljeebus", 4, 18)
+        assert text[4:18] == "CannibalJeebus"
+
+    def test_aliases_are_escaped(self) -> None:
+        matcher = MentionMatcher(["b.t"])
+
+        assert "hi b.t" in matcher
+        assert "hi bot" not in matcher
+
+    def test_no_aliases(self) -> None:
+        matcher = MentionMatcher([])
+
+        assert matcher.search("anything") is None
+        assert "anything" not in matcher
@@ -0,0 +1,89 @@
+from app.metrics import Histogram
+from app.outbound import OutboundScheduler
+from app.twitch_irc import SendMessage
+from tests.conftest import FakeClock
+
+
+class TestOutboundScheduler:
+    def test_channels_are_served_round_robin(self, fake_clock: FakeClock) -> None:
+        scheduler = OutboundScheduler(clock=fake_clock)
+
+        for message in ["a1", "a2", "a3"]:
+            scheduler.put(SendMessage(channel="a", message=message))
+
+        scheduler.put(SendMessage(channel="b", message="b1"))
+
+        first, _ = scheduler.pop_ready()
+        second, _ = scheduler.pop_ready()
+        blocked, wait = scheduler.pop_ready()
+
+        assert [first.message, second.message] == ["a1", "b1"]
+        assert blocked is None
+        assert wait == 1.0
+
+    def test_slow_mode_and_moderator_exemption(self, fake_clock: FakeClock) -> None:
+        scheduler = OutboundScheduler(clock=fake_clock)
+        scheduler.update_room_state("a", {"slow": "10"})
+
+        scheduler.put(SendMessage(channel="a", message="one"))
+        scheduler.put(SendMessage(channel="a", message="two"))
+
+        assert scheduler.pop_ready()[0].message == "one"
+        assert scheduler.pop_ready() == (None, 10.0)
+
+        scheduler.update_user_state("a", {"mod": "1", "badges": "moderator/1"})
+        assert scheduler.pop_ready()[0].message == "two"
+
+    def test_user_state_after_a_send_keeps_the_wait(self, fake_clock: FakeClock) -> None:
+        scheduler = OutboundScheduler(clock=fake_clock)
+        scheduler.update_room_state("a", {"slow": "30"})
+
+        scheduler.put(SendMessage(channel="a", message="one"))
+        scheduler.put(SendMessage(channel="a", message="two"))
+        assert scheduler.pop_ready()[0].message == "one"
+
+        fake_clock.now = 0.05
+        scheduler.update_user_state("a", {"mod": "0", "badges": ""})
+        scheduler.update_room_state("a", {"slow": "30"})
+
+        blocked, wait = scheduler.pop_ready()
+        assert blocked is None
+        assert round(wait, 2) == 29.95
+
+        scheduler.update_room_state("a", {"slow": "60"})
+        assert scheduler.pop_ready()[0] is None
+
+    def test_global_limit(self, fake_clock: FakeClock) -> None:
+        scheduler = OutboundScheduler(clock=fake_clock)
+
+        for index in range(21):
+            scheduler.put(SendMessage(channel=f"channel{index}", message="hi"))
+
+        sent = [scheduler.pop_ready()[0] for _ in range(21)]
+
+        assert sent.count(None) == 1
+        fake_clock.now = 1.5
+        assert scheduler.pop_ready()[0] is not None
+
+    def test_wait_times_are_recorded(self, fake_clock: FakeClock) -> None:
+        scheduler = OutboundScheduler(clock=fake_clock)
+        scheduler.put(SendMessage(channel="a", message="hi"))
+
+        fake_clock.now = 0.2
+        scheduler.pop_ready()
+
+        assert scheduler.wait_times.count == 1
+        assert scheduler.wait_times.max == 0.2
+
+
+class TestHistogram:
+    def test_percentiles(self) -> None:
+        histogram = Histogram(bounds=(1.0, 2.0, 5.0))
+
+        for value in [0.5] * 50 + [1.5] * 45 + [4.0] * 4 + [9.0]:
+            histogram.observe(value)
+
+        assert histogram.percentile(50) == 1.0
+        assert histogram.percentile(95) == 2.0
+        assert histogram.percentile(99) == 5.0
+        assert histogram.percentile(100) == 9.0
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.queues import BoundedQueue, OverflowPolicy
+from app.twitch_irc import RawLine, FastPrivateMessage, UserRole
+
+
+class TestBoundedQueue:
+    def test_drop_oldest(self) -> None:
+        queue = BoundedQueue(2, OverflowPolicy.DROP_OLDEST)
+
+        for item in range(4):
+            queue.put_nowait(item)
+
+        assert [queue.get_nowait(), queue.get_nowait()] == [2, 3]
+        assert queue.evicted == 2
+        assert queue.dropped == 0
+
+    def test_drop_newest(self) -> None:
+        queue = BoundedQueue(2, OverflowPolicy.DROP_NEWEST)
+
+        for item in range(4):
+            asyncio.run(queue.put(item))
+
+        assert [queue.get_nowait(), queue.get_nowait()] == [0, 1]
+        assert queue.dropped == 2
+
+    def test_priority_evicts_lowest(self) -> None:
+        queue = BoundedQueue(3, OverflowPolicy.PRIORITY, priority=lambda item: item[0])
+
+        for item in [(1, "a"), (0, "b"), (0, "c")]:
+            queue.put_nowait(item)
+
+        queue.put_nowait((2, "d"))
+        queue.put_nowait((0, "e"))
+
+        assert [queue.get_nowait()[1] for _ in range(3)] == ["a", "d", "e"]
+        assert queue.evicted == 2
+        assert queue.dropped == 0
+
+    def test_priority_drops_incoming_when_lowest(self) -> None:
+        queue = BoundedQueue(1, OverflowPolicy.PRIORITY, priority=lambda item: item)
+        queue.put_nowait(3)
+        queue.put_nowait(1)
+
+        assert queue.get_nowait() == 3
+        assert queue.dropped == 1
+
+    def test_priority_evictions_stay_bounded(self) -> None:
+        queue = BoundedQueue(100, OverflowPolicy.PRIORITY, priority=lambda item: item[0])
+
+        for index in range(10000):
+            queue.put_nowait((index % 2, index))
+
+        assert queue.qsize() == 100
+        assert len(queue._queue) <= 200
+        assert [queue.get_nowait()[1] for _ in range(100)] == list(range(9801, 10000, 2))
+        assert queue.empty()
+
+    def test_evictions_keep_join_accounting(self) -> None:
+        async def drain() -> None:
+            queue = BoundedQueue(1, OverflowPolicy.DROP_OLDEST)
+            queue.put_nowait(1)
+            queue.put_nowait(2)
+            queue.get_nowait()
+            queue.task_done()
+
+            await asyncio.wait_for(queue.join(), 1)
+
+        asyncio.run(drain())
+
+
+class TestUserRole:
+    def test_from_tags(self) -> None:
+        assert UserRole.from_tags(None) == UserRole.VIEWER
+        assert UserRole.from_tags({"subscriber": "1", "mod": "0"}) == UserRole.SUBSCRIBER
+        assert UserRole.from_tags({"badges": "vip/1,subscriber/18", "vip": "1"}) == UserRole.VIP
+        assert UserRole.from_tags({"mod": "1"}) == UserRole.MODERATOR
+        assert UserRole.from_tags({"badges": "broadcaster/1"}) == UserRole.BROADCASTER
+
+    def test_private_message_role(self) -> None:
+        line = RawLine.parse("@badges=moderator/1;mod=1;subscriber=0 :g!g@g.tmi.twitch.tv PRIVMSG #g :hi")
+
+        assert FastPrivateMessage.from_raw_line(line).role == UserRole.MODERATOR
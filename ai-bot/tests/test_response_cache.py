@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.ai import OpenAIChat
+from app.conversation import HistoricalMessage
+from app.response_cache import ResponseCache
+from tests.conftest import FakeClock
+
+
+class CountingChat(OpenAIChat):
+    def __init__(self, cache: ResponseCache) -> None:
+        super().__init__(cache=cache)
+        self.calls = 0
+
+    async def complete(self, messages: list[dict[str, str]]) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+
+        return f"reply {self.calls}"
+
+
+class TestResponseCache:
+    def test_normalized_text_shares_an_entry(self) -> None:
+        cache = ResponseCache()
+        cache.put(cache.key("persona", "@Bot  hi!"), "go away")
+
+        assert cache.get(cache.key("persona", "bot hi")) == "go away"
+        assert cache.get(cache.key("other", "bot hi")) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_history_fingerprint(self) -> None:
+        cache = ResponseCache()
+        history = [HistoricalMessage(message="a", response="b")]
+        cache.put(cache.key("persona", "hi", history), "again?")
+
+        assert cache.get(cache.key("persona", "hi")) is None
+        assert cache.get(cache.key("persona", "hi", history)) == "again?"
+
+        cache.history = False
+        assert cache.key("persona", "hi", history) == cache.key("persona", "hi")
+
+    def test_entries_expire(self, fake_clock: FakeClock) -> None:
+        cache = ResponseCache(ttl=10.0, clock=fake_clock)
+        key = cache.key("persona", "hi")
+        cache.put(key, "go away")
+
+        fake_clock.now = 9.0
+        assert cache.get(key) == "go away"
+
+        fake_clock.now = 10.0
+        assert cache.get(key) is None
+        assert cache.expired == 1
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        cache = ResponseCache(max_entries=2)
+        keys = [cache.key("persona", text) for text in ["a", "b", "c"]]
+        cache.put(keys[0], "1")
+        cache.put(keys[1], "2")
+        cache.get(keys[0])
+        cache.put(keys[2], "3")
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == "1"
+        assert cache.get(keys[2]) == "3"
+
+    def test_identical_requests_are_coalesced(self) -> None:
+        cache = ResponseCache()
+        calls = []
+
+        async def create() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "go away"
+
+        async def main() -> list[str]:
+            key = cache.key("persona", "hi")
+            return await asyncio.gather(*(cache.get_or_create(key, create) for _ in range(5)))
+
+        assert asyncio.run(main()) == ["go away"] * 5
+        assert len(calls) == 1
+        assert cache.coalesced == 4
+        assert not cache.inflight
+
+    def test_failure_reaches_waiters_and_is_not_cached(self) -> None:
+        cache = ResponseCache()
+
+        async def create() -> str:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("down")
+
+        async def main() -> list:
+            key = cache.key("persona", "hi")
+            return await asyncio.gather(
+                *(cache.get_or_create(key, create) for _ in range(2)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(main())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(cache) == 0
+
+    def test_cancelled_leader_hands_over_to_waiter(self) -> None:
+        cache = ResponseCache()
+
+        async def create() -> str:
+            await asyncio.sleep(0.01)
+            return "go away"
+
+        async def main() -> str:
+            key = cache.key("persona", "hi")
+            leader = asyncio.create_task(cache.get_or_create(key, create))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(cache.get_or_create(key, create))
+            await asyncio.sleep(0)
+            leader.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+
+            return await waiter
+
+        assert asyncio.run(main()) == "go away"
+
+
+class TestCachedChat:
+    def test_repeated_prompt_skips_completion(self) -> None:
+        chat = CountingChat(ResponseCache(history=False))
+
+        async def main() -> list[str]:
+            return [
+                await chat.generate_response("a", "bot hi"),
+                await chat.generate_response("a", "@bot HI"),
+            ]
+
+        assert asyncio.run(main()) == ["@a reply 1", "@a reply 1"]
+        assert chat.calls == 1
+        assert chat.message_history.get("a").history[1].response == "reply 1"
+
+    def test_users_named_in_the_prompt_do_not_share(self) -> None:
+        chat = CountingChat(ResponseCache(history=False))
+
+        async def main() -> list[str]:
+            return [
+                await chat.generate_response("bob", "bot hi"),
+                await chat.generate_response("alice", "bot hi"),
+            ]
+
+        assert asyncio.run(main()) == ["@bob reply 1", "@alice reply 2"]
+
+        chat.SYSTEM_PROMPT = "You are a rude human chatter in a chat room."
+        assert chat.cache_key("bob", "bot hi") == chat.cache_key("alice", "bot hi")
@@ -0,0 +1,104 @@
+import asyncio
+
+from app.scheduler import MentionScheduler
+from app.twitch_irc import FastPrivateMessage, Tags
+from tests.conftest import FakeClock
+
+
+def mention(username: str, text: str = "hi", tags: str = "") -> FastPrivateMessage:
+    return FastPrivateMessage("PRIVMSG", Tags(tags) if tags else None, username, "channel", f"@bot {text}")
+
+
+def drain(scheduler: MentionScheduler) -> list[str]:
+    order = []
+
+    while (message := scheduler.pop_ready()) is not None:
+        order.append(message.username)
+        scheduler.done(message)
+
+    return order
+
+
+class TestMentionScheduler:
+    def test_role_outranks_viewers(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(clock=fake_clock)
+
+        for index in range(3):
+            scheduler.put(mention(f"viewer{index}"))
+
+        scheduler.put(mention("sub", tags="subscriber=1"))
+        scheduler.put(mention("mod", tags="mod=1"))
+
+        assert drain(scheduler) == ["mod", "sub", "viewer0", "viewer1", "viewer2"]
+
+    def test_age_eventually_beats_role(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(role_weight=10.0, age_weight=1.0, clock=fake_clock)
+        scheduler.put(mention("viewer"))
+        fake_clock.now = 15.0
+        scheduler.put(mention("sub", tags="subscriber=1"))
+
+        assert drain(scheduler) == ["viewer", "sub"]
+
+    def test_one_mention_per_user_at_a_time_in_order(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(clock=fake_clock)
+        scheduler.put(mention("a", "1"))
+        scheduler.put(mention("a", "2"))
+        scheduler.put(mention("b"))
+
+        first = scheduler.pop_ready()
+        second = scheduler.pop_ready()
+
+        assert (first.message, second.username) == ("@bot 1", "b")
+        assert scheduler.pop_ready() is None
+
+        scheduler.done(first)
+        assert scheduler.pop_ready().message == "@bot 2"
+
+    def test_recently_answered_users_yield(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(clock=fake_clock)
+        scheduler.put(mention("chatty"))
+        assert drain(scheduler) == ["chatty"]
+
+        scheduler.put(mention("chatty"))
+        scheduler.put(mention("quiet"))
+        assert drain(scheduler) == ["quiet", "chatty"]
+
+        # Once the answers have decayed the two are even again
+        fake_clock.now = 1000.0
+        scheduler.put(mention("chatty"))
+        fake_clock.now = 1000.5
+        scheduler.put(mention("quiet"))
+        assert drain(scheduler) == ["chatty", "quiet"]
+
+    def test_stale_mentions_expire(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(max_age=30.0, clock=fake_clock)
+        scheduler.put(mention("old"))
+        fake_clock.now = 20.0
+        scheduler.put(mention("new"))
+        fake_clock.now = 31.0
+
+        assert drain(scheduler) == ["new"]
+        assert scheduler.expired == 1
+        assert len(scheduler) == 0
+
+    def test_lowest_score_is_dropped_when_full(self, fake_clock: FakeClock) -> None:
+        scheduler = MentionScheduler(max_pending=2, clock=fake_clock)
+        scheduler.put(mention("mod", tags="mod=1"))
+        scheduler.put(mention("viewer"))
+        scheduler.put(mention("sub", tags="subscriber=1"))
+
+        assert drain(scheduler) == ["mod", "sub"]
+        assert scheduler.dropped == 1
+
+    def test_get_waits_for_a_mention(self) -> None:
+        scheduler = MentionScheduler()
+
+        async def main() -> str:
+            task = asyncio.create_task(scheduler.get())
+            await asyncio.sleep(0)
+            assert not task.done()
+
+            scheduler.put(mention("a"))
+            return (await asyncio.wait_for(task, 1)).username
+
+        assert asyncio.run(main()) == "a"
@@ -0,0 +1,111 @@
+import asyncio
+
+from app.conversation import ConversationStore, HistoricalMessage
+from app.outbound import OutboundScheduler
+from app.snapshots import Snapshotter, SnapshotStore
+
+
+def exchange(text: str) -> HistoricalMessage:
+    return HistoricalMessage(message=text, response=f"re {text}")
+
+
+class FakeChannels:
+    def __init__(self, scheduler: OutboundScheduler) -> None:
+        self.scheduler = scheduler
+
+    def channel_states(self) -> dict[str, dict[str, bool | int]]:
+        return self.scheduler.snapshot()
+
+
+class TestSnapshots:
+    def test_history_is_restored_lazily(self, tmp_path) -> None:
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        conversations = ConversationStore()
+
+        for text in ["a", "b"]:
+            conversations.add("user", exchange(text))
+
+        conversations.add("other", exchange("c"))
+        Snapshotter(store, conversations).save()
+        store.close()
+
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        loads = []
+
+        def restore(username: str):
+            loads.append(username)
+            return store.load_conversation(username)
+
+        restarted = ConversationStore(restore=restore)
+        assert len(restarted) == 0
+
+        history = restarted.get("user").history
+        restarted.get("user")
+
+        assert [item.message for item in history] == ["a", "b"]
+        assert loads == ["user"]
+        assert restarted.restored == 1
+        assert restarted.bytes == restarted.get("user").bytes
+
+    def test_only_changed_conversations_are_written(self, tmp_path) -> None:
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        conversations = ConversationStore()
+        snapshotter = Snapshotter(store, conversations)
+
+        conversations.add("a", exchange("1"))
+        assert set(conversations.take_dirty()) == {"a"}
+        assert conversations.take_dirty() == {}
+
+        conversations.add("b", exchange("2"))
+        conversations.get("a")
+        snapshotter.save()
+
+        assert store.load_conversation("a") is None
+        assert [item.message for item in store.load_conversation("b")] == ["2"]
+
+    def test_evicted_changes_are_kept_for_the_snapshot(self, tmp_path) -> None:
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        conversations = ConversationStore(max_users=1, restore=store.load_conversation)
+
+        conversations.add("a", exchange("1"))
+        conversations.add("b", exchange("2"))
+        assert "a" not in conversations
+
+        # Coming back before the snapshot is taken finds the unsaved history
+        assert [item.message for item in conversations.get("a").history] == ["1"]
+
+        Snapshotter(store, conversations).save()
+        assert [item.message for item in store.load_conversation("a")] == ["1"]
+        assert [item.message for item in store.load_conversation("b")] == ["2"]
+
+    def test_channel_state_round_trip(self, tmp_path) -> None:
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        scheduler = OutboundScheduler()
+        scheduler.update_user_state("mine", {"mod": "1"})
+        scheduler.update_room_state("slow", {"slow": "30"})
+
+        Snapshotter(store, ConversationStore(), FakeChannels(scheduler)).save()
+
+        restarted = OutboundScheduler()
+        restarted.restore(store.load_channels())
+
+        assert restarted.channel_state("mine").privileged
+        assert restarted.channel_state("mine").bucket is None
+        assert restarted.channel_state("slow").slow == 30
+        assert restarted.channel_state("slow").bucket.per == 30.0
+
+    def test_periodic_snapshots(self, tmp_path) -> None:
+        store = SnapshotStore(str(tmp_path / "snapshot.db"))
+        conversations = ConversationStore()
+        snapshotter = Snapshotter(store, conversations, interval=0.01)
+        conversations.add("a", exchange("1"))
+
+        async def main() -> None:
+            task = asyncio.create_task(snapshotter.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(main())
+
+        assert snapshotter.snapshots >= 1
+        assert store.load_conversation("a") is not None
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from app.ai import AI
+from app.irc_pool import TwitchIRCPool
+from app.queues import BoundedQueue, OverflowPolicy
+from app.stats import StatsReporter
+from app.twitch_irc import SendMessage
+
+
+class TestStatsReporter:
+    def test_shard_queue_drops_are_reported(self, caplog: pytest.LogCaptureFixture) -> None:
+        send_queue = BoundedQueue(1, OverflowPolicy.DROP_OLDEST)
+        pool = TwitchIRCPool(
+            "bot", "token", ["a"], send_queue, asyncio.Queue(), asyncio.Event(), connections=1,
+        )
+        shard_queue = pool.shards[0].send_queue
+
+        for message in ("one", "two"):
+            shard_queue.put_nowait(SendMessage(channel="a", message=message))
+
+        reporter = StatsReporter({'send_queue': send_queue.stats, 'irc': pool.summary})
+
+        with caplog.at_level(logging.INFO, logger="app.stats"):
+            reporter.report()
+
+        stats = json.loads(caplog.records[0].getMessage().removeprefix("stats "))
+        shard = stats['irc']['shards'][0]
+        assert shard['send_queue']['evicted'] == 1
+        assert shard['channels'] == 1
+        assert shard['outbound_wait']['count'] == 0
+        assert stats['send_queue']['size'] == 0
+
+    def test_ai_summary_is_serializable(self) -> None:
+        ai = AI(["bot"], asyncio.Queue(), asyncio.Queue(), asyncio.Event(), None)
+        stats = StatsReporter({'ai': ai.summary}).collect()
+
+        assert json.loads(json.dumps(stats))['ai']['backend']['latency']['count'] == 0
+        assert stats['ai']['cache'] is None
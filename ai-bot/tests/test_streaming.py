@@ -0,0 +1,85 @@
+import asyncio
+
+from app.ai import OpenAIChat
+from app.streaming import ChatChunker
+
+
+def chunk_all(chunker: ChatChunker, deltas: list[str]) -> list[list[str]]:
+    return [chunker.feed(delta) for delta in deltas] + [chunker.close()]
+
+
+class FakeStreamChat(OpenAIChat):
+    def __init__(self, deltas: list[str]) -> None:
+        super().__init__()
+        self.deltas = deltas
+        self.requests = []
+
+    async def stream_completion(self, messages: list[dict[str, str]]):
+        self.requests.append(messages)
+
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            yield delta
+
+
+class TestChatChunker:
+    def test_first_sentence_is_released_early(self) -> None:
+        chunker = ChatChunker(prefix="@a ")
+        emitted = chunk_all(chunker, ["Go ", "away. ", "Nobody ", "asked", "."])
+
+        assert emitted == [[], ["@a Go away."], [], [], [], ["Nobody asked."]]
+
+    def test_decimal_point_does_not_end_a_sentence(self) -> None:
+        chunker = ChatChunker()
+
+        assert chunker.feed("It costs 3.") == []
+        assert chunker.feed("14 dollars. ") == ["It costs 3.14 dollars."]
+
+    def test_long_text_is_split_at_word_boundaries(self) -> None:
+        chunker = ChatChunker(prefix="@a ", limit=20)
+        emitted = [chunk for chunks in chunk_all(chunker, ["word " * 12]) for chunk in chunks]
+
+        assert all(len(chunk) <= 20 for chunk in emitted)
+        assert emitted[0].startswith("@a word")
+        assert " ".join(emitted)[3:].split() == ["word"] * 12
+
+    def test_unbroken_text_is_hard_split(self) -> None:
+        chunker = ChatChunker(limit=10)
+        emitted = [chunk for chunks in chunk_all(chunker, ["x" * 25]) for chunk in chunks]
+
+        assert emitted == ["x" * 10, "x" * 10, "x" * 5]
+
+    def test_empty_completion_still_answers(self) -> None:
+        assert ChatChunker(prefix="@a ").close() == ["@a"]
+
+
+class TestStreamResponse:
+    def test_history_is_committed_after_the_stream(self) -> None:
+        chat = FakeStreamChat(["Hi. ", "What ", "now?"])
+
+        async def consume() -> list[str]:
+            chunks = []
+
+            async for chunk in chat.stream_response("a", "hello"):
+                chunks.append(chunk)
+                assert not chat.message_history.get("a").history
+
+            return chunks
+
+        assert asyncio.run(consume()) == ["@a Hi.", "What now?"]
+
+        history = chat.message_history.get("a").history
+        assert [(item.message, item.response) for item in history] == [("hello", "Hi. What now?")]
+
+    def test_abandoned_stream_leaves_no_history(self) -> None:
+        chat = FakeStreamChat(["Hi. ", "What ", "now?"])
+
+        async def first() -> str:
+            stream = chat.stream_response("a", "hello")
+            chunk = await stream.__anext__()
+            await stream.aclose()
+
+            return chunk
+
+        assert asyncio.run(first()) == "@a Hi."
+        assert not chat.message_history.get("a").history
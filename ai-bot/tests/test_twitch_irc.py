@@ -1,4 +1,18 @@
-from app.twitch_irc import RawMessage, PrivateMessage
+import asyncio
+
+from app.twitch_irc import (
+    FastJoinMessage,
+    FastPrivateMessage,
+    JoinMessage,
+    LineDecoder,
+    RawLine,
+    RawMessage,
+    PrivateMessage,
+    Tags,
+    TwitchIRC,
+    peek_command,
+    unescape_tag_value,
+)
 
 
 class TestRawMessage:
@@ -43,3 +57,127 @@ class TestRawMessage:
         assert message.message == "FeelsWeirdMan FeelsWeirdMan"
 
 
+
+
+class TestFastParser:
+    def test_raw_line_matches_raw_message(self) -> None:
+        lines = [
+            "PING :tmi.twitch.tv",
+            ":b!b@b.tmi.twitch.tv JOIN #g",
+            "@badge-info=subscriber/20;badges=vip/1,subscriber/18,bits/1000;mod=0;subscriber=1 :g!g@g.tmi.twitch.tv PRIVMSG #g :Message",
+            "@emote-only=0;followers-only=-1;r9k=0;room-id=477536370;slow=0;subs-only=0 :tmi.twitch.tv ROOMSTATE #g",
+        ]
+
+        for line in lines:
+            raw_line = RawLine.parse(line)
+            raw_message = RawMessage.parse_individual_raw_message(line)
+
+            assert raw_line.tags == raw_message.tags
+            assert raw_line.origin == raw_message.origin
+            assert raw_line.command == raw_message.command
+            assert raw_line.message == raw_message.message
+
+    def test_private_message(self) -> None:
+        raw_line = RawLine.parse(":g!g@g.tmi.twitch.tv PRIVMSG #ggg :FeelsWeirdMan :)")
+        message = FastPrivateMessage.from_raw_line(raw_line)
+
+        assert message.username == "g"
+        assert message.channel == "ggg"
+        assert message.message == "FeelsWeirdMan :)"
+        assert not hasattr(message, '__dict__')
+
+    def test_to_model(self) -> None:
+        raw_line = RawLine.parse(":b!b@b.tmi.twitch.tv JOIN #g")
+        message = FastJoinMessage.from_raw_line(raw_line)
+        model = message.to_model()
+
+        assert isinstance(model, JoinMessage)
+        assert model.channel == "g"
+        assert model.username == "b"
+
+
+class TestTags:
+    def test_lazy_lookup(self) -> None:
+        tags = Tags("badges=vip/1;emotes=;mod=1;subscriber=0;id=abc;tmi-sent-ts=1697759493254;user-id=73138589")
+
+        assert tags.id == "abc"
+        assert tags.mod
+        assert not tags.subscriber
+        assert tags.tmi_sent_ts == 1697759493254
+        assert tags.user_id == "73138589"
+        assert tags["emotes"] == ""
+        assert "bits" not in tags
+        assert len(tags) == 7
+
+    def test_key_is_not_matched_inside_value(self) -> None:
+        tags = Tags("display-name=mod=1;flags")
+
+        assert tags["display-name"] == "mod=1"
+        assert tags["flags"] == ""
+        assert "mod" not in tags
+
+    def test_unescape(self) -> None:
+        assert unescape_tag_value(r"hello\sworld\:\\x\q\\") == "hello world;\\xq\\"
+        assert unescape_tag_value("trailing\\") == "trailing"
+
+    def test_raw_message_tags_are_unescaped(self) -> None:
+        message = RawMessage.parse_individual_raw_message(r"@system-msg=a\sb=c;login=x :tmi.twitch.tv USERNOTICE #g :hi")
+
+        assert message.tags == {"system-msg": "a b=c", "login": "x"}
+
+
+class TestLineDecoder:
+    def test_line_split_across_frames(self) -> None:
+        decoder = LineDecoder()
+
+        assert list(decoder.feed("PING :tmi.twitch.tv\r\n:b!b@b.tmi.twitch.tv JO")) == ["PING :tmi.twitch.tv"]
+        assert list(decoder.feed("IN #g\r")) == []
+        assert list(decoder.feed("\n:c!c@c.tmi.twitch.tv JOIN #g\r\n")) == [
+            ":b!b@b.tmi.twitch.tv JOIN #g",
+            ":c!c@c.tmi.twitch.tv JOIN #g",
+        ]
+        assert decoder.buffer == ""
+
+    def test_early_break_keeps_carry_over(self) -> None:
+        decoder = LineDecoder()
+
+        for _ in decoder.feed("a\r\nb\r\npartial"):
+            break
+
+        assert list(decoder.feed(" line\r\n")) == ["partial line"]
+
+    def test_overflow_discards_oversized_line(self) -> None:
+        decoder = LineDecoder(max_buffer=8)
+
+        assert list(decoder.feed("ok\r\n0123456789")) == ["ok"]
+        assert list(decoder.feed("still the same line")) == []
+        assert list(decoder.feed("end\r\nnext\r\n")) == ["next"]
+        assert decoder.overflows == 1
+
+
+class TestCommandFilter:
+    def test_peek_command(self) -> None:
+        assert peek_command("PING :tmi.twitch.tv") == "PING"
+        assert peek_command(":b!b@b.tmi.twitch.tv JOIN #g") == "JOIN"
+        assert peek_command("@mod=0;subscriber=1 :g!g@g.tmi.twitch.tv PRIVMSG #g :Message") == "PRIVMSG"
+        assert peek_command(":tmi.twitch.tv 001 bot :Welcome, GLHF!") == "001"
+
+    def test_uninteresting_lines_are_skipped(self) -> None:
+        client = TwitchIRC("bot", "token", [], asyncio.Queue(), asyncio.Queue(), asyncio.Event())
+        messages = client.parse_raw_message(
+            ":b!b@b.tmi.twitch.tv JOIN #g\r\n"
+            ":c!c@c.tmi.twitch.tv PART #g\r\n"
+            ":g!g@g.tmi.twitch.tv PRIVMSG #g :hi\r\n"
+        )
+
+        assert [message.command for message in messages] == ["PRIVMSG"]
+        assert client.stats.lines == 3
+        assert client.stats.parsed == 1
+        assert client.stats.skipped == {"JOIN": 1, "PART": 1}
+
+    def test_configured_commands(self) -> None:
+        client = TwitchIRC("bot", "token", [], asyncio.Queue(), asyncio.Queue(), asyncio.Event(), commands=["JOIN"])
+        messages = client.parse_raw_message(":b!b@b.tmi.twitch.tv JOIN #g\r\nPING :tmi.twitch.tv\r\n")
+
+        assert [message.command for message in messages] == ["JOIN"]
+        assert client.stats.skipped_total == 1
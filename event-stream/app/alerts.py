@@ -0,0 +1,59 @@
+"""
+Turns Twitch events into OutputEvents. Each kind of event has a template
+with the steps overlays play for it and how it is scheduled, loaded from a
+JSON file such as
+
+    {
+        "cheer": {"priority": 1, "steps": [{"type": "audio", "url": "https://example.com/cheer.mp3"}]},
+        "raid": {"priority": 5, "preempt": true, "steps": [...]}
+    }
+
+Kinds without a template raise no alert.
+"""
+import json
+import logging
+
+import pydantic
+
+from app.events import OutputEvent, Step
+from app.timeline import Timeline
+from app.twitch_client import TwitchEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class AlertTemplate(pydantic.BaseModel):
+    steps: list[Step]
+    priority: int = 0
+    preempt: bool = False
+
+
+class Alerts:
+    def __init__(self, timeline: Timeline, templates: dict[str, AlertTemplate]) -> None:
+        self.timeline = timeline
+        self.templates = templates
+
+    @classmethod
+    def load(cls, timeline: Timeline, path: str) -> "Alerts":
+        with open(path) as f:
+            templates = json.load(f)
+
+        return cls(timeline, {kind: AlertTemplate.model_validate(template) for kind, template in templates.items()})
+
+    def __call__(self, event: TwitchEvent) -> bool:
+        """
+        Submits the alert for event to the timeline, returning whether it
+        was queued.
+        """
+        template = self.templates.get(event.kind)
+
+        if template is None:
+            logger.debug("No alert for %s", event.kind)
+            return False
+
+        return self.timeline.submit(
+            OutputEvent(steps=template.steps, channel=event.channel, kind=event.kind),
+            priority=template.priority,
+            preempt=template.preempt,
+        )
@@ -0,0 +1,369 @@
+"""
+On-disk cache for the media that OutputEvent actions point at. Assets are
+fetched when an event is queued rather than when an overlay plays it, stored
+by the SHA-256 of their content, and served to overlays from here with range
+support. Durations are worked out once, on download, with the wave module
+for WAV files and ffprobe (when installed) for anything else.
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import uuid
+import wave
+
+import aiohttp
+import pydantic
+from aiohttp import web
+
+from app.events import Action, OutputEvent
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Seconds between a change and the index being written
+INDEX_DELAY = 1.0
+
+
+class Asset(pydantic.BaseModel):
+    digest: str
+    size: int
+    content_type: str
+    duration: float | None = None
+    urls: set[str] = set()
+
+
+def read_header(path: pathlib.Path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read(12)
+
+
+def wav_duration(path: pathlib.Path) -> float | None:
+    try:
+        with wave.open(str(path)) as f:
+            return f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+async def ffprobe_duration(path: pathlib.Path) -> float | None:
+    ffprobe = shutil.which('ffprobe')
+
+    if not ffprobe:
+        return None
+
+    process = await asyncio.create_subprocess_exec(
+        ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', str(path),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    output, _ = await process.communicate()
+
+    try:
+        return float(output.decode().strip())
+    except ValueError:
+        return None
+
+
+async def probe_duration(path: pathlib.Path, content_type: str) -> float | None:
+    """
+    Seconds of audio or video in the file, or None for stills and unknowns.
+    """
+    if content_type.startswith('image/'):
+        return None
+
+    header = await asyncio.to_thread(read_header, path)
+
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return await asyncio.to_thread(wav_duration, path)
+
+    return await ffprobe_duration(path)
+
+
+class AssetCache:
+    """
+    Content-addressed asset store, capped at `max_bytes` by evicting the
+    least recently used assets. Several URLs can share one asset, and
+    concurrent fetches of a URL share a single download. Cached assets are
+    served at `public_url`/<digest> by AssetServer.
+    """
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        max_bytes: int = 1024 * 1024 * 1024,
+        public_url: str = "http://localhost:8080/assets",
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.public_url = public_url.rstrip('/')
+
+        self.assets: collections.OrderedDict[str, Asset] = collections.OrderedDict()
+        self.urls: dict[str, str] = {}
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.session: aiohttp.ClientSession | None = None
+        self.saving: asyncio.Task | None = None
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failures = 0
+
+        (self.directory / 'tmp').mkdir(parents=True, exist_ok=True)
+        self.load_index()
+
+    @property
+    def index_path(self) -> pathlib.Path:
+        return self.directory / 'index.json'
+
+    def path(self, digest: str) -> pathlib.Path:
+        return self.directory / digest[:2] / digest
+
+    def load_index(self) -> None:
+        if not self.index_path.exists():
+            return
+
+        for entry in json.loads(self.index_path.read_text()):
+            asset = Asset.model_validate(entry)
+
+            # Files removed behind our back are simply fetched again
+            if self.path(asset.digest).exists():
+                self.add(asset)
+
+    def dump_index(self) -> str:
+        return json.dumps([asset.model_dump(mode='json') for asset in self.assets.values()])
+
+    def write_index(self, data: str) -> None:
+        temporary = self.index_path.with_suffix('.tmp')
+        temporary.write_text(data)
+        temporary.replace(self.index_path)
+
+    def save_index(self) -> None:
+        """
+        Writes the index soon, once for any number of changes made until then.
+        """
+        if self.saving is None:
+            self.saving = asyncio.create_task(self.save_index_later())
+
+    async def save_index_later(self) -> None:
+        await asyncio.sleep(INDEX_DELAY)
+        self.saving = None
+
+        # Dumped here, so the write sees a consistent index
+        await asyncio.to_thread(self.write_index, self.dump_index())
+
+    def add(self, asset: Asset) -> None:
+        existing = self.assets.get(asset.digest)
+
+        if existing:
+            existing.urls |= asset.urls
+            asset = existing
+        else:
+            self.assets[asset.digest] = asset
+            self.bytes += asset.size
+
+        for url in asset.urls:
+            self.urls[url] = asset.digest
+
+        self.assets.move_to_end(asset.digest)
+        self.evict()
+
+    def evict(self) -> None:
+        # The newest asset stays even if it alone is over the cap
+        while self.bytes > self.max_bytes and len(self.assets) > 1:
+            digest, asset = self.assets.popitem(last=False)
+            self.bytes -= asset.size
+            self.evictions += 1
+
+            for url in asset.urls:
+                self.urls.pop(url, None)
+
+            self.path(digest).unlink(missing_ok=True)
+
+    def get(self, url: str) -> Asset | None:
+        digest = self.urls.get(url)
+
+        if digest is None:
+            return None
+
+        self.assets.move_to_end(digest)
+        return self.assets[digest]
+
+    def get_digest(self, digest: str) -> Asset | None:
+        asset = self.assets.get(digest)
+
+        if asset:
+            self.assets.move_to_end(digest)
+
+        return asset
+
+    async def fetch(self, url: str) -> Asset:
+        asset = self.get(url)
+
+        if asset:
+            self.hits += 1
+            return asset
+
+        return await asyncio.shield(self.start(url))
+
+    def start(self, url: str) -> asyncio.Task:
+        task = self.inflight.get(url)
+
+        if task is None:
+            self.misses += 1
+            task = self.inflight[url] = asyncio.create_task(self.download(url))
+            task.add_done_callback(lambda _: self.inflight.pop(url, None))
+
+        return task
+
+    async def download(self, url: str) -> Asset:
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        temporary = self.directory / 'tmp' / uuid.uuid4().hex
+        hasher = hashlib.sha256()
+        size = 0
+        duration = None
+
+        try:
+            async with self.session.get(url) as response:
+                response.raise_for_status()
+                content_type = response.content_type
+                f = await asyncio.to_thread(open, temporary, 'wb')
+
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        hasher.update(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+                        size += len(chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+
+            digest = hasher.hexdigest()
+
+            # Content already cached under another URL needs no probing; new
+            # content is probed before it is moved in, where eviction could
+            # remove it mid-probe
+            if digest not in self.assets:
+                duration = await probe_duration(temporary, content_type)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+        # No awaits from here on, so the asset can't be evicted in between
+        existing = self.assets.get(digest)
+
+        if existing:
+            temporary.unlink()
+            duration = existing.duration
+        else:
+            path = self.path(digest)
+            path.parent.mkdir(exist_ok=True)
+            temporary.replace(path)
+
+        self.add(Asset(digest=digest, size=size, content_type=content_type, duration=duration, urls={url}))
+        self.save_index()
+
+        return self.assets[digest]
+
+    def is_local(self, url: str) -> bool:
+        return url.startswith(f"{self.public_url}/")
+
+    def prefetch(self, event: OutputEvent) -> None:
+        """
+        Starts fetching every asset of event that isn't cached yet.
+        """
+        for url in event.urls:
+            if url in self.urls or url in self.inflight or self.is_local(url):
+                continue
+
+            self.start(url).add_done_callback(self.prefetched)
+
+    def prefetched(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+
+        if task.exception():
+            self.failures += 1
+            logger.warning("Failed to prefetch asset: %s", task.exception())
+
+    def localize(self, event: OutputEvent) -> OutputEvent:
+        """
+        Points the steps of event at the local copies of their assets, and
+        fills in durations the producer left out. Steps whose asset isn't
+        cached keep their remote URL.
+        """
+        steps = []
+
+        for step in event.steps:
+            asset = self.get(step.url) if isinstance(step, Action) else None
+
+            if asset:
+                step = step.model_copy(update={
+                    'url': f"{self.public_url}/{asset.digest}",
+                    'duration': step.duration if step.duration is not None else asset.duration,
+                })
+
+            steps.append(step)
+
+        return event.model_copy(update={'steps': steps})
+
+    def summary(self) -> dict[str, int]:
+        return {
+            'assets': len(self.assets),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'failures': self.failures,
+        }
+
+    async def close(self) -> None:
+        if self.saving:
+            self.saving.cancel()
+            self.saving = None
+            await asyncio.to_thread(self.write_index, self.dump_index())
+
+        if self.session:
+            await self.session.close()
+
+
+class AssetServer:
+    """
+    Serves cached assets over HTTP. Assets never change under a digest, so
+    overlays may cache them forever; range requests let players seek and
+    start before the whole file has arrived.
+    """
+    def __init__(self, cache: AssetCache) -> None:
+        self.cache = cache
+        self.app = web.Application()
+        self.app.router.add_get('/assets/{digest}', self.handle)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        asset = self.cache.get_digest(request.match_info['digest'])
+
+        if asset is None:
+            raise web.HTTPNotFound()
+
+        return web.FileResponse(
+            self.cache.path(asset.digest),
+            chunk_size=CHUNK_SIZE,
+            headers={
+                'Content-Type': asset.content_type,
+                'Cache-Control': "public, max-age=31536000, immutable",
+            },
+        )
+
+    async def serve(self, stop: asyncio.Future, host: str = "localhost", port: int = 8080) -> None:
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+
+        await stop
+
+        await runner.cleanup()
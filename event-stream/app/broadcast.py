@@ -0,0 +1,205 @@
+"""
+Websocket server that pushes OutputEvents to overlay clients. Events are
+published in-process with Broadcaster.publish and sent to the overlays whose
+topics match, as JSON text frames. Overlays receive everything until they
+narrow it down by sending
+
+    {"subscribe": {"channels": ["somechannel"], "actions": ["audio"], "kinds": ["cheer"]}}
+
+where an empty or missing list matches anything. The server answers with
+{"subscribed": ...}, or {"error": ...} for a message it can't use.
+"""
+import asyncio
+import collections
+import enum
+import json
+import logging
+
+from websockets.exceptions import ConnectionClosed
+from websockets.server import WebSocketServerProtocol, serve
+
+from app.assets import AssetCache
+from app.events import OutputEvent
+from app.routing import RoutingIndex, TopicFilter
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowConsumerPolicy(str, enum.Enum):
+    # Close the connection; the overlay reconnects and starts afresh
+    DISCONNECT = 'disconnect'
+    # Skip the oldest buffered events and keep the connection
+    DROP_OLDEST = 'drop-oldest'
+
+
+class Subscriber:
+    def __init__(self, websocket: WebSocketServerProtocol) -> None:
+        self.websocket = websocket
+        self.buffer: collections.deque[str] = collections.deque()
+        self.ready = asyncio.Event()
+
+        self.sent = 0
+        self.dropped = 0
+
+
+class Broadcaster:
+    """
+    Fans OutputEvents out to subscribers. Each event is serialized once and
+    the same string is queued for every subscriber, whose own task writes it
+    out. A subscriber more than `max_buffer` events behind is handled by
+    `policy`, so one stalled overlay never holds up the rest.
+    """
+    def __init__(
+        self,
+        max_buffer: int = 64,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DISCONNECT,
+        assets: AssetCache | None = None,
+    ) -> None:
+        self.max_buffer = max_buffer
+        self.policy = SlowConsumerPolicy(policy)
+        self.assets = assets
+        self.subscribers: set[Subscriber] = set()
+        self.routes = RoutingIndex()
+        # Close handshakes of evicted subscribers, kept until they finish
+        self.closing: set[asyncio.Task] = set()
+
+        self.published = 0
+        self.evictions = 0
+        self.dropped = 0
+
+    @staticmethod
+    def encode(event: OutputEvent) -> str:
+        return event.model_dump_json(exclude_none=True)
+
+    def publish(self, event: OutputEvent) -> int:
+        """
+        Queues event for every matching subscriber, returning how many it
+        reached. With an asset cache, steps point at cached copies where
+        there are any and the rest are fetched for next time.
+        """
+        if self.assets:
+            self.assets.prefetch(event)
+            event = self.assets.localize(event)
+
+        data = self.encode(event)
+        self.published += 1
+
+        return sum(self.offer(subscriber, data) for subscriber in self.routes.match(event))
+
+    def offer(self, subscriber: Subscriber, data: str) -> bool:
+        if len(subscriber.buffer) >= self.max_buffer:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self.evict(subscriber)
+                return False
+
+            subscriber.buffer.popleft()
+            subscriber.dropped += 1
+            self.dropped += 1
+
+        subscriber.buffer.append(data)
+        subscriber.ready.set()
+
+        return True
+
+    def subscribe(self, subscriber: Subscriber, topics: TopicFilter | None = None) -> None:
+        self.subscribers.add(subscriber)
+        self.routes.add(subscriber, topics)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        self.routes.remove(subscriber)
+
+    def evict(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber)
+        subscriber.buffer.clear()
+        self.evictions += 1
+
+        logger.warning("Disconnecting slow overlay %s", subscriber.websocket.remote_address)
+
+        # 1013: try again later
+        closing = asyncio.create_task(subscriber.websocket.close(1013, "slow consumer"))
+        self.closing.add(closing)
+        closing.add_done_callback(self.closed)
+
+    def closed(self, task: asyncio.Task) -> None:
+        self.closing.discard(task)
+
+        if not task.cancelled() and task.exception():
+            logger.warning("Failed to close slow overlay: %s", task.exception())
+
+    async def write(self, subscriber: Subscriber) -> None:
+        websocket = subscriber.websocket
+
+        while True:
+            if not subscriber.buffer:
+                subscriber.ready.clear()
+                await subscriber.ready.wait()
+                continue
+
+            data = subscriber.buffer.popleft()
+
+            try:
+                await websocket.send(data)
+            except ConnectionClosed:
+                return
+
+            subscriber.sent += 1
+
+    def on_message(self, subscriber: Subscriber, message: str | bytes) -> None:
+        try:
+            topics = TopicFilter.model_validate(json.loads(message)['subscribe'])
+        # ValidationError and JSONDecodeError are both ValueErrors
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {'error': f"expected {{\"subscribe\": {{...}}}}: {e}"}
+        else:
+            if subscriber not in self.subscribers:
+                return
+
+            self.subscribe(subscriber, topics)
+            reply = {'subscribed': topics.model_dump(mode='json')}
+
+        self.offer(subscriber, json.dumps(reply))
+
+    async def handler(self, websocket: WebSocketServerProtocol) -> None:
+        subscriber = Subscriber(websocket)
+        self.subscribe(subscriber)
+        writer = asyncio.create_task(self.write(subscriber))
+
+        try:
+            async for message in websocket:
+                self.on_message(subscriber, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+            writer.cancel()
+
+    def summary(self) -> dict[str, int]:
+        return {
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'evictions': self.evictions,
+            'dropped': self.dropped,
+        }
+
+    async def serve(
+        self,
+        stop: asyncio.Future,
+        host: str = "localhost",
+        port: int = 8765,
+        ready: asyncio.Future | None = None,
+    ) -> None:
+        """
+        Serves until stop is done. `ready`, if given, gets the port actually
+        bound, which differs from `port` when that is 0.
+        """
+        server = await serve(self.handler, host, port)
+
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+
+        await stop
+
+        server.close()
+        await server.wait_closed()
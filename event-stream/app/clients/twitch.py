@@ -49,3 +49,16 @@ class TwitchClient:
 
         response.raise_for_status()
         return TokenPayload(**response.json())
+
+    def get_user_id(self, access_token: str, login: str) -> str:
+        response = self.session.get(
+            "https://api.twitch.tv/helix/users",
+            params={"login": login},
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Client-Id": self.client_id,
+            },
+        )
+
+        response.raise_for_status()
+        return response.json()["data"][0]["id"]
@@ -2,8 +2,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 REQUIRED_SCOPES = [
-    # "channel:read:subscriptions", 
-    # "channel:read:redemptions", 
+    "channel:read:subscriptions",
+    "channel:read:redemptions",
     # "channel:read:predictions", 
     # "channel:read:polls", 
     # "channel:read:hype_train", 
@@ -11,7 +11,8 @@ REQUIRED_SCOPES = [
     "channel:moderate",
     "chat:edit",
     "chat:read",
-    # "bits:read",
+    "bits:read",
+    "moderator:read:followers",
 ]
 
 
@@ -22,3 +23,14 @@ class Configuration(BaseSettings):
     twitch_client_secret: str
     twitch_username: str
     redirect_uri: str = "http://localhost:6969"
+
+    # Alert templates (see app/alerts.py); without them no EventSub client,
+    # overlay server or asset cache is started
+    alerts_path: str | None = None
+    overlay_port: int = 8765
+    asset_port: int = 8080
+    asset_directory: str = ".assets"
+    asset_max_bytes: int = 1024 * 1024 * 1024
+
+    # Seconds between logged timeline, overlay, asset and EventSub stats
+    stats_interval: float = 60.0
@@ -0,0 +1,62 @@
+"""
+Models for the OutputEvent schema in README.md: what overlays are told to
+play, as an ordered list of audio and visual steps.
+"""
+import enum
+from typing import Annotated, Literal
+
+import pydantic
+
+
+class ActionType(str, enum.Enum):
+    AUDIO = 'audio'
+    VIDEO = 'video'
+    IMAGE = 'image'
+    # Overlays stop whatever they are playing for the event's channel
+    STOP = 'stop'
+
+
+class Action(pydantic.BaseModel):
+    type: ActionType
+    url: str
+    # Seconds; None plays the asset to its natural end
+    duration: float | None = None
+
+
+class VisualAction(Action):
+    type: Literal[ActionType.IMAGE, ActionType.VIDEO]
+    position_x: int
+    position_y: int
+    width: int
+    height: int
+
+
+class AudioAction(Action):
+    type: Literal[ActionType.AUDIO]
+
+
+class StopAction(pydantic.BaseModel):
+    type: Literal[ActionType.STOP] = ActionType.STOP
+
+
+Step = Annotated[VisualAction | AudioAction | StopAction, pydantic.Field(discriminator='type')]
+
+
+class OutputEvent(pydantic.BaseModel):
+    steps: list[Step]
+    # Where the event came from and what caused it, e.g. "cheer" or "raid";
+    # overlays filter on both
+    channel: str | None = None
+    kind: str | None = None
+
+    @property
+    def actions(self) -> set[ActionType]:
+        return {step.type for step in self.steps}
+
+    @property
+    def urls(self) -> list[str]:
+        return [step.url for step in self.steps if isinstance(step, Action)]
+
+    @classmethod
+    def stop(cls, channel: str | None, kind: str | None = None) -> "OutputEvent":
+        return cls(steps=[StopAction()], channel=channel, kind=kind)
@@ -1,13 +1,81 @@
 import asyncio
+import json
+import logging
+from collections.abc import Callable
 
-from app.config import Configuration
+from app.alerts import Alerts
+from app.assets import AssetCache, AssetServer
+from app.broadcast import Broadcaster
+from app.config import Configuration, REQUIRED_SCOPES
 from app.clients.twitch import TwitchClient
 from app.logging import setup_logging
 from app.secrets import Secrets, RefreshTokenException
 from app.services.oauth import OAuthCodeService
+from app.timeline import Timeline
+from app.twitch_client import EventSubAuthenticationException, EventSubClient, subscriptions_for
 from app.twitch_irc import TwitchIRC
 
 
+logger = logging.getLogger(__name__)
+
+
+def log_stats(sources: dict[str, Callable[[], object]]) -> None:
+    logger.info("stats %s", json.dumps({name: source() for name, source in sources.items()}))
+
+
+async def report_stats(sources: dict[str, Callable[[], object]], interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        log_stats(sources)
+
+
+async def run(configuration: Configuration, twitch_client: TwitchClient, access_token: str) -> None:
+    irc = TwitchIRC(configuration.twitch_username, access_token)
+
+    if not configuration.alerts_path:
+        await irc.connect()
+        return
+
+    stop = asyncio.get_running_loop().create_future()
+    user_id = twitch_client.get_user_id(access_token, configuration.twitch_username)
+
+    assets = AssetCache(
+        configuration.asset_directory,
+        configuration.asset_max_bytes,
+        public_url=f"http://localhost:{configuration.asset_port}/assets",
+    )
+    broadcaster = Broadcaster(assets=assets)
+    timeline = Timeline(broadcaster.publish, assets=assets)
+    eventsub = EventSubClient(
+        configuration.twitch_client_id,
+        access_token,
+        subscriptions_for(user_id),
+        Alerts.load(timeline, configuration.alerts_path),
+    )
+
+    stats = {
+        'timeline': timeline.summary,
+        'broadcaster': broadcaster.summary,
+        'assets': assets.summary,
+        'eventsub': eventsub.summary,
+    }
+    reporter = asyncio.create_task(report_stats(stats, configuration.stats_interval))
+
+    try:
+        await asyncio.gather(
+            irc.connect(),
+            eventsub.run(stop),
+            broadcaster.serve(stop, port=configuration.overlay_port),
+            AssetServer(assets).serve(stop, port=configuration.asset_port),
+        )
+    finally:
+        reporter.cancel()
+        await asyncio.gather(reporter, return_exceptions=True)
+        await timeline.close()
+        await assets.close()
+        log_stats(stats)
+
+
 def main() -> None:
     logger = setup_logging(__name__)
     secrets = Secrets()
@@ -34,15 +102,19 @@ def main() -> None:
                 token = twitch_client.exchange_code_for_token(code)
 
                 secrets.save_refresh_token(token.refresh_token)
+                refresh_token = token.refresh_token
 
             token_payload = twitch_client.refresh_token(refresh_token)
 
-            asyncio.run(
-                TwitchIRC(
-                    configuration.twitch_username,
-                    token_payload.access_token,
-                ).connect()
-            )
+            # Tokens granted before a scope was added can't be refreshed into
+            # one that has it; the user has to authorize again
+            if not set(REQUIRED_SCOPES) <= set(token_payload.scope):
+                raise RefreshTokenException("Refresh token lacks required scopes")
+
+            asyncio.run(run(configuration, twitch_client, token_payload.access_token))
+        except EventSubAuthenticationException:
+            # Access tokens expire after a few hours; refresh and start again
+            logger.warning("EventSub rejected the access token; refreshing it.")
         except RefreshTokenException:
             logger.error("User refresh token has expired or is invalid.")
             secrets.delete_refresh_token()
@@ -0,0 +1,66 @@
+import bisect
+import itertools
+import math
+
+
+# Seconds; roughly logarithmic from 1ms up to two minutes
+DEFAULT_BOUNDS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; memory stays constant however many samples are
+    observed. Percentiles are estimated as the upper bound of the bucket the
+    rank falls in, or the largest sample for the overflow bucket.
+    """
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BOUNDS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+            seen += count
+
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+
+        return self.max
+
+    def buckets(self) -> dict[str, int]:
+        """
+        Cumulative counts keyed by upper bound, as in Prometheus' `le` label.
+        """
+        bounds = [str(bound) for bound in self.bounds] + ['+Inf']
+        return dict(zip(bounds, itertools.accumulate(self.counts)))
+
+    def summary(self) -> dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
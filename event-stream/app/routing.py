@@ -0,0 +1,108 @@
+import collections
+from collections.abc import Hashable, Iterable
+
+import pydantic
+
+from app.events import ActionType, OutputEvent
+
+
+class TopicFilter(pydantic.BaseModel):
+    """
+    What an overlay wants to receive. An empty set matches anything, so the
+    default filter matches every event.
+    """
+    channels: set[str] = set()
+    actions: set[ActionType] = set()
+    kinds: set[str] = set()
+
+    def matches(self, event: OutputEvent) -> bool:
+        return (
+            (not self.channels or event.channel in self.channels)
+            # Whoever plays the event's actions has to hear about a stop
+            and (not self.actions or ActionType.STOP in event.actions or not self.actions.isdisjoint(event.actions))
+            and (not self.kinds or event.kind in self.kinds)
+        )
+
+
+class RoutingIndex:
+    """
+    Finds the subscribers whose filter matches an event without looking at
+    every subscriber. Each filter dimension indexes subscribers by value,
+    with a separate set for those that accept any value. A lookup takes the
+    dimension with the fewest candidates for the event and checks only
+    those, so its cost follows the number of likely matches rather than the
+    number of connections.
+    """
+    DIMENSIONS = ('channels', 'actions', 'kinds')
+
+    def __init__(self) -> None:
+        self.filters: dict[Hashable, TopicFilter] = {}
+        self.index: dict[str, collections.defaultdict[object, set[Hashable]]] = {
+            dimension: collections.defaultdict(set) for dimension in self.DIMENSIONS
+        }
+        self.wildcard: dict[str, set[Hashable]] = {dimension: set() for dimension in self.DIMENSIONS}
+
+    def __len__(self) -> int:
+        return len(self.filters)
+
+    def __contains__(self, subscriber: Hashable) -> bool:
+        return subscriber in self.filters
+
+    def add(self, subscriber: Hashable, topics: TopicFilter | None = None) -> None:
+        """
+        Routes events matching topics to subscriber, replacing earlier topics.
+        """
+        self.remove(subscriber)
+
+        topics = topics or TopicFilter()
+        self.filters[subscriber] = topics
+
+        for dimension in self.DIMENSIONS:
+            values = getattr(topics, dimension)
+
+            if not values:
+                self.wildcard[dimension].add(subscriber)
+
+            for value in values:
+                self.index[dimension][value].add(subscriber)
+
+    def remove(self, subscriber: Hashable) -> None:
+        topics = self.filters.pop(subscriber, None)
+
+        if topics is None:
+            return
+
+        for dimension in self.DIMENSIONS:
+            self.wildcard[dimension].discard(subscriber)
+            index = self.index[dimension]
+
+            for value in getattr(topics, dimension):
+                index[value].discard(subscriber)
+
+                if not index[value]:
+                    del index[value]
+
+    def candidates(self, dimension: str, values: Iterable[object]) -> list[set[Hashable]]:
+        index = self.index[dimension]
+        return [index[value] for value in values if value in index] + [self.wildcard[dimension]]
+
+    def match(self, event: OutputEvent) -> set[Hashable]:
+        dimensions = [
+            self.candidates('channels', [event.channel]),
+            self.candidates('kinds', [event.kind]),
+        ]
+
+        if ActionType.STOP not in event.actions:
+            dimensions.append(self.candidates('actions', event.actions))
+
+        groups = min(
+            dimensions,
+            key=lambda groups: sum(map(len, groups)),
+        )
+
+        return {
+            subscriber
+            for group in groups
+            for subscriber in group
+            if self.filters[subscriber].matches(event)
+        }
@@ -1,30 +1,417 @@
-import signal
+"""
+Local stand-in for Twitch's IRC websocket, for load testing TwitchIRC with no
+network access. It accepts PASS/NICK/CAP/JOIN/PART, answers PINGs, pings the
+client, replays recorded or synthetic chat into joined channels at a
+configurable rate and records everything the client sends back.
+
+    python -m app.server --replay chat.log --rate 10
+    python -m app.server --synthetic 50 --rate max --record sent.log
 
+Then point the bot at it with TwitchIRC(twitch_ws_uri="ws://localhost:8765").
+Pass --pid with the bot's process id to include its memory use (resident
+set size, sampled every second) in the summary; without it the server's own
+is reported.
+"""
+import argparse
 import asyncio
-from websockets.server import serve
+import collections
+import itertools
+import random
+import signal
+import statistics
+import time
+import uuid
+from typing import Callable, Iterator, TextIO
 
+from websockets.exceptions import ConnectionClosed
+from websockets.server import WebSocketServerProtocol, serve
 
-import asyncio
-from websockets.server import serve
 
+HOST = "tmi.twitch.tv"
+
+
+def welcome_lines(nick: str) -> list[str]:
+    return [
+        f":{HOST} 001 {nick} :Welcome, GLHF!",
+        f":{HOST} 002 {nick} :Your host is {HOST}",
+        f":{HOST} 003 {nick} :This server is rather new",
+        f":{HOST} 004 {nick} :-",
+        f":{HOST} 375 {nick} :-",
+        f":{HOST} 372 {nick} :You are in a maze of twisty passages, all alike.",
+        f":{HOST} 376 {nick} :>",
+    ]
+
+
+def join_lines(nick: str, channel: str) -> list[str]:
+    return [
+        f":{nick}!{nick}@{nick}.{HOST} JOIN #{channel}",
+        f":{nick}.{HOST} 353 {nick} = #{channel} :{nick}",
+        f":{nick}.{HOST} 366 {nick} #{channel} :End of /NAMES list",
+        f"@badge-info=;badges=;color=;display-name={nick};emote-sets=0;mod=0;subscriber=0;user-type= :{HOST} USERSTATE #{channel}",
+        f"@emote-only=0;followers-only=-1;r9k=0;room-id=1;slow=0;subs-only=0 :{HOST} ROOMSTATE #{channel}",
+    ]
+
+
+def split_line(line: str) -> tuple[str, str, str]:
+    """
+    Splits a line into its tag prefix (with trailing space), the prefix up to
+    and including the command, and everything after the command.
+    """
+    tags = ''
+
+    if line.startswith('@'):
+        end = line.index(' ') + 1
+        tags, line = line[:end], line[end:]
+
+    parts = line.split(' ', 2 if line.startswith(':') else 1)
+    head = ' '.join(parts[:-1])
+
+    return tags, head, parts[-1]
+
+
+def retarget(line: str, channel: str) -> str:
+    """
+    Moves a recorded channel line into `channel`.
+    """
+    tags, head, rest = split_line(line)
+
+    if not rest.startswith('#'):
+        return line
+
+    _, _, rest = rest.partition(' ')
+    return f"{tags}{head} #{channel} {rest}".rstrip()
+
+
+def sent_at(line: str) -> float | None:
+    """
+    Seconds from the tmi-sent-ts tag, used to reproduce recorded pacing.
+    """
+    if not line.startswith('@'):
+        return None
+
+    start = line.find('tmi-sent-ts=')
+
+    if start == -1:
+        return None
+
+    start += len('tmi-sent-ts=')
+    end = line.find(';', start)
+    value = line[start:end if end != -1 else line.index(' ', start)]
+
+    return int(value) / 1000 if value.isdigit() else None
+
+
+def rss_bytes(pid: int | None = None) -> int | None:
+    """
+    Resident set size of a process, read from /proc; None where that isn't
+    available.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return None
+
+
+def read_recording(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.rstrip('\r\n') for line in f if line.strip() and not line.startswith('#')]
+
+
+def synthetic_lines(
+    nick: str,
+    messages_per_second: float = 10.0,
+    mention_ratio: float = 0.1,
+    users: int = 500,
+    seed: int | None = None,
+) -> Iterator[str]:
+    """
+    Endless PRIVMSG traffic from `users` chatters, spaced through tmi-sent-ts
+    at messages_per_second. Roughly mention_ratio of them mention the bot.
+    """
+    rng = random.Random(seed)
+    timestamp = time.time() * 1000
+    step = 1000 / messages_per_second
+
+    for index in itertools.count():
+        user = f"chatter{rng.randrange(users)}"
+        roles = rng.choice(["mod=0;subscriber=0", "mod=0;subscriber=1", "mod=1;subscriber=1"])
+        text = f"@{nick} message {index}" if rng.random() < mention_ratio else f"just chatting {index}"
+
+        yield (
+            f"@badge-info=;badges=;color=;display-name={user};emotes=;first-msg=0;flags=;"
+            f"id={uuid.UUID(int=rng.getrandbits(128))};{roles};room-id=1;"
+            f"tmi-sent-ts={int(timestamp)};turbo=0;user-id={index};user-type= "
+            f":{user}!{user}@{user}.{HOST} PRIVMSG #replay :{text}"
+        )
+
+        timestamp += step
+
+
+class ReplayClient:
+    def __init__(self, websocket: WebSocketServerProtocol) -> None:
+        self.websocket = websocket
+        self.nick = "justinfan"
+        self.channels: list[str] = []
+        self.joined = asyncio.Event()
+
+
+class ReplayServer:
+    def __init__(
+        self,
+        source: Callable[[], Iterator[str]],
+        rate: float | None = 1.0,
+        messages_per_second: float = 10.0,
+        lines_per_frame: int = 1,
+        ping_interval: float = 60.0,
+        record: TextIO | None = None,
+        pid: int | None = None,
+        memory_interval: float = 1.0,
+    ) -> None:
+        """
+        `source` returns a fresh line iterator for each client. Recorded
+        pacing is sped up by `rate`; None replays as fast as possible. Lines
+        without a timestamp are paced at messages_per_second. The memory of
+        process `pid`, or of this one, is sampled every memory_interval.
+        """
+        self.source = source
+        self.rate = rate
+        self.messages_per_second = messages_per_second
+        self.lines_per_frame = lines_per_frame
+        self.ping_interval = ping_interval
+        self.record = record
+        self.pid = pid
+        self.memory_interval = memory_interval
+
+        self.replayed = 0
+        self.received: collections.deque[tuple[float, str]] = collections.deque(maxlen=100_000)
+        self.mentions: dict[str, float] = {}
+        self.latencies: collections.deque[float] = collections.deque(maxlen=100_000)
+        self.rss: collections.deque[int] = collections.deque(maxlen=100_000)
+        self.started = time.monotonic()
+
+    def delay(self, previous: float | None, current: float | None) -> float:
+        if self.rate is None:
+            return 0.0
 
-async def print():
-    print("hello world")
+        if previous is not None and current is not None:
+            return max(0.0, current - previous) / self.rate
 
+        return 1 / self.messages_per_second / self.rate
 
-async def echo(websocket):
-    async for message in websocket:
-        await websocket.send(message)
+    async def send(self, client: ReplayClient, lines: list[str]) -> None:
+        await client.websocket.send(''.join(f"{line}\r\n" for line in lines))
 
+    def track_mention(self, client: ReplayClient, line: str) -> None:
+        _, head, rest = split_line(line)
 
-async def server(stop):
-    server = await serve(echo, "localhost", 8765)
+        if not head.endswith('PRIVMSG') or f"@{client.nick}" not in rest.lower():
+            return
 
-    await stop
-    await server.close()
+        username = head[1:].partition('!')[0]
+        self.mentions[username.lower()] = time.monotonic()
+
+    def track_reply(self, message: str) -> None:
+        # Replies from the bot start with "@username"
+        _, _, text = message.partition(' :')
+
+        if not text.startswith('@'):
+            return
+
+        username = text[1:].partition(' ')[0].lower()
+        mentioned_at = self.mentions.pop(username, None)
+
+        if mentioned_at is not None:
+            self.latencies.append(time.monotonic() - mentioned_at)
+
+    async def replay(self, client: ReplayClient) -> None:
+        try:
+            await self.replay_lines(client)
+        except ConnectionClosed:
+            pass
+
+    async def replay_lines(self, client: ReplayClient) -> None:
+        await client.joined.wait()
+
+        frame = []
+        previous = None
+        deadline = time.monotonic()
+
+        for index, line in enumerate(self.source()):
+            current = sent_at(line)
+            deadline += self.delay(previous, current) if index else 0.0
+            previous = current
+
+            # Sleep towards an absolute deadline so pacing error never accumulates
+            wait = deadline - time.monotonic()
+
+            if wait > 0:
+                if frame:
+                    await self.send(client, frame)
+                    frame = []
+
+                await asyncio.sleep(wait)
+
+            channel = client.channels[index % len(client.channels)] if client.channels else "replay"
+            line = retarget(line, channel)
+            self.track_mention(client, line)
+            frame.append(line)
+            self.replayed += 1
+
+            if len(frame) >= self.lines_per_frame:
+                await self.send(client, frame)
+                frame = []
+
+            # Yield at max rate so the client's messages still get handled
+            elif self.rate is None and index % 100 == 0:
+                await asyncio.sleep(0)
+
+        if frame:
+            await self.send(client, frame)
+
+    async def ping(self, client: ReplayClient) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.ping_interval)
+                await self.send(client, [f"PING :{HOST}"])
+        except ConnectionClosed:
+            pass
+
+    async def sample_memory(self) -> None:
+        while (rss := rss_bytes(self.pid)) is not None:
+            self.rss.append(rss)
+            await asyncio.sleep(self.memory_interval)
+
+    async def handle_line(self, client: ReplayClient, line: str) -> None:
+        command, _, params = line.partition(' ')
+
+        if command == 'NICK':
+            client.nick = params.strip().lower()
+            await self.send(client, welcome_lines(client.nick))
+        elif command == 'CAP':
+            capabilities = params.partition(':')[2]
+            await self.send(client, [f":{HOST} CAP * ACK :{capabilities}"])
+        elif command == 'JOIN':
+            for channel in params.split(','):
+                channel = channel.strip().lstrip('#')
+                client.channels.append(channel)
+                await self.send(client, join_lines(client.nick, channel))
+
+            client.joined.set()
+        elif command == 'PART':
+            channel = params.strip().lstrip('#')
+
+            if channel in client.channels:
+                client.channels.remove(channel)
+        elif command == 'PING':
+            await self.send(client, [f":{HOST} PONG {HOST} :{params.lstrip(':')}"])
+        elif command == 'PRIVMSG':
+            self.track_reply(line)
+
+    async def handler(self, websocket: WebSocketServerProtocol) -> None:
+        client = ReplayClient(websocket)
+        tasks = [
+            asyncio.create_task(self.replay(client)),
+            asyncio.create_task(self.ping(client)),
+        ]
+
+        try:
+            async for message in websocket:
+                for line in message.split('\r\n'):
+                    if not line:
+                        continue
+
+                    self.received.append((time.monotonic(), line))
+
+                    if self.record:
+                        self.record.write(f"{line}\n")
+
+                    await self.handle_line(client, line)
+        except ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def summary(self) -> dict[str, float]:
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        summary = {
+            'replayed': self.replayed,
+            'replayed_per_second': self.replayed / elapsed if elapsed else 0.0,
+            'received': len(self.received),
+            'replies': len(latencies),
+        }
+
+        if self.rss:
+            summary.update(rss_mb=self.rss[-1] / 2**20, rss_peak_mb=max(self.rss) / 2**20)
+
+        if len(latencies) >= 2:
+            quantiles = statistics.quantiles(latencies, n=100)
+            summary.update(p50=quantiles[49], p95=quantiles[94], p99=quantiles[98])
+
+        return summary
+
+    async def serve(
+        self,
+        stop: asyncio.Future,
+        host: str = "localhost",
+        port: int = 8765,
+        ready: asyncio.Future | None = None,
+    ) -> None:
+        """
+        Serves until stop is done. `ready`, if given, gets the port actually
+        bound, which differs from `port` when that is 0.
+        """
+        server = await serve(self.handler, host, port)
+        sampler = asyncio.create_task(self.sample_memory())
+
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+
+        await stop
+
+        sampler.cancel()
+        server.close()
+        await server.wait_closed()
 
 
 async def main():
+    parser = argparse.ArgumentParser(prog="python -m app.server")
+    parser.add_argument('--host', default="localhost")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--replay', metavar='PATH', help="recorded IRC lines, one per line")
+    parser.add_argument('--synthetic', type=float, metavar='MPS', help="synthetic messages per second at 1x")
+    parser.add_argument('--mention-ratio', type=float, default=0.1)
+    parser.add_argument('--nick', default="bot", help="nick mentioned by synthetic traffic")
+    parser.add_argument('--rate', default="1", help="speed-up such as 1, 10 or max")
+    parser.add_argument('--lines-per-frame', type=int, default=1)
+    parser.add_argument('--record', metavar='PATH', help="file to record client lines to")
+    parser.add_argument('--pid', type=int, help="process whose memory to report, e.g. the bot")
+    args = parser.parse_args()
+
+    if args.replay:
+        lines = read_recording(args.replay)
+        source = lambda: iter(lines)
+    else:
+        source = lambda: synthetic_lines(args.nick, args.synthetic or 10.0, args.mention_ratio)
+
+    record = open(args.record, 'w') if args.record else None
+    server = ReplayServer(
+        source,
+        rate=None if args.rate == "max" else float(args.rate),
+        messages_per_second=args.synthetic or 10.0,
+        lines_per_frame=args.lines_per_frame,
+        record=record,
+        pid=args.pid,
+    )
+
     stop = asyncio.Future()
 
     def sigint_handler():
@@ -33,8 +420,13 @@ async def main():
     loop = asyncio.get_event_loop()
     loop.add_signal_handler(signal.SIGINT, sigint_handler)
 
-    await server(stop)
-    await print()
+    try:
+        await server.serve(stop, args.host, args.port)
+    finally:
+        if record:
+            record.close()
+
+    print(server.summary())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,184 @@
+"""
+Plays OutputEvents on a timeline: each step is handed on as its own
+single-step OutputEvent when its time comes. A step starts once the steps
+before it have run their `duration`; a step without a duration doesn't hold
+up the next one. Every channel plays one event at a time, so alerts never
+overlap, while different channels play independently.
+"""
+import asyncio
+import heapq
+import logging
+from collections.abc import Callable
+
+from app.assets import AssetCache
+from app.events import OutputEvent
+from app.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds late a step was dispatched; 50µs up to a second
+JITTER_BOUNDS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class Scheduled:
+    def __init__(self, event: OutputEvent, priority: int, sequence: int) -> None:
+        self.event = event
+        self.priority = priority
+        self.sequence = sequence
+
+    def __lt__(self, other: "Scheduled") -> bool:
+        # Highest priority first, then first come first served
+        return (-self.priority, self.sequence) < (-other.priority, other.sequence)
+
+
+class ChannelQueue:
+    def __init__(self) -> None:
+        self.pending: list[Scheduled] = []
+        self.ready = asyncio.Event()
+        self.current: Scheduled | None = None
+        self.playing: asyncio.Task | None = None
+        self.runner: asyncio.Task | None = None
+
+
+class Timeline:
+    """
+    Schedules OutputEvents per channel and dispatches their steps to `sink`,
+    e.g. Broadcaster.publish.
+
+    Step times are offsets from the moment an event starts on the event
+    loop's monotonic clock, and every wait is for an absolute deadline, so
+    lateness in one step never carries over into the next. How late each
+    step was is recorded in `jitter`.
+
+    Higher priority events play first. One submitted with preempt=True
+    also cuts short a lower priority event already playing on its channel,
+    and overlays are sent a stop for whatever of it they are playing.
+    With an asset cache, an event's assets are fetched when it is submitted
+    and, for up to `asset_wait` seconds, waited for before it plays.
+    """
+    def __init__(
+        self,
+        sink: Callable[[OutputEvent], object],
+        assets: AssetCache | None = None,
+        max_pending: int = 100,
+        asset_wait: float = 2.0,
+    ) -> None:
+        self.sink = sink
+        self.assets = assets
+        self.max_pending = max_pending
+        self.asset_wait = asset_wait
+
+        self.channels: dict[str | None, ChannelQueue] = {}
+        self.sequence = 0
+        self.jitter = Histogram(JITTER_BOUNDS)
+
+        self.played = 0
+        self.preempted = 0
+        self.dropped = 0
+
+    def submit(self, event: OutputEvent, priority: int = 0, preempt: bool = False) -> bool:
+        """
+        Queues event on its channel, returning False if the channel already
+        has `max_pending` events waiting.
+        """
+        queue = self.channels.get(event.channel)
+
+        if queue is None:
+            queue = self.channels[event.channel] = ChannelQueue()
+            queue.runner = asyncio.create_task(self.run(queue))
+
+        if len(queue.pending) >= self.max_pending:
+            self.dropped += 1
+            logger.warning("Dropping event for channel %s; %d already queued", event.channel, len(queue.pending))
+            return False
+
+        if self.assets:
+            self.assets.prefetch(event)
+
+        self.sequence += 1
+        heapq.heappush(queue.pending, Scheduled(event, priority, self.sequence))
+        queue.ready.set()
+
+        if preempt and queue.current and queue.current.priority < priority:
+            queue.playing.cancel()
+            self.sink(OutputEvent.stop(event.channel, queue.current.event.kind))
+            queue.current = None
+            self.preempted += 1
+
+        return True
+
+    async def run(self, queue: ChannelQueue) -> None:
+        while True:
+            if not queue.pending:
+                queue.ready.clear()
+                await queue.ready.wait()
+                continue
+
+            queue.current = heapq.heappop(queue.pending)
+            queue.playing = asyncio.create_task(self.play(queue.current.event))
+
+            # wait() rather than awaiting the task, so that preempting the
+            # event doesn't cancel the runner too
+            try:
+                await asyncio.wait([queue.playing])
+            except asyncio.CancelledError:
+                queue.playing.cancel()
+                raise
+            finally:
+                queue.current = None
+
+            if not queue.playing.cancelled() and queue.playing.exception():
+                logger.error("Failed to play event", exc_info=queue.playing.exception())
+
+    async def wait_until(self, deadline: float) -> None:
+        delay = deadline - asyncio.get_running_loop().time()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def play(self, event: OutputEvent) -> None:
+        if self.assets:
+            fetches = [self.assets.inflight[url] for url in event.urls if url in self.assets.inflight]
+
+            if fetches:
+                await asyncio.wait(fetches, timeout=self.asset_wait)
+
+            event = self.assets.localize(event)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        offset = 0.0
+
+        for step in event.steps:
+            deadline = start + offset
+            await self.wait_until(deadline)
+            self.jitter.observe(loop.time() - deadline)
+
+            self.sink(OutputEvent(steps=[step], channel=event.channel, kind=event.kind))
+            offset += getattr(step, 'duration', None) or 0.0
+
+        # Hold the channel until the last step has finished
+        await self.wait_until(start + offset)
+        self.played += 1
+
+    def summary(self) -> dict[str, object]:
+        return {
+            'channels': len(self.channels),
+            'pending': sum(len(queue.pending) for queue in self.channels.values()),
+            'played': self.played,
+            'preempted': self.preempted,
+            'dropped': self.dropped,
+            'jitter': self.jitter.summary() | {'buckets': self.jitter.buckets()},
+        }
+
+    async def close(self) -> None:
+        runners = [queue.runner for queue in self.channels.values()]
+
+        for runner in runners:
+            runner.cancel()
+
+        await asyncio.gather(*runners, return_exceptions=True)
@@ -1,34 +1,428 @@
-import json
+"""
+Client for Twitch EventSub over websockets.
 
+https://dev.twitch.tv/docs/eventsub/handling-websocket-events/
+
+The client subscribes to its topics once each session is welcomed and hands
+every notification on, decoded into a TwitchEvent, to `on_event`. A session
+that goes quiet for longer than its keepalive timeout is dropped and a new
+one started. A session_reconnect is followed by connecting to the given URL
+while still reading the old connection, which is only closed once the new
+one is welcomed; subscriptions carry over and no notifications are missed.
+Twitch may deliver a message more than once, so recently seen message ids
+are remembered and repeats ignored.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+from collections.abc import Callable
+from typing import ClassVar
+
+import aiohttp
+import pydantic
 import websockets
 
 
-class TwitchPubSubClient:
-    # https://dev.twitch.tv/docs/eventsub/handling-websocket-events/
-    # wss://eventsub.wss.twitch.tv/ws
-    # TODO: Accept a Future to stop the client
-    def __init__(self, twitch_uri: str | None = None) -> None:
-        self.twitch_urni = twitch_uri or "wss://pubsub-edge.twitch.tv"
-    
-    async def consumer(self, websocket: websockets.WebSocketClientProtocol) -> None:
-        async for message in websocket:
-            print(message)
-            # await websocket.send(message)
-
-    async def connect(self) -> None:
-        async with websockets.connect(self.twitch_uri) as websocket:
-            if websocket.open:
-                print("Connection open")
-                # chat_moderator_actions.*.44322889
-                message = {"type": "LISTEN", "nonce": str("01234567"), "data":{"topics": ["chat_moderator_actions.*.44322889"], "auth_token": "px57alz6y4hhx5iziy0j04txvpeib4"}}
-                await websocket.send(json.dumps(message))
+logger = logging.getLogger(__name__)
+
+EVENTSUB_URI = "wss://eventsub.wss.twitch.tv/ws"
+HELIX_URI = "https://api.twitch.tv/helix"
+
+# Twitch only waits 10 seconds after the welcome for a subscription
+WELCOME_TIMEOUT = 10.0
+# Allowance on top of the session's keepalive timeout for network latency
+KEEPALIVE_GRACE = 2.0
+
+
+class EventSubException(Exception):
+    pass
+
+
+class EventSubAuthenticationException(EventSubException):
+    pass
+
+
+class KeepaliveTimeoutException(EventSubException):
+    pass
+
+
+class Subscription(pydantic.BaseModel):
+    type: str
+    version: str = '1'
+    condition: dict[str, str]
+
+
+class Metadata(pydantic.BaseModel):
+    message_id: str
+    message_type: str
+    message_timestamp: str
+    subscription_type: str | None = None
+    subscription_version: str | None = None
+
+
+class Session(pydantic.BaseModel):
+    id: str
+    status: str
+    keepalive_timeout_seconds: int | None = None
+    reconnect_url: str | None = None
+
+
+class Payload(pydantic.BaseModel):
+    session: Session | None = None
+    subscription: dict | None = None
+    event: dict | None = None
+
+
+class Message(pydantic.BaseModel):
+    metadata: Metadata
+    payload: Payload
+
+    @property
+    def type(self) -> str:
+        return self.metadata.message_type
+
+
+class TwitchEvent(pydantic.BaseModel):
+    """
+    A notification from one of the subscription types in EVENT_TYPES. `kind`
+    is what the event is called on the OutputEvents it turns into.
+    """
+    kind: ClassVar[str]
+
+    broadcaster_user_login: str
+
+    @property
+    def channel(self) -> str:
+        return self.broadcaster_user_login
+
+
+class CheerEvent(TwitchEvent):
+    kind = 'cheer'
+
+    # None when the cheer is anonymous
+    user_name: str | None = None
+    bits: int
+    message: str = ''
+
+
+class FollowEvent(TwitchEvent):
+    kind = 'follow'
+
+    user_name: str
+
+
+class SubscribeEvent(TwitchEvent):
+    kind = 'subscribe'
+
+    user_name: str
+    tier: str
+    is_gift: bool = False
+
+
+class RaidEvent(TwitchEvent):
+    kind = 'raid'
+
+    # The raided channel is the one that gets the alert
+    broadcaster_user_login: str = pydantic.Field(validation_alias='to_broadcaster_user_login')
+    from_broadcaster_user_name: str
+    viewers: int
+
+
+class Reward(pydantic.BaseModel):
+    title: str
+    cost: int
+
+
+class RedemptionEvent(TwitchEvent):
+    kind = 'redemption'
+
+    user_name: str
+    user_input: str = ''
+    reward: Reward
+
+
+EVENT_TYPES: dict[str, type[TwitchEvent]] = {
+    'channel.cheer': CheerEvent,
+    'channel.follow': FollowEvent,
+    'channel.subscribe': SubscribeEvent,
+    'channel.raid': RaidEvent,
+    'channel.channel_points_custom_reward_redemption.add': RedemptionEvent,
+}
+
+
+def subscriptions_for(user_id: str) -> list[Subscription]:
+    """
+    Subscriptions for every type in EVENT_TYPES on the given broadcaster.
+    """
+    return [
+        Subscription(type='channel.cheer', condition={'broadcaster_user_id': user_id}),
+        Subscription(
+            type='channel.follow',
+            version='2',
+            condition={'broadcaster_user_id': user_id, 'moderator_user_id': user_id},
+        ),
+        Subscription(type='channel.subscribe', condition={'broadcaster_user_id': user_id}),
+        Subscription(type='channel.raid', condition={'to_broadcaster_user_id': user_id}),
+        Subscription(
+            type='channel.channel_points_custom_reward_redemption.add',
+            condition={'broadcaster_user_id': user_id},
+        ),
+    ]
+
+
+def decode_event(message: Message) -> TwitchEvent | None:
+    event_type = EVENT_TYPES.get(message.metadata.subscription_type)
+
+    if event_type is None or message.payload.event is None:
+        return None
+
+    return event_type.model_validate(message.payload.event)
+
+
+class RecentIds:
+    """
+    The last `size` message ids seen, for spotting redelivered messages.
+    """
+    def __init__(self, size: int = 1024) -> None:
+        self.order: collections.deque[str] = collections.deque()
+        self.ids: set[str] = set()
+        self.size = size
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self.ids
+
+    def add(self, message_id: str) -> bool:
+        """
+        Remembers message_id, returning False if it was already known.
+        """
+        if message_id in self.ids:
+            return False
+
+        if len(self.order) >= self.size:
+            self.ids.discard(self.order.popleft())
+
+        self.order.append(message_id)
+        self.ids.add(message_id)
+
+        return True
+
+
+class EventSubClient:
+    def __init__(
+        self,
+        client_id: str,
+        access_token: str,
+        subscriptions: list[Subscription],
+        on_event: Callable[[TwitchEvent], object],
+        eventsub_uri: str = EVENTSUB_URI,
+        helix_uri: str = HELIX_URI,
+        keepalive_timeout: int | None = None,
+        dedupe_size: int = 1024,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+    ) -> None:
+        self.client_id = client_id
+        self.access_token = access_token
+        self.subscriptions = subscriptions
+        self.on_event = on_event
+        self.eventsub_uri = eventsub_uri
+        self.helix_uri = helix_uri
+        self.keepalive_timeout = keepalive_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.seen = RecentIds(dedupe_size)
+        self.session: Session | None = None
+
+        self.notifications = 0
+        self.duplicates = 0
+        self.reconnects = 0
+        self.keepalive_timeouts = 0
+
+    @property
+    def uri(self) -> str:
+        if self.keepalive_timeout is None:
+            return self.eventsub_uri
+
+        return f"{self.eventsub_uri}?keepalive_timeout_seconds={self.keepalive_timeout}"
+
+    async def run(self, stop: asyncio.Future) -> None:
+        """
+        Keeps a session going until stop is done, starting a new one whenever
+        the last was lost.
+        """
+        session = asyncio.create_task(self.run_forever())
+
+        await asyncio.wait([session, stop], return_when=asyncio.FIRST_COMPLETED)
+
+        if not session.done():
+            session.cancel()
+
+        try:
+            await session
+        except asyncio.CancelledError:
+            pass
+
+    async def run_forever(self) -> None:
+        delay = self.reconnect_delay
+
+        while True:
+            self.session = None
+
+            try:
+                await self.run_session()
+            except EventSubAuthenticationException:
+                raise
+            except (
+                EventSubException,
+                websockets.exceptions.WebSocketException,
+                aiohttp.ClientError,
+                OSError,
+                asyncio.TimeoutError,
+            ) as e:
+                logger.warning("EventSub session lost: %s", e)
+
+            # Back off only while sessions can't even be started
+            if self.session:
+                delay = self.reconnect_delay
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def run_session(self) -> None:
+        websocket = await self.connect(self.uri)
+
+        try:
+            await self.subscribe(self.session.id)
 
             while True:
-                print(await websocket.recv())
-        # async with websockets.connect(self.twitch_uri) as websocket:
-        #     await self.consumer(websocket)
+                reconnect_url = await self.consume(websocket)
+                websocket = await self.migrate(websocket, reconnect_url)
+        finally:
+            await websocket.close()
+
+    async def connect(self, uri: str) -> websockets.WebSocketClientProtocol:
+        websocket = await websockets.connect(uri)
+
+        try:
+            message = Message.model_validate_json(await asyncio.wait_for(websocket.recv(), WELCOME_TIMEOUT))
+        except BaseException:
+            await websocket.close()
+            raise
+
+        if message.type != 'session_welcome':
+            await websocket.close()
+            raise EventSubException(f"Expected session_welcome, got {message.type}")
+
+        self.session = message.payload.session
+        logger.info("EventSub session %s welcomed", self.session.id)
+
+        return websocket
+
+    async def migrate(self, old: websockets.WebSocketClientProtocol, uri: str) -> websockets.WebSocketClientProtocol:
+        """
+        Moves to the connection at uri, reading old until the new one is
+        welcomed.
+        """
+        self.reconnects += 1
+        draining = asyncio.create_task(self.consume(old))
+
+        try:
+            websocket = await self.connect(uri)
+        finally:
+            # Twitch stops sending on the old connection once the new one is
+            # welcomed; whatever is still in flight is read before closing
+            await old.close()
+            await asyncio.gather(draining, return_exceptions=True)
+
+        return websocket
+
+    async def consume(self, websocket: websockets.WebSocketClientProtocol) -> str:
+        """
+        Handles messages until Twitch asks for a reconnect, returning the URL
+        to reconnect to.
+        """
+        timeout = self.session.keepalive_timeout_seconds
+
+        while True:
+            try:
+                if timeout:
+                    data = await asyncio.wait_for(websocket.recv(), timeout + KEEPALIVE_GRACE)
+                else:
+                    data = await websocket.recv()
+            except asyncio.TimeoutError:
+                self.keepalive_timeouts += 1
+                raise KeepaliveTimeoutException(f"No message in {timeout}s")
+
+            message = self.handle(data)
+
+            if message and message.type == 'session_reconnect':
+                return message.payload.session.reconnect_url
+
+    def handle(self, data: str | bytes) -> Message | None:
+        try:
+            message = Message.model_validate_json(data)
+        except pydantic.ValidationError:
+            logger.exception("Failed to parse EventSub message")
+            return None
+
+        if message.type == 'notification':
+            # Only notifications are redelivered; keepalives would just push
+            # their ids out of the index
+            if not self.seen.add(message.metadata.message_id):
+                self.duplicates += 1
+                return None
+
+            self.notify(message)
+        elif message.type == 'revocation':
+            logger.warning("Subscription revoked: %s", message.payload.subscription)
+
+        return message
+
+    def notify(self, message: Message) -> None:
+        try:
+            event = decode_event(message)
+        except pydantic.ValidationError:
+            logger.exception("Failed to decode %s notification", message.metadata.subscription_type)
+            return
+
+        if event is None:
+            logger.debug("Ignoring %s notification", message.metadata.subscription_type)
+            return
+
+        self.notifications += 1
+
+        # A failing handler loses this event, not the session
+        try:
+            self.on_event(event)
+        except Exception:
+            logger.exception("Failed to handle %s event", event.kind)
+
+    async def subscribe(self, session_id: str) -> None:
+        headers = {
+            'Authorization': f"Bearer {self.access_token}",
+            'Client-Id': self.client_id,
+        }
+
+        async with aiohttp.ClientSession(headers=headers) as session:
+            for subscription in self.subscriptions:
+                body = subscription.model_dump() | {'transport': {'method': 'websocket', 'session_id': session_id}}
+
+                async with session.post(f"{self.helix_uri}/eventsub/subscriptions", json=body) as response:
+                    # 403: the token lacks the subscription's scope
+                    if response.status in (401, 403):
+                        raise EventSubAuthenticationException(await response.text())
 
+                    # 409: already subscribed
+                    if response.status != 409:
+                        response.raise_for_status()
 
-# async def consumer_handler(websocket):
-#     async for message in websocket:
-#         await consumer(message)
+    def summary(self) -> dict[str, int]:
+        return {
+            'notifications': self.notifications,
+            'duplicates': self.duplicates,
+            'reconnects': self.reconnects,
+            'keepalive_timeouts': self.keepalive_timeouts,
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import io
+import pathlib
+import wave
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from app import assets
+from app.assets import AssetCache, AssetServer
+from app.broadcast import Broadcaster
+from app.events import OutputEvent
+
+
+def make_wav(seconds: float, rate: int = 8000) -> bytes:
+    buffer = io.BytesIO()
+
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b'\0\0' * int(seconds * rate))
+
+    return buffer.getvalue()
+
+
+class Origin:
+    """
+    Serves fixed files and counts requests per path.
+    """
+    def __init__(self, files: dict[str, tuple[bytes, str]]) -> None:
+        self.files = files
+        self.requests: dict[str, int] = {}
+        self.url = ""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        body, content_type = self.files[request.path]
+        await asyncio.sleep(0.01)
+
+        return web.Response(body=body, content_type=content_type)
+
+    async def __aenter__(self) -> "Origin":
+        app = web.Application()
+        app.router.add_get('/{name}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.runner.cleanup()
+
+
+def audio_event(url: str) -> OutputEvent:
+    return OutputEvent.model_validate({"steps": [{"type": "audio", "url": url}]})
+
+
+class TestAssetCache:
+    def test_fetch_stores_content_and_duration(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            async with Origin({'/a.wav': (make_wav(1.5), 'audio/wav')}) as origin:
+                cache = AssetCache(tmp_path)
+                url = f"{origin.url}/a.wav"
+
+                first, second = await asyncio.gather(cache.fetch(url), cache.fetch(url))
+                await cache.fetch(url)
+                await cache.close()
+
+            assert first is second
+            assert first.duration == 1.5
+            assert cache.path(first.digest).read_bytes() == make_wav(1.5)
+            assert origin.requests == {'/a.wav': 1}
+            assert cache.summary()['misses'] == 1
+            assert cache.summary()['hits'] == 1
+
+        asyncio.run(run())
+
+    def test_urls_with_the_same_content_share_an_asset(self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        probed = []
+        probe_duration = assets.probe_duration
+
+        async def probe(path: pathlib.Path, content_type: str) -> float | None:
+            probed.append(path)
+            return await probe_duration(path, content_type)
+
+        monkeypatch.setattr(assets, 'probe_duration', probe)
+
+        async def run() -> None:
+            files = {'/a.png': (b'png', 'image/png'), '/b.png': (b'png', 'image/png')}
+
+            async with Origin(files) as origin:
+                cache = AssetCache(tmp_path)
+                a = await cache.fetch(f"{origin.url}/a.png")
+                b = await cache.fetch(f"{origin.url}/b.png")
+                await cache.close()
+
+            assert a is b
+            assert a.duration is None
+            assert cache.bytes == 3
+            assert len(probed) == 1
+
+        asyncio.run(run())
+
+    def test_least_recently_used_assets_are_evicted(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            files = {f'/{name}': (name.encode() * 10, 'image/png') for name in 'abc'}
+
+            async with Origin(files) as origin:
+                cache = AssetCache(tmp_path, max_bytes=25)
+                a = await cache.fetch(f"{origin.url}/a")
+                b = await cache.fetch(f"{origin.url}/b")
+                cache.get(f"{origin.url}/a")
+                await cache.fetch(f"{origin.url}/c")
+                await cache.close()
+
+                assert cache.get(f"{origin.url}/a") is a
+                assert cache.get(f"{origin.url}/b") is None
+
+            assert not cache.path(b.digest).exists()
+            assert cache.bytes == 20
+            assert cache.summary()['evictions'] == 1
+
+        asyncio.run(run())
+
+    def test_index_survives_a_restart(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            async with Origin({'/a.wav': (make_wav(0.5), 'audio/wav')}) as origin:
+                cache = AssetCache(tmp_path)
+                await cache.fetch(f"{origin.url}/a.wav")
+                await cache.close()
+
+                restored = AssetCache(tmp_path)
+                asset = await restored.fetch(f"{origin.url}/a.wav")
+
+            assert asset.duration == 0.5
+            assert origin.requests == {'/a.wav': 1}
+
+        asyncio.run(run())
+
+    def test_published_events_are_prefetched_and_localized(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            async with Origin({'/a.wav': (make_wav(2), 'audio/wav')}) as origin:
+                cache = AssetCache(tmp_path, public_url="http://localhost:8080/assets/")
+                broadcaster = Broadcaster(assets=cache)
+                url = f"{origin.url}/a.wav"
+
+                broadcaster.publish(audio_event(url))
+                await asyncio.gather(*cache.inflight.values())
+                event = cache.localize(audio_event(url))
+                await cache.close()
+
+            asset = cache.get(url)
+            cache.prefetch(event)
+            assert not cache.inflight
+            assert event.steps[0].url == f"http://localhost:8080/assets/{asset.digest}"
+            assert event.steps[0].duration == 2
+
+        asyncio.run(run())
+
+    def test_failed_prefetch_is_counted(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            async with Origin({}) as origin:
+                cache = AssetCache(tmp_path)
+                cache.prefetch(audio_event(f"{origin.url}/missing.wav"))
+                await asyncio.gather(*cache.inflight.values(), return_exceptions=True)
+                await asyncio.sleep(0)
+                await cache.close()
+
+            assert cache.summary()['failures'] == 1
+            assert list((tmp_path / 'tmp').iterdir()) == []
+
+        asyncio.run(run())
+
+
+class TestAssetServer:
+    def test_serves_ranges_of_cached_assets(self, tmp_path: pathlib.Path) -> None:
+        async def run() -> None:
+            async with Origin({'/a.png': (b'0123456789', 'image/png')}) as origin:
+                cache = AssetCache(tmp_path)
+                asset = await cache.fetch(f"{origin.url}/a.png")
+                await cache.close()
+
+            runner = web.AppRunner(AssetServer(cache).app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/assets"
+
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{base}/{asset.digest}", headers={'Range': 'bytes=2-5'}) as response:
+                        assert response.status == 206
+                        assert response.content_type == 'image/png'
+                        assert await response.read() == b'2345'
+
+                    async with session.get(f"{base}/unknown") as response:
+                        assert response.status == 404
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(run())
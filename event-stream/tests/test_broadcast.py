@@ -0,0 +1,171 @@
+import asyncio
+import json
+
+import pydantic
+import pytest
+import websockets
+
+from app.broadcast import Broadcaster, SlowConsumerPolicy, Subscriber
+from app.events import AudioAction, OutputEvent, VisualAction
+from app.routing import RoutingIndex, TopicFilter
+
+
+EVENT = {
+    "steps": [
+        {"type": "image", "url": "https://example.com/a.png", "position_x": 0, "position_y": 0, "width": 100, "height": 50},
+        {"type": "audio", "url": "https://example.com/a.mp3", "duration": 2.5},
+    ]
+}
+
+
+class FakeWebSocket:
+    remote_address = ("127.0.0.1", 0)
+
+    def __init__(self) -> None:
+        self.closed = None
+
+    async def close(self, code: int, reason: str) -> None:
+        self.closed = code
+
+
+class TestOutputEvent:
+    def test_steps_are_typed_by_action(self) -> None:
+        event = OutputEvent.model_validate(EVENT)
+
+        assert isinstance(event.steps[0], VisualAction)
+        assert isinstance(event.steps[1], AudioAction)
+        assert event.steps[1].duration == 2.5
+
+    def test_visual_actions_need_a_position(self) -> None:
+        with pytest.raises(pydantic.ValidationError):
+            OutputEvent.model_validate({"steps": [{"type": "video", "url": "x"}]})
+
+
+class TestBroadcaster:
+    def test_event_is_encoded_once_and_shared(self) -> None:
+        broadcaster = Broadcaster()
+        subscribers = [Subscriber(FakeWebSocket()) for _ in range(3)]
+
+        for subscriber in subscribers:
+            broadcaster.subscribe(subscriber)
+
+
+        assert broadcaster.publish(OutputEvent.model_validate(EVENT)) == 3
+
+        first = subscribers[0].buffer[0]
+        assert all(subscriber.buffer[0] is first for subscriber in subscribers)
+        assert json.loads(first)["steps"][1]["type"] == "audio"
+
+    def test_slow_consumer_is_disconnected(self) -> None:
+        broadcaster = Broadcaster(max_buffer=2)
+        slow = Subscriber(FakeWebSocket())
+
+        async def main() -> None:
+            broadcaster.subscribe(slow)
+
+            for _ in range(3):
+                broadcaster.publish(OutputEvent(steps=[]))
+
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+
+        assert slow not in broadcaster.subscribers
+        assert slow not in broadcaster.routes
+        assert slow.websocket.closed == 1013
+        assert broadcaster.evictions == 1
+        assert not broadcaster.closing
+
+    def test_slow_consumer_skips_oldest(self) -> None:
+        broadcaster = Broadcaster(max_buffer=2, policy=SlowConsumerPolicy.DROP_OLDEST)
+        slow = Subscriber(FakeWebSocket())
+        broadcaster.subscribe(slow)
+
+        for index in range(3):
+            broadcaster.publish(OutputEvent(steps=[{"type": "audio", "url": str(index)}]))
+
+        assert [json.loads(data)["steps"][0]["url"] for data in slow.buffer] == ["1", "2"]
+        assert slow.dropped == 1
+
+    def test_only_matching_subscribers_receive(self) -> None:
+        broadcaster = Broadcaster()
+        everything, audio, mine = (Subscriber(FakeWebSocket()) for _ in range(3))
+        broadcaster.subscribe(everything)
+        broadcaster.subscribe(audio, TopicFilter(actions={"audio"}))
+        broadcaster.subscribe(mine, TopicFilter(channels={"mine"}, kinds={"cheer"}))
+
+        assert broadcaster.publish(OutputEvent.model_validate({**EVENT, "channel": "mine", "kind": "cheer"})) == 3
+        assert broadcaster.publish(OutputEvent.model_validate({**EVENT, "channel": "other", "kind": "cheer"})) == 2
+        assert broadcaster.publish(OutputEvent(steps=[], channel="mine", kind="raid")) == 1
+        assert [len(subscriber.buffer) for subscriber in (everything, audio, mine)] == [3, 2, 1]
+
+    def test_session(self) -> None:
+        broadcaster = Broadcaster()
+
+        async def session() -> list[dict]:
+            stop = asyncio.get_running_loop().create_future()
+            ready = asyncio.get_running_loop().create_future()
+            serving = asyncio.create_task(broadcaster.serve(stop, "127.0.0.1", 0, ready))
+            port = await ready
+
+            async with websockets.connect(f"ws://127.0.0.1:{port}") as first, websockets.connect(f"ws://127.0.0.1:{port}") as second:
+                await second.send(json.dumps({"subscribe": {"channels": ["mine"]}}))
+                assert json.loads(await asyncio.wait_for(second.recv(), 1)) == {
+                    "subscribed": {"channels": ["mine"], "actions": [], "kinds": []},
+                }
+
+                await second.send("nonsense")
+                assert "error" in json.loads(await asyncio.wait_for(second.recv(), 1))
+
+                broadcaster.publish(OutputEvent.model_validate({**EVENT, "channel": "other"}))
+                broadcaster.publish(OutputEvent.model_validate({**EVENT, "channel": "mine"}))
+                received = [json.loads(await asyncio.wait_for(ws.recv(), 1)) for ws in (first, second)]
+
+            stop.set_result(None)
+            await serving
+
+            return received
+
+        received = asyncio.run(session())
+
+        assert received[0]["channel"] == "other"
+        assert received[1]["channel"] == "mine"
+        assert received[0]["steps"][0]["width"] == 100
+        assert "duration" not in received[0]["steps"][0]
+
+
+class TestRoutingIndex:
+    def test_lookup_checks_only_candidates(self) -> None:
+        index = RoutingIndex()
+
+        for number in range(1000):
+            index.add(f"overlay{number}", TopicFilter(channels={f"channel{number}"}))
+
+        index.add("all-audio", TopicFilter(actions={"audio"}))
+        event = OutputEvent.model_validate({**EVENT, "channel": "channel7"})
+
+        assert index.match(event) == {"overlay7", "all-audio"}
+        assert min(
+            sum(map(len, index.candidates(dimension, values)))
+            for dimension, values in [("channels", ["channel7"]), ("actions", event.actions), ("kinds", [None])]
+        ) == 2
+
+    def test_resubscribe_replaces_topics(self) -> None:
+        index = RoutingIndex()
+        index.add("overlay", TopicFilter(channels={"a"}))
+        index.add("overlay", TopicFilter(channels={"b"}))
+
+        assert index.match(OutputEvent(steps=[], channel="a")) == set()
+        assert index.match(OutputEvent(steps=[], channel="b")) == {"overlay"}
+
+        index.remove("overlay")
+        assert len(index) == 0
+        assert not index.index["channels"]
+
+    def test_stop_reaches_every_overlay_of_the_channel(self) -> None:
+        index = RoutingIndex()
+        index.add("audio", TopicFilter(channels={"a"}, actions={"audio"}))
+        index.add("video", TopicFilter(actions={"video"}))
+        index.add("elsewhere", TopicFilter(channels={"b"}))
+
+        assert index.match(OutputEvent.stop("a")) == {"audio", "video"}
@@ -0,0 +1,80 @@
+import asyncio
+
+import websockets
+
+from app.server import ReplayServer, retarget, rss_bytes, sent_at, synthetic_lines
+
+
+RECORDED = [
+    "@id=1;mod=0;tmi-sent-ts=1697759493254 :g!g@g.tmi.twitch.tv PRIVMSG #thebobbyv :hello @Bot",
+    ":isnicable!isnicable@isnicable.tmi.twitch.tv JOIN #thebobbyv",
+    "@id=2;tmi-sent-ts=1697759493754 :h!h@h.tmi.twitch.tv PRIVMSG #thebobbyv :second",
+]
+
+
+class TestReplayHelpers:
+    def test_retarget(self) -> None:
+        assert retarget(RECORDED[0], "local") == (
+            "@id=1;mod=0;tmi-sent-ts=1697759493254 :g!g@g.tmi.twitch.tv PRIVMSG #local :hello @Bot"
+        )
+        assert retarget(RECORDED[1], "local") == ":isnicable!isnicable@isnicable.tmi.twitch.tv JOIN #local"
+        assert retarget("PING :tmi.twitch.tv", "local") == "PING :tmi.twitch.tv"
+
+    def test_sent_at(self) -> None:
+        assert sent_at(RECORDED[0]) == 1697759493.254
+        assert sent_at(RECORDED[1]) is None
+
+    def test_recorded_pacing_is_scaled(self) -> None:
+        server = ReplayServer(lambda: iter(RECORDED), rate=10)
+
+        assert round(server.delay(sent_at(RECORDED[0]), sent_at(RECORDED[2])), 3) == 0.05
+        assert ReplayServer(lambda: iter(RECORDED), rate=None).delay(1.0, 2.0) == 0.0
+
+    def test_rss_bytes(self) -> None:
+        assert rss_bytes() > 0
+        assert rss_bytes(2**22 + 1) is None
+
+    def test_synthetic_lines(self) -> None:
+        lines = synthetic_lines("bot", messages_per_second=4, mention_ratio=1.0, seed=1)
+        first, second = next(lines), next(lines)
+
+        assert "PRIVMSG #replay :@bot message 0" in first
+        assert round(sent_at(second) - sent_at(first), 2) == 0.25
+
+
+class TestReplayServer:
+    def test_session(self) -> None:
+        server = ReplayServer(lambda: iter(RECORDED), rate=None)
+
+        async def session() -> list[str]:
+            stop = asyncio.get_running_loop().create_future()
+            ready = asyncio.get_running_loop().create_future()
+            serving = asyncio.create_task(server.serve(stop, "127.0.0.1", 0, ready))
+            port = await ready
+            lines = []
+
+            async with websockets.connect(f"ws://127.0.0.1:{port}") as websocket:
+                for line in ["PASS oauth:x", "NICK Bot", "CAP REQ :twitch.tv/tags", "JOIN #local", "PING :x"]:
+                    await websocket.send(line)
+
+                while len(lines) < 17:
+                    lines.extend(line for line in (await websocket.recv()).split('\r\n') if line)
+
+                await websocket.send("PRIVMSG #local :@g shut up")
+                await asyncio.sleep(0.1)
+
+            stop.set_result(None)
+            await serving
+
+            return lines
+
+        lines = asyncio.run(session())
+
+        assert lines[0] == ":tmi.twitch.tv 001 bot :Welcome, GLHF!"
+        assert ":tmi.twitch.tv CAP * ACK :twitch.tv/tags" in lines
+        assert ":bot!bot@bot.tmi.twitch.tv JOIN #local" in lines
+        assert ":tmi.twitch.tv PONG tmi.twitch.tv :x" in lines
+        assert sum("PRIVMSG #local" in line for line in lines) == 2
+        assert server.received[-1][1] == "PRIVMSG #local :@g shut up"
+        assert server.summary()['replies'] == 1
+        assert server.summary()['rss_peak_mb'] > 0
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+from app.events import OutputEvent
+from app.timeline import Timeline
+
+
+def event(name: str, *durations: float | None, channel: str | None = "a") -> OutputEvent:
+    return OutputEvent.model_validate({
+        "channel": channel,
+        "kind": name,
+        "steps": [
+            {"type": "audio", "url": f"{name}/{index}", "duration": duration}
+            for index, duration in enumerate(durations)
+        ],
+    })
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.dispatched: list[tuple[float, str | None]] = []
+        self.kinds: list[tuple[str, str | None]] = []
+
+    def __call__(self, event: OutputEvent) -> None:
+        self.dispatched.append((asyncio.get_running_loop().time(), getattr(event.steps[0], 'url', None)))
+        self.kinds.append((event.steps[0].type.value, event.kind))
+
+    @property
+    def urls(self) -> list[str | None]:
+        return [url for _, url in self.dispatched]
+
+
+class TestTimeline:
+    def test_steps_follow_their_durations(self) -> None:
+        async def run() -> None:
+            recorder = Recorder()
+            timeline = Timeline(recorder)
+            start = asyncio.get_running_loop().time()
+
+            timeline.submit(event("e", 0.02, None, 0.03, 0.01))
+            await asyncio.sleep(0.1)
+            await timeline.close()
+
+            times = [time - start for time, _ in recorder.dispatched]
+            assert recorder.urls == ["e/0", "e/1", "e/2", "e/3"]
+
+            # Generous bounds; the event loop shares the machine with others
+            for time, expected in zip(times, (0, 0.02, 0.02, 0.05)):
+                assert expected - 0.001 <= time < expected + 0.04
+
+            assert timeline.jitter.count == 4
+            assert timeline.jitter.max < 0.04
+            assert json.loads(json.dumps(timeline.summary()))['jitter']['buckets']['+Inf'] == 4
+            assert timeline.played == 1
+
+        asyncio.run(run())
+
+    def test_events_on_a_channel_do_not_overlap(self) -> None:
+        async def run() -> None:
+            recorder = Recorder()
+            timeline = Timeline(recorder)
+
+            timeline.submit(event("first", 0.1))
+            timeline.submit(event("second", 0.01))
+            timeline.submit(event("other", 0.01, channel="b"))
+            await asyncio.sleep(0.15)
+            await timeline.close()
+
+            times = dict((url, time) for time, url in recorder.dispatched)
+            assert times["second/0"] - times["first/0"] >= 0.099
+            assert times["other/0"] - times["first/0"] < 0.05
+
+        asyncio.run(run())
+
+    def test_higher_priority_events_play_first(self) -> None:
+        async def run() -> None:
+            recorder = Recorder()
+            timeline = Timeline(recorder)
+
+            timeline.submit(event("playing", 0.02))
+            await asyncio.sleep(0)
+            timeline.submit(event("low", 0.01))
+            timeline.submit(event("high", 0.01), priority=5)
+            await asyncio.sleep(0.06)
+            await timeline.close()
+
+            assert recorder.urls == ["playing/0", "high/0", "low/0"]
+
+        asyncio.run(run())
+
+    def test_preempt_cuts_short_a_lower_priority_event(self) -> None:
+        async def run() -> None:
+            recorder = Recorder()
+            timeline = Timeline(recorder)
+
+            timeline.submit(event("long", 0.2, 0.2))
+            await asyncio.sleep(0.05)
+            timeline.submit(event("alert", 0.01), priority=1, preempt=True)
+            timeline.submit(event("equal", 0.01), priority=1, preempt=True)
+            await asyncio.sleep(0.1)
+            await timeline.close()
+
+            assert recorder.urls == ["long/0", None, "alert/0", "equal/0"]
+            assert recorder.kinds[1] == ("stop", "long")
+            assert timeline.preempted == 1
+            assert timeline.summary()['played'] == 2
+
+        asyncio.run(run())
+
+    def test_full_channel_drops_events(self) -> None:
+        async def run() -> None:
+            timeline = Timeline(Recorder(), max_pending=1)
+
+            assert timeline.submit(event("a", 1))
+            assert not timeline.submit(event("b", 1))
+            assert timeline.dropped == 1
+
+            await timeline.close()
+
+        asyncio.run(run())
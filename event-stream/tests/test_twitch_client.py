@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+from aiohttp import web
+from websockets.server import WebSocketServerProtocol, serve
+
+from app import twitch_client
+from app.alerts import AlertTemplate, Alerts
+from app.events import OutputEvent
+from app.timeline import Timeline
+from app.twitch_client import (
+    CheerEvent,
+    EventSubClient,
+    RaidEvent,
+    RecentIds,
+    Subscription,
+    TwitchEvent,
+)
+
+
+ids = itertools.count()
+
+
+def message(message_type: str, payload: dict, message_id: str | None = None, **metadata) -> str:
+    return json.dumps({
+        "metadata": {
+            "message_id": message_id or str(next(ids)),
+            "message_type": message_type,
+            "message_timestamp": "2023-10-20T00:00:00Z",
+            **metadata,
+        },
+        "payload": payload,
+    })
+
+
+def welcome(session_id: str, keepalive: int = 10) -> str:
+    return message("session_welcome", {
+        "session": {"id": session_id, "status": "connected", "keepalive_timeout_seconds": keepalive},
+    })
+
+
+def cheer(bits: int, message_id: str | None = None) -> str:
+    return message(
+        "notification",
+        {
+            "subscription": {"type": "channel.cheer"},
+            "event": {"broadcaster_user_login": "somechannel", "user_name": "someone", "bits": bits},
+        },
+        message_id=message_id,
+        subscription_type="channel.cheer",
+        subscription_version="1",
+    )
+
+
+class FakeTwitch:
+    """
+    Helix's subscription endpoint, and an EventSub server that plays a
+    script per connection path.
+    """
+    def __init__(self, scripts: dict[str, list[str | float]]) -> None:
+        self.scripts = scripts
+        self.subscribed: list[dict] = []
+
+    async def subscribe(self, request: web.Request) -> web.Response:
+        self.subscribed.append(await request.json())
+        return web.json_response({}, status=202)
+
+    async def handler(self, websocket: WebSocketServerProtocol) -> None:
+        for line in self.scripts[websocket.path]:
+            if isinstance(line, float):
+                await asyncio.sleep(line)
+            else:
+                await websocket.send(line.replace("{uri}", self.uri))
+
+        await websocket.wait_closed()
+
+    async def __aenter__(self) -> "FakeTwitch":
+        app = web.Application()
+        app.router.add_post('/eventsub/subscriptions', self.subscribe)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.helix_uri = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+        self.server = await serve(self.handler, '127.0.0.1', 0)
+        self.uri = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        await self.runner.cleanup()
+
+    def client(self, events: list[TwitchEvent]) -> EventSubClient:
+        return EventSubClient(
+            "client-id",
+            "token",
+            [Subscription(type='channel.cheer', condition={'broadcaster_user_id': '1'})],
+            events.append,
+            eventsub_uri=f"{self.uri}/ws",
+            helix_uri=self.helix_uri,
+            reconnect_delay=0.01,
+        )
+
+
+async def run_until(client: EventSubClient, condition, timeout: float = 3.0) -> None:
+    stop = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(client.run(stop))
+
+    async def wait() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    try:
+        await asyncio.wait_for(wait(), timeout)
+    finally:
+        stop.set_result(None)
+        await task
+
+
+class TestRecentIds:
+    def test_only_the_latest_ids_are_kept(self) -> None:
+        seen = RecentIds(size=2)
+
+        assert seen.add("a")
+        assert not seen.add("a")
+        assert seen.add("b") and seen.add("c")
+        assert "a" not in seen
+        assert seen.add("a")
+
+
+class TestEventSubClient:
+    def test_notifications_are_decoded_and_deduplicated(self) -> None:
+        events = []
+        client = EventSubClient("client-id", "token", [], events.append)
+        raid = message(
+            "notification",
+            {"event": {"to_broadcaster_user_login": "somechannel", "from_broadcaster_user_name": "raider", "viewers": 9}},
+            subscription_type="channel.raid",
+        )
+
+        client.handle(cheer(100, message_id="x"))
+        client.handle(cheer(100, message_id="x"))
+        client.handle(raid)
+        client.handle(message("notification", {"event": {}}, subscription_type="channel.unknown"))
+
+        assert [type(event) for event in events] == [CheerEvent, RaidEvent]
+        assert events[0].bits == 100
+        assert events[1].channel == "somechannel"
+        assert client.summary()['duplicates'] == 1
+
+    def test_only_notifications_are_remembered(self) -> None:
+        client = EventSubClient("client-id", "token", [], lambda event: None, dedupe_size=1)
+
+        client.handle(cheer(1, message_id="x"))
+        client.handle(message("session_keepalive", {}))
+        client.handle(cheer(1, message_id="x"))
+
+        assert client.duplicates == 1
+
+    def test_failing_handler_keeps_the_session(self) -> None:
+        def on_event(event: TwitchEvent) -> None:
+            raise RuntimeError("bad alert")
+
+        client = EventSubClient("client-id", "token", [], on_event)
+
+        assert client.handle(cheer(1)).type == "notification"
+        assert client.notifications == 1
+
+    def test_session_reconnect_loses_no_events(self) -> None:
+        async def run() -> None:
+            scripts = {
+                "/ws": [
+                    welcome("one"),
+                    0.05,
+                    cheer(1),
+                    message("session_reconnect", {
+                        "session": {"id": "one", "status": "reconnecting", "reconnect_url": "{uri}/reconnect"},
+                    }),
+                    cheer(2, message_id="in-flight"),
+                ],
+                "/reconnect": [welcome("one"), cheer(2, message_id="in-flight"), cheer(3)],
+            }
+
+            async with FakeTwitch(scripts) as twitch:
+                events = []
+                client = twitch.client(events)
+
+                await run_until(client, lambda: len(events) == 3 and client.duplicates)
+
+            assert [event.bits for event in events] == [1, 2, 3]
+            assert client.summary()['reconnects'] == 1
+            assert len(twitch.subscribed) == 1
+            assert twitch.subscribed[0]['transport'] == {'method': 'websocket', 'session_id': 'one'}
+
+        asyncio.run(run())
+
+    def test_quiet_session_is_replaced(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(twitch_client, 'KEEPALIVE_GRACE', 0.0)
+
+        async def run() -> None:
+            async with FakeTwitch({"/ws": [welcome("quiet", keepalive=1)]}) as twitch:
+                events = []
+                client = twitch.client(events)
+
+                await run_until(client, lambda: len(twitch.subscribed) == 2)
+
+            assert client.summary()['keepalive_timeouts'] == 1
+
+        asyncio.run(run())
+
+
+class TestAlerts:
+    def test_events_with_a_template_are_queued(self) -> None:
+        async def run() -> None:
+            published = []
+            timeline = Timeline(published.append)
+            alerts = Alerts(timeline, {
+                "cheer": AlertTemplate.model_validate({
+                    "priority": 2,
+                    "steps": [{"type": "audio", "url": "https://example.com/cheer.mp3"}],
+                }),
+            })
+
+            assert alerts(CheerEvent(broadcaster_user_login="somechannel", bits=5))
+            assert not alerts(RaidEvent(to_broadcaster_user_login="somechannel", from_broadcaster_user_name="r", viewers=1))
+            await asyncio.sleep(0.01)
+            await timeline.close()
+
+            assert published == [OutputEvent.model_validate({
+                "channel": "somechannel",
+                "kind": "cheer",
+                "steps": [{"type": "audio", "url": "https://example.com/cheer.mp3"}],
+            })]
+
+        asyncio.run(run())